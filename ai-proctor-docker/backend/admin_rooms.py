@@ -0,0 +1,93 @@
+"""
+Socket.IO rooms on the admin dashboard namespace.
+
+Sessions are tagged at start with an exam and a proctor group (either may
+be absent). Every event about a session is emitted to the rooms for its
+tags, and each admin joins only the rooms for what they watch, so an emit
+reaches the admins concerned instead of every admin on the platform:
+
+``admin_dashboard_room``
+    Everything (the default subscription).
+``exam:<exam_id>`` / ``group:<proctor_group>``
+    One exam or proctor group.
+``<any of the above>:alerts``
+    The same scope, but only alerts and sessions that have unread alerts.
+
+Emitting to a list of rooms reaches each admin once, however many of the
+rooms they are in.
+"""
+
+ALL_ROOM = 'admin_dashboard_room'
+ALERTS_SUFFIX = ':alerts'
+EXAM_PREFIX = 'exam:'
+GROUP_PREFIX = 'group:'
+
+
+def exam_room(exam_id):
+    return f"{EXAM_PREFIX}{exam_id}"
+
+
+def group_room(proctor_group):
+    return f"{GROUP_PREFIX}{proctor_group}"
+
+
+def is_admin_room(room):
+    return room == ALL_ROOM or room.startswith((ALL_ROOM + ALERTS_SUFFIX, EXAM_PREFIX, GROUP_PREFIX))
+
+
+def _scopes(session_entry):
+    scopes = [ALL_ROOM]
+    if session_entry.get("exam_id"):
+        scopes.append(exam_room(session_entry["exam_id"]))
+    if session_entry.get("proctor_group"):
+        scopes.append(group_room(session_entry["proctor_group"]))
+    return scopes
+
+
+def session_rooms(session_entry, alerting=None):
+    """
+    Rooms that should hear about a session.
+
+    Parameters
+    ----------
+    session_entry : dict
+        The live session entry (its ``exam_id``, ``proctor_group`` and
+        ``unread_alert_count`` are used).
+    alerting : bool, optional
+        Include the alerts-only rooms; by default when the session has
+        unread alerts.
+
+    """
+    if alerting is None:
+        alerting = bool(session_entry.get("unread_alert_count"))
+    scopes = _scopes(session_entry)
+    if alerting:
+        return scopes + [scope + ALERTS_SUFFIX for scope in scopes]
+    return scopes
+
+
+def delta_rooms(session_entry, changed_fields):
+    """
+    Rooms for a ``sessions_delta`` entry: alerts-only rooms also hear the
+    change that clears a session's last unread alert, so they can drop it.
+    """
+    return session_rooms(session_entry, bool(session_entry.get("unread_alert_count"))
+                         or "unread_alert_count" in changed_fields)
+
+
+def subscription_rooms(exam_ids=None, proctor_groups=None, alerts_only=False):
+    """Rooms an admin joins to watch the given exams and groups (everything when both are empty)."""
+    scopes = [exam_room(exam_id) for exam_id in exam_ids or ()]
+    scopes += [group_room(group) for group in proctor_groups or ()]
+    if not scopes:
+        scopes = [ALL_ROOM]
+    return [scope + ALERTS_SUFFIX for scope in scopes] if alerts_only else scopes
+
+
+def session_matches(session_entry, exam_ids=None, proctor_groups=None, alerts_only=False):
+    """Whether a subscription with these filters covers the session (for listings)."""
+    if exam_ids or proctor_groups:
+        if session_entry.get("exam_id") not in set(exam_ids or ()) and \
+                session_entry.get("proctor_group") not in set(proctor_groups or ()):
+            return False
+    return not alerts_only or bool(session_entry.get("unread_alert_count"))
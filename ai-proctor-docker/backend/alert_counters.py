@@ -0,0 +1,194 @@
+"""
+Incrementally maintained per-session alert counters.
+
+Every alert created or acknowledged updates the session's document in the
+``alert_counters`` collection with an atomic ``$inc`` upsert:
+
+    {
+        "_id": <session_id>, "student_username": ...,
+        "total": 12, "unread": 3,
+        "by_type": {"looking_away": 9, "no_face_detected": 3},
+        "unread_by_type": {"looking_away": 2, "no_face_detected": 1},
+        "updated_at": datetime
+    }
+
+The update returns the document as it is afterwards, so the counts pushed to
+admins are the shared totals whichever worker handled the alert. The
+in-memory copy is only a cache for when MongoDB cannot be reached; an
+increment that fails then is spooled and replayed later. Each increment
+carries an id kept in ``applied_ops`` (the most recent few), so a replay of
+one that had in fact been applied does nothing.
+
+The dashboard and alert log read these documents instead of aggregating
+over ``alerts``.
+"""
+
+import datetime
+import threading
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import data_access
+from spool import UPDATE
+
+APPLIED_OPS_KEPT = 64  # Increment ids remembered per session for idempotent replays
+HIDDEN_FIELDS = {"applied_ops": 0}
+
+
+def _field_name(alert_type):
+    """Alert types become sub-document keys; keep them free of '.' and '$'."""
+    return str(alert_type or 'unknown').replace('.', '_').replace('$', '_')
+
+
+def _empty_counts():
+    return {"total": 0, "unread": 0, "by_type": {}, "unread_by_type": {}}
+
+
+def _copy(counts):
+    return {**counts, "by_type": dict(counts["by_type"]), "unread_by_type": dict(counts["unread_by_type"])}
+
+
+def _counts_from(stored):
+    counts = _empty_counts()
+    for field in counts:
+        counts[field] = stored.get(field, counts[field])
+    return counts
+
+
+class AlertCounters:
+    """
+    Per-session counters persisted with ``$inc`` upserts.
+
+    Parameters
+    ----------
+    collection : collection or None
+    spool : spool.Spool, optional
+        Where increments go while MongoDB is unavailable.
+
+    """
+
+    def __init__(self, collection, spool=None):
+        self.collection = collection
+        self.spool = spool
+        self._counts = {}  # session_id -> last known counts (a cache)
+        self._lock = threading.Lock()
+
+    def _apply_cached(self, session_id, key, total, unread):
+        """Apply an increment to the cached counts; used when the stored ones cannot be read back."""
+        with self._lock:
+            counts = self._counts.setdefault(session_id, _empty_counts())
+            counts["total"] += total
+            counts["unread"] = max(counts["unread"] + unread, 0)
+            if total:
+                counts["by_type"][key] = counts["by_type"].get(key, 0) + total
+            counts["unread_by_type"][key] = max(counts["unread_by_type"].get(key, 0) + unread, 0)
+            return _copy(counts)
+
+    def _cache(self, session_id, counts):
+        with self._lock:
+            self._counts[session_id] = counts
+        return _copy(counts)
+
+    def _increment(self, session_id, key, increments, username=None):
+        """
+        Persist an increment and return the session's counts afterwards.
+        """
+        total, unread = increments.get("total", 0), increments["unread"]
+        if self.collection is None:
+            return self._apply_cached(session_id, key, total, unread)
+        op_id = ObjectId()
+        query = {"_id": session_id, "applied_ops": {"$ne": op_id}}
+        update = {
+            "$inc": increments,
+            "$set": {"updated_at": datetime.datetime.utcnow()},
+            "$push": {"applied_ops": {"$each": [op_id], "$slice": -APPLIED_OPS_KEPT}},
+        }
+        if username is not None:
+            update["$setOnInsert"] = {"student_username": username}
+        try:
+            try:
+                stored = self.collection.find_one_and_update(
+                    query, update, upsert=True, return_document=ReturnDocument.AFTER, projection=HIDDEN_FIELDS)
+            except DuplicateKeyError:
+                # Another worker inserted the session's document first; now the filter matches it
+                stored = self.collection.find_one_and_update(
+                    query, update, return_document=ReturnDocument.AFTER, projection=HIDDEN_FIELDS)
+            if stored is not None:
+                return self._cache(session_id, _counts_from(stored))
+        except data_access.DatabaseUnavailable as e:
+            if self.spool is None:
+                print(f"[ALERT_COUNTERS_ERROR] Failed to persist counters for session {session_id}: {e}", flush=True)
+            else:
+                try:
+                    self.spool.append(self.collection.name, {"_id": op_id, "filter": query, "update": update}, op=UPDATE)
+                    print(f"[SPOOL] Counter update for session {session_id} spooled: {e}", flush=True)
+                except Exception as spool_error:
+                    print(f"[ALERT_COUNTERS_ERROR] Failed to spool counters for session {session_id}: {spool_error}",
+                          flush=True)
+        except Exception as e:
+            print(f"[ALERT_COUNTERS_ERROR] Failed to persist counters for session {session_id}: {e}", flush=True)
+        return self._apply_cached(session_id, key, total, unread)
+
+    def record_alert(self, session_id, alert_type, username=None):
+        """
+        Count a newly created (unread) alert.
+
+        Returns
+        -------
+        counts : dict
+            The session's counters after the update.
+
+        """
+        key = _field_name(alert_type)
+        return self._increment(session_id, key, {
+            "total": 1, "unread": 1,
+            f"by_type.{key}": 1, f"unread_by_type.{key}": 1,
+        }, username=username)
+
+    def record_acknowledged(self, session_id, alert_type):
+        """Count an alert moving from unread to acknowledged."""
+        key = _field_name(alert_type)
+        return self._increment(session_id, key, {"unread": -1, f"unread_by_type.{key}": -1})
+
+    def get(self, session_id):
+        """Stored counters for one session; the cached ones if the collection cannot be read."""
+        if self.collection is not None:
+            try:
+                stored = self.collection.find_one({"_id": session_id}, HIDDEN_FIELDS)
+                return self._cache(session_id, _counts_from(stored or {}))
+            except Exception as e:
+                print(f"[ALERT_COUNTERS_ERROR] Failed to load counters for session {session_id}: {e}", flush=True)
+        with self._lock:
+            cached = self._counts.get(session_id)
+            return _copy(cached) if cached is not None else _empty_counts()
+
+    def all_sessions(self, query=None):
+        """
+        Persisted counters for every session matching ``query``.
+
+        Returns
+        -------
+        sessions : list of dict
+        totals : dict
+            Counters summed across the returned sessions.
+
+        """
+        sessions = []
+        totals = _empty_counts()
+        if self.collection is None:
+            return sessions, totals
+        for doc in self.collection.find(query or {}, HIDDEN_FIELDS):
+            sessions.append(doc)
+            totals["total"] += doc.get("total", 0)
+            totals["unread"] += doc.get("unread", 0)
+            for field in ("by_type", "unread_by_type"):
+                for alert_type, count in (doc.get(field) or {}).items():
+                    totals[field][alert_type] = totals[field].get(alert_type, 0) + count
+        return sessions, totals
+
+    def forget(self, session_id):
+        """Drop the cached copy of a finished session (the stored one stays)."""
+        with self._lock:
+            self._counts.pop(session_id, None)
@@ -2,9 +2,9 @@
 import eventlet
 eventlet.monkey_patch() 
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS, cross_origin
-from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms, disconnect
 import os
 import cv2
 import numpy as np
@@ -12,15 +12,37 @@ from eye_tracker import get_eye_status # Assumes eye_tracker.py is in the same d
 from face_detector import get_face_detector, find_faces # Assumes face_detector.py is in the same directory
 from face_landmarks import get_landmark_model, detect_marks # Assumes face_landmarks.py is in the same directory
 import datetime
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, get_jwt
 import base64 # Added import
 import io # Added import
-import librosa # Added import
 import uuid # NEW: For generating unique alert IDs
 import math # NEW: For pagination (math.ceil)
+import threading
+import functools
 from config import get_config
+from segment_store import SegmentStore, session_id_from_filename
+from event_writer import BufferedEventWriter
+from spool import Spool
+from event_coalescer import FaceEventCoalescer, expand_range
+import event_store
+import db_indexes
+import pagination
+from alert_counters import AlertCounters
+from session_reaper import SessionReaper
+from session_router import SessionRouter, OWNER_FIELD, is_internal
+from student_presence import StudentPresence
+import export_stream
+import audio_io
+import audio_evidence
+import data_access
+import session_summary
+import session_state
+import session_broadcast
+import admin_rooms
+import socketio_bus
+from bson import ObjectId
 
 app = Flask(__name__)
 
@@ -33,12 +55,14 @@ if app.config['FLASK_ENV'] == 'production':
     # Restrictive CORS for production
     allowed_origins = [app.config['FRONTEND_URL']]
     CORS(app, origins=allowed_origins, methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], 
-         allow_headers=["Content-Type", "Authorization"], supports_credentials=True, 
+         allow_headers=["Content-Type", "Authorization", "X-Session-Id", "X-Sample-Rate", "X-Audio-Format", "X-Audio-Channels", "X-Audio-Sequence"],
+         supports_credentials=True, 
          expose_headers=["Content-Type", "Authorization"])
 else:
     # Permissive CORS for development
     CORS(app, origins="*", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], 
-         allow_headers=["Content-Type", "Authorization"], supports_credentials=True, 
+         allow_headers=["Content-Type", "Authorization", "X-Session-Id", "X-Sample-Rate", "X-Audio-Format", "X-Audio-Channels", "X-Audio-Sequence"],
+         supports_credentials=True, 
          expose_headers=["Content-Type", "Authorization"])
 
 # Old more specific CORS, commented out for now:
@@ -55,7 +79,12 @@ else:
 
 # Initialize SocketIO
 # Allowing all origins for SocketIO for development, can be tightened later.
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Emits go through a message queue so admins connected to any worker receive them
+socketio_manager = socketio_bus.create_client_manager(app.config['SOCKETIO_MESSAGE_QUEUE'])
+if socketio_manager is not None:
+    socketio = SocketIO(app, cors_allowed_origins="*", client_manager=socketio_manager)
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Define the directory where audio chunks are stored
 AUDIO_CHUNK_DIR = '/app/audio_chunks' # Use absolute path directly
@@ -70,6 +99,22 @@ except OSError as e:
     print(f"[ERROR] Could not create audio chunk or snapshot directory: {e}", flush=True)
     # Depending on the severity, you might want to raise the error or handle it
 
+# Snapshots of finished sessions are packed into per-session segment files
+SNAPSHOT_SEGMENT_DIR = os.path.join(SNAPSHOT_DIR, 'segments')
+try:
+    snapshot_segments = SegmentStore(SNAPSHOT_SEGMENT_DIR)
+except OSError as e:
+    print(f"[ERROR] Could not create snapshot segment directory: {e}", flush=True)
+    snapshot_segments = None
+
+# Audio around sound alerts is kept in per-session segment files (see audio_evidence.py)
+AUDIO_SEGMENT_DIR = os.path.join(AUDIO_CHUNK_DIR, 'segments')
+try:
+    audio_segments = SegmentStore(AUDIO_SEGMENT_DIR)
+except OSError as e:
+    print(f"[ERROR] Could not create audio segment directory: {e}", flush=True)
+    audio_segments = None
+
 # Threshold for loud noise detection (in dBFS)
 # This can be tuned based on testing. Values closer to 0 are louder.
 LOUD_NOISE_DBFS_THRESHOLD = -20.0
@@ -82,31 +127,172 @@ jwt = JWTManager(app)
 mongo_uri = app.config['MONGO_URI']
 print(f"[INFO] Attempting to connect to MongoDB with URI: {mongo_uri}", flush=True)
 
+# One pooled client per worker; every collection goes through the same breaker
+mongo_breaker = data_access.CircuitBreaker(
+    failure_threshold=app.config['MONGO_BREAKER_FAILURE_THRESHOLD'],
+    reset_timeout=app.config['MONGO_BREAKER_RESET_SECONDS'],
+)
+mongo_operation_timeout = app.config['MONGO_OPERATION_TIMEOUT_MS'] / 1000.0
+
 try:
-    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)  # 5 second timeout
-    # Test the connection
-    client.admin.command('ping')
-    
+    client = data_access.create_client(mongo_uri, app.config)
     # If MONGO_URI includes the database name (e.g., from docker-compose), 
     # client.get_default_database() will use it. Otherwise, you need to specify.
     # Let's use get_default_database() as suggested by the docker-compose comment
     db = client.get_default_database() 
+except Exception as e:
+    print(f"[WARNING] Invalid MongoDB configuration: {e}", flush=True)
+    client = None
+    db = None
+
+events_storage_mode = event_store.STANDARD
+try:
+    if db is None:
+        raise data_access.DatabaseUnavailable("no database configured")
+    # Test the connection
+    client.admin.command('ping')
     print(f"[INFO] Connected to MongoDB, selected database: {db.name}", flush=True)
 
-    events_collection = db.proctoring_events
-    users_collection = db.users
-    alerts_collection = db.alerts # NEW: For storing detailed alerts
-    
-    mongodb_available = True
+    # Creates proctoring_events as a time-series collection when opted in
+    events_storage_mode = event_store.ensure_events_collection(db, app.config['EVENTS_STORAGE_MODE'])
+
+    if app.config['ENSURE_INDEXES_ON_STARTUP']:
+        index_failures = db_indexes.ensure_indexes(db, events_storage_mode)
+        print(f"[INFO] MongoDB indexes ensured ({len(index_failures)} failures)", flush=True)
 except Exception as e:
     print(f"[WARNING] MongoDB connection failed: {e}", flush=True)
-    print("[WARNING] App will start but database operations will be disabled", flush=True)
-    client = None
-    db = None
-    events_collection = None
-    users_collection = None
-    alerts_collection = None
-    mongodb_available = False
+    print("[WARNING] App will start; database operations return 503 until MongoDB is reachable", flush=True)
+    mongo_breaker.trip(e)
+
+def _collection(name):
+    return data_access.wrap_collection(db, name, mongo_breaker, mongo_operation_timeout)
+
+events_collection = _collection('proctoring_events')
+users_collection = _collection('users')
+alerts_collection = _collection('alerts') # NEW: For storing detailed alerts
+alert_counters_collection = _collection('alert_counters')
+session_summaries_collection = _collection('session_summaries')
+
+def _mongodb_connected():
+    return db is not None and mongo_breaker.state == data_access.CLOSED
+
+@app.errorhandler(data_access.DatabaseUnavailable)
+def handle_database_unavailable(e):
+    print(f"[DB_UNAVAILABLE] {request.method} {request.path}: {e}", flush=True)
+    response = jsonify({"msg": "Database temporarily unavailable. Please retry shortly."})
+    response.headers['Retry-After'] = str(int(app.config['MONGO_BREAKER_RESET_SECONDS']))
+    return response, 503
+
+# Events and alerts that cannot reach MongoDB are spooled to local disk and
+# replayed in order once it recovers
+write_spool = None
+if app.config['SPOOL_ENABLED']:
+    try:
+        write_spool = Spool(
+            app.config['SPOOL_DIR'],
+            {'proctoring_events': events_collection, 'alerts': alerts_collection,
+             'alert_counters': alert_counters_collection},
+            max_bytes=app.config['SPOOL_MAX_MB'] * 1024 * 1024,
+            drain_interval=app.config['SPOOL_DRAIN_INTERVAL_MS'] / 1000.0,
+            drain_batch=app.config['SPOOL_DRAIN_BATCH'],
+        )
+        write_spool.start()
+        print(f"[INFO] Write spool ready: {write_spool.path}", flush=True)
+    except OSError as e:
+        print(f"[ERROR] Could not open write spool in {app.config['SPOOL_DIR']}: {e}", flush=True)
+
+# Per-frame events are buffered and written in bulk off the request path
+event_writer = BufferedEventWriter(
+    events_collection,
+    batch_size=app.config['EVENT_WRITER_BATCH_SIZE'],
+    flush_interval=app.config['EVENT_WRITER_FLUSH_INTERVAL_MS'] / 1000.0,
+    max_buffer=app.config['EVENT_WRITER_MAX_BUFFER'],
+    prepare=lambda event: event_store.to_storage(event, events_storage_mode),
+    spool=write_spool,
+)
+event_writer.start()
+
+# Runs of identical face_analyzed states are stored as one range document
+event_coalescer = None
+if app.config['EVENT_COALESCING_ENABLED']:
+    event_coalescer = FaceEventCoalescer(
+        event_writer,
+        checkpoint_interval=app.config['EVENT_RANGE_CHECKPOINT_SECONDS'],
+        max_gap=app.config['EVENT_RANGE_MAX_GAP_SECONDS'],
+        # Time-series documents cannot be updated, so ranges are inserted once closed
+        append_only=events_storage_mode == event_store.TIMESERIES,
+    )
+    event_coalescer.start()
+
+# Per-session alert counts, kept current as alerts are created and acknowledged
+alert_counters = AlertCounters(alert_counters_collection, spool=write_spool)
+
+def _insert_alert(alert_doc):
+    """
+    Insert an alert, spooling it locally if the insert fails (MongoDB
+    unavailable or too slow, or any other write error). Raises only when the
+    alert could not be spooled either.
+    """
+    try:
+        alerts_collection.insert_one(alert_doc)
+    except Exception as e:
+        if write_spool is None:
+            raise
+        write_spool.append('alerts', alert_doc)
+        print(f"[SPOOL] Alert {alert_doc['_id']} spooled for later insert: {e}", flush=True)
+
+# Per-session sound detection state (frame carry-over, open segments, noise floor).
+# Created on the first audio chunk so workers that never analyse audio do not
+# import the audio subsystem or run its eviction thread.
+audio_analyzer = None
+audio_batch_worker = None
+audio_recorder = None
+_audio_analyzer_lock = threading.Lock()
+
+def _get_audio_analyzer():
+    global audio_analyzer, audio_batch_worker, audio_recorder
+    if audio_analyzer is None:
+        with _audio_analyzer_lock:
+            if audio_analyzer is None:
+                from audio_stream import StreamingAudioAnalyzer
+                if app.config['AUDIO_EVIDENCE_ENABLED'] and audio_segments is not None:
+                    audio_recorder = audio_evidence.AudioEvidenceRecorder(
+                        audio_segments,
+                        padding=app.config['AUDIO_EVIDENCE_PADDING_SECONDS'],
+                        # Far enough back to reach the start of any event the analyzer reports
+                        history_seconds=app.config['AUDIO_EVIDENCE_PADDING_SECONDS']
+                        + max(app.config['SOUND_MIN_SPEECH_SECONDS'], app.config['SOUND_MIN_NOISE_SECONDS']) + 1.0,
+                        max_clip_seconds=app.config['AUDIO_EVIDENCE_MAX_CLIP_SECONDS'],
+                    )
+                analyzer = StreamingAudioAnalyzer(
+                    loud_noise_dbfs_threshold=LOUD_NOISE_DBFS_THRESHOLD,
+                    min_noise_duration=app.config['SOUND_MIN_NOISE_SECONDS'],
+                    min_speech_duration=app.config['SOUND_MIN_SPEECH_SECONDS'],
+                    vad_aggressiveness=app.config['SOUND_VAD_AGGRESSIVENESS'],
+                    idle_timeout=app.config['AUDIO_STREAM_IDLE_SECONDS'],
+                    on_evict=audio_recorder.close_session if audio_recorder is not None else None,
+                )
+                analyzer.start()
+                if app.config['AUDIO_BATCH_ENABLED']:
+                    from audio_batch import AudioBatchWorker
+                    audio_batch_worker = AudioBatchWorker(
+                        analyzer,
+                        max_batch=app.config['AUDIO_BATCH_MAX_CHUNKS'],
+                        max_wait=app.config['AUDIO_BATCH_MAX_WAIT_MS'] / 1000.0,
+                    )
+                    audio_batch_worker.start()
+                audio_analyzer = analyzer
+    return audio_analyzer
+
+def _analyze_audio_samples(session_id, samples, sample_rate):
+    """Analyse one chunk, batched with other sessions' pending chunks when the worker is on."""
+    analyzer = _get_audio_analyzer()
+    if audio_batch_worker is not None:
+        return audio_batch_worker.analyze(session_id, samples, sample_rate)
+    return analyzer.process(session_id, samples, sample_rate)
+
+# Short-lived cache for /api/admin/alerts totals
+alert_count_cache = pagination.CountCache(ttl_seconds=app.config['ALERT_COUNT_CACHE_TTL_SECONDS'])
 
 # Initialize face detection models
 # These will be initialized when the Docker container starts.
@@ -115,11 +301,91 @@ except Exception as e:
 face_model = get_face_detector()
 landmark_model = get_landmark_model()
 
-# Placeholder for active sessions store (Task 3.2.1)
-active_sessions_store = {}
-
-# Placeholder for admin SIDs or room (Task 3.4.2)
-admin_dashboard_room = "admin_dashboard_room"
+# Live session entries, shared by all workers on the host (see session_state.py)
+active_sessions_store = session_state.create_session_state(
+    app.config['SESSION_STATE_BACKEND'], app.config['SESSION_STATE_PATH'] or None)
+
+# With several workers, a session's requests are forwarded to the worker that
+# started it, which holds its audio and event-range state (see session_router.py)
+session_router = None
+if app.config['SESSION_ROUTING_ENABLED']:
+    session_router = SessionRouter(
+        app, active_sessions_store,
+        directory=app.config['SESSION_ROUTING_DIR'] or None,
+        timeout=app.config['SESSION_ROUTING_TIMEOUT_SECONDS'],
+    )
+
+# Admins watching everything; per-exam and per-group rooms are in admin_rooms.py
+admin_dashboard_room = admin_rooms.ALL_ROOM
+
+# Changed session fields reach admins as one coalesced 'sessions_delta' per tick
+# (see session_broadcast.py), named as in /api/admin/dashboard/active_sessions
+DASHBOARD_FIELD_NAMES = {
+    "student_username": "student_name",
+    "latest_face_analysis_status": "latest_status",
+    "last_face_analysis_status": "latest_status",
+    "latest_audio_event_summary": "latest_audio_event",
+}
+session_broadcaster = session_broadcast.SessionDeltaBroadcaster(
+    active_sessions_store,
+    lambda payload, room_list: socketio.emit('sessions_delta', payload, room=room_list, namespace='/ws/admin_dashboard'),
+    admin_rooms.delta_rooms,
+    interval=app.config['SESSIONS_DELTA_INTERVAL_MS'] / 1000.0,
+    rename=DASHBOARD_FIELD_NAMES,
+)
+session_broadcaster.start()
+
+# Students connected on /ws/student; their heartbeats are written in batches
+student_presence = StudentPresence(active_sessions_store, flush_interval=app.config['STUDENT_PRESENCE_FLUSH_SECONDS'])
+student_presence.start()
+
+def _session_rooms(session_id, alerting=None):
+    """Admin rooms for events about a live session (see admin_rooms.session_rooms)."""
+    return admin_rooms.session_rooms(active_sessions_store.get(session_id) or {}, alerting)
+
+def _update_live_session(session_id, fields, broadcast=True):
+    """
+    Merge ``fields`` into the live session entry and queue the fields that
+    changed for the next dashboard delta. Returns the merged entry, or None
+    if the session is not active.
+    """
+    session_entry, changed = active_sessions_store.update_changed(session_id, fields)
+    if session_entry is not None and broadcast:
+        session_broadcaster.mark(session_id, changed)
+    return session_entry
+
+def _request_session_id():
+    """The session a request is about: X-Session-Id header, form field or JSON field."""
+    session_id = request.headers.get('X-Session-Id') or request.form.get('session_id')
+    if not session_id and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get('session_id')
+    return session_id
+
+def _routed_to_session_owner(view):
+    """
+    Forward the request to the worker that owns its session, if that is
+    another worker (see session_router.py). Goes below @jwt_required() so
+    only authenticated requests are forwarded.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if session_router is None or request.method == 'OPTIONS' or is_internal(request.environ):
+            return view(*args, **kwargs)
+        body = request.get_data()  # Cached, so the view can still parse it
+        session_id = _request_session_id()
+        if not session_id:
+            return view(*args, **kwargs)
+        try:
+            forwarded = session_router.forward(session_id, request.method, request.full_path,
+                                               list(request.headers.items()), body)
+        except Exception as e:
+            print(f"[SESSION_ROUTER_ERROR] Forwarding {request.path} for session {session_id} failed: {e}", flush=True)
+            return jsonify({"msg": "Session is busy on another worker. Please retry shortly."}), 503
+        if forwarded is None:
+            return view(*args, **kwargs)
+        status, headers, content = forwarded
+        return Response(content, status=status, headers=headers)
+    return wrapper
 
 @app.route('/')
 def index():
@@ -129,7 +395,7 @@ def index():
         "status": "running",
         "version": "1.0.0",
         "environment": app.config.get('FLASK_ENV', 'unknown'),
-        "mongodb_connected": mongodb_available,
+        "mongodb_connected": _mongodb_connected(),
         "endpoints": {
             "health": "/api/health",
             "auth_register": "/api/auth/register",
@@ -187,17 +453,47 @@ def health_check():
     health_status = {
         "status": "ok",
         "message": "AI Proctoring system is running",
-        "mongodb_connected": mongodb_available,
+        "mongodb_connected": _mongodb_connected(),
         "environment": app.config.get('FLASK_ENV', 'unknown')
     }
     
-    if not mongodb_available:
+    if not _mongodb_connected():
         health_status["warning"] = "MongoDB not available - database operations disabled"
+        health_status["mongodb_circuit"] = mongo_breaker.state
     
     return jsonify(health_status)
 
+@app.route('/api/admin/metrics', methods=['GET', 'OPTIONS'])
+@jwt_required()
+def get_admin_metrics():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'OPTIONS request successful for /api/admin/metrics'}), 200
+
+    claims = get_jwt()
+    if claims.get("role") != 'admin':
+        return jsonify({"msg": "Administration rights required to view metrics."}), 403
+
+    return jsonify({
+        "mongodb_connected": _mongodb_connected(),
+        "mongodb_circuit": mongo_breaker.stats(),
+        "events_storage_mode": events_storage_mode,
+        "event_writer": event_writer.stats(),
+        "event_coalescer": event_coalescer.stats() if event_coalescer is not None else None,
+        "spool": write_spool.stats() if write_spool is not None else None,
+        "audio_analyzer": audio_analyzer.stats() if audio_analyzer is not None else None,
+        "audio_batch_worker": audio_batch_worker.stats() if audio_batch_worker is not None else None,
+        "audio_evidence": audio_recorder.stats() if audio_recorder is not None else None,
+        "session_state": active_sessions_store.stats(),
+        "session_broadcaster": session_broadcaster.stats(),
+        "session_reaper": session_reaper.stats(),
+        "session_router": session_router.stats() if session_router is not None else None,
+        "student_presence": student_presence.stats(),
+        "socketio_bus": socketio_manager.stats() if socketio_manager is not None else None,
+    }), 200
+
 @app.route('/api/analyze-face', methods=['POST'])
 @jwt_required()
+@_routed_to_session_owner
 def analyze_face():
     current_user_identity = get_jwt_identity()
     print(f"[DEBUG_ANALYZE_FACE] Endpoint hit by user: {current_user_identity}", flush=True)
@@ -253,6 +549,7 @@ def analyze_face():
         alert_details = {}
         current_status_for_dashboard = "Unknown"
         snapshot_filename_for_alert = None
+        session_alert_counts = None
 
 
         if len(faces) == 0:
@@ -295,12 +592,11 @@ def analyze_face():
                 "event_type": "face_analyzed",
                 "details": {"eye_status": eye_status, "looking_away": eye_status != "forward", "face_count": len(faces)}
             }
-            try:
-                events_collection.insert_one(analyzed_event_data)
-            except Exception as db_exc:
-                print(f"[ERROR_ANALYZE_FACE] DB insert to events_collection failed: {db_exc}", flush=True)
-                # import sys; import traceback; traceback.print_exc(file=sys.stderr) # For more detailed logs if needed on server
-                return jsonify({"error": "Database error during event insertion.", "detail": str(db_exc)}), 500
+            if event_coalescer is not None:
+                event_coalescer.add(analyzed_event_data)
+            elif not event_writer.enqueue(analyzed_event_data):
+                # Buffer is full (database far behind); analysis result is still returned
+                print(f"[WARNING_ANALYZE_FACE] Event buffer full, dropped face_analyzed event for session {session_id}", flush=True)
             
             response_data = {"face_detected": True, "eye_status": eye_status, "looking_away": eye_status != "forward"}
             if len(faces) > 1: # This adds a warning if multiple faces, but still returns analysis of first.
@@ -333,11 +629,13 @@ def analyze_face():
                 "is_acknowledged": False 
             }
             try:
-                alerts_collection.insert_one(alert_doc)
+                _insert_alert(alert_doc)
             except Exception as db_exc:
+                # Neither stored nor spooled; the driver's message stays in the server log
                 print(f"[ERROR_ANALYZE_FACE] DB insert to alerts_collection failed: {db_exc}", flush=True)
                 # import sys; import traceback; traceback.print_exc(file=sys.stderr) # For more detailed logs if needed on server
-                return jsonify({"error": "Database error saving alert.", "detail": str(db_exc)}), 500
+                return jsonify({"error": "Database error saving alert."}), 500
+            session_alert_counts = alert_counters.record_alert(session_id, alert_doc["alert_type"], current_user_identity)
 
             print(f"[DEBUG_ANALYZE_FACE] Alert for {alert_details.get('message')} saved to DB with ID: {alert_id}. Emitting to admin.", flush=True)
             
@@ -347,31 +645,30 @@ def analyze_face():
                 alert_doc_for_emit['timestamp'] = alert_doc_for_emit['timestamp'].isoformat()
 
             # Emit the new alert to the admin dashboard
-            socketio.emit('new_alert', alert_doc_for_emit, room=admin_dashboard_room, namespace='/ws/admin_dashboard')
+            socketio.emit('new_alert', alert_doc_for_emit, room=_session_rooms(session_id, alerting=True), namespace='/ws/admin_dashboard')
             alert_type_for_log = alert_details.get("type", "unknown_type") # Safer for logging
             print(f"[DEBUG_ANALYZE_FACE] Alert '{alert_type_for_log}' saved and emitted for session {session_id}", flush=True)
 
         # --- Update active_sessions_store ---
-        session_entry = active_sessions_store.get(session_id)
+        now_iso = datetime.datetime.utcnow().isoformat()
+        session_fields = {
+            "last_seen": now_iso,
+            "last_face_analysis_status": current_status_for_dashboard,
+            "last_heartbeat_time": now_iso,
+            "last_event_timestamp": now_iso,
+        }
+        if is_alert:
+            session_fields["last_alert_type"] = alert_details.get("type")
+            session_fields["last_alert_timestamp"] = now_iso
+            if snapshot_filename_for_alert:
+                session_fields["last_alert_snapshot"] = snapshot_filename_for_alert
+        if session_alert_counts is not None:
+            session_fields["unread_alert_count"] = session_alert_counts["unread"]
+        # One atomic merge, so updates from other workers are not overwritten;
+        # admins get the changed fields in the next sessions_delta
+        session_entry = _update_live_session(session_id, session_fields)
         if session_entry: # Check if the session exists
-            session_entry.update({
-                "last_seen": datetime.datetime.utcnow().isoformat(),
-                "last_face_analysis_status": current_status_for_dashboard,
-                "last_alert_type": alert_details.get("type") if is_alert else session_entry.get("last_alert_type"),
-                "last_alert_timestamp": datetime.datetime.utcnow().isoformat() if is_alert else session_entry.get("last_alert_timestamp"),
-                "last_alert_snapshot": snapshot_filename_for_alert if is_alert and snapshot_filename_for_alert else session_entry.get("last_alert_snapshot")
-            })
-            session_entry["last_heartbeat_time"] = datetime.datetime.utcnow().isoformat()
-            session_entry['last_event_timestamp'] = datetime.datetime.utcnow().isoformat() 
-
-            updated_data_for_emit = { # This structure was simplified later, let's use session_entry directly
-                "session_id": session_id,
-                'data': session_entry 
-            }
-            socketio.emit('session_update', 
-                          updated_data_for_emit,
-                          room=admin_dashboard_room, namespace='/ws/admin_dashboard')
-            print(f"[DEBUG_ANALYZE_FACE] Emitted session_update for {session_id}, user {session_entry['student_username']}", flush=True)
+            print(f"[DEBUG_ANALYZE_FACE] Queued sessions_delta for {session_id}, user {session_entry['student_username']}", flush=True)
         else:
             print(f"[ERROR_ANALYZE_FACE] Session ID {session_id} not found in active_sessions_store. Cannot update. User: {current_user_identity}", flush=True)
             # This path does not return a 500, but response_data might still be the default error if this was the only path taken.
@@ -391,7 +688,7 @@ def analyze_face():
         # import sys
         # import traceback
         # traceback.print_exc(file=sys.stderr) # Or use app.logger.error with traceback
-        return jsonify({"error": "An internal server error occurred during face analysis core processing.", "detail": str(e)}), 500
+        return jsonify({"error": "An internal server error occurred during face analysis core processing."}), 500
 
 @app.route('/api/events', methods=['GET', 'OPTIONS'])
 @jwt_required()
@@ -407,25 +704,139 @@ def get_events():
 
     session_id = request.args.get('session_id')
     limit = request.args.get('limit', default=50, type=int) # Default to 50 events, allow override
+    # Coalesced face_analyzed ranges are returned as-is unless expansion is requested
+    expand_ranges = request.args.get('expand_ranges', 'false').lower() == 'true'
 
     query = {}
     if session_id:
-        query['session_id'] = session_id
+        query.update(event_store.session_filter(session_id, events_storage_mode))
 
     # Fetch events, sort by timestamp descending, limit results
     # Convert ObjectId to string for JSON serialization if needed, but pymongo handles datetime well.
     # For _id, if you plan to use it on the client, convert it: str(event['_id'])
     events = []
-    for event in events_collection.find(query).sort("timestamp", -1).limit(limit):
-        event['_id'] = str(event['_id']) # Convert ObjectId to string
-        if isinstance(event.get('timestamp'), datetime.datetime):
-            event['timestamp'] = event['timestamp'].isoformat() # Convert datetime to ISO string
-        events.append(event)
+    for stored_event in events_collection.find(query).sort("timestamp", -1).limit(limit):
+        stored_event = event_store.from_storage(stored_event, events_storage_mode)
+        for event in (expand_range(stored_event) if expand_ranges else [stored_event]):
+            if len(events) >= limit:
+                break
+            event['_id'] = str(event['_id']) # Convert ObjectId to string
+            for time_field in ('timestamp', 'end_timestamp'):
+                if isinstance(event.get(time_field), datetime.datetime):
+                    event[time_field] = event[time_field].isoformat() # Convert datetime to ISO string
+            if 'range_id' in event:
+                event['range_id'] = str(event['range_id'])
+            events.append(event)
     
     return jsonify(events)
 
+@app.route('/api/admin/export', methods=['GET', 'OPTIONS'])
+@jwt_required()
+def export_exam_data():
+    """Stream all events or alerts matching the filters as NDJSON or CSV.
+
+    Rows are ordered by (timestamp, _id). An interrupted export is resumed by
+    passing the last row's timestamp as `since` and its _id as `after_id`.
+
+    With `expand_ranges=true` the samples of a coalesced range follow the
+    range's own (timestamp, _id) position, and their ids are
+    `<range _id>:<sample index>`. Resuming after a sample only needs that id
+    as `after_id`: the export carries on with the range's remaining samples
+    and then everything after the range.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'OPTIONS request successful for /api/admin/export'}), 200
+
+    claims = get_jwt()
+    if claims.get("role") != 'admin':
+        return jsonify({"msg": "Administration rights required to export data."}), 403
+
+    kind = request.args.get('kind', 'events')
+    export_format = request.args.get('format', 'ndjson').lower()
+    if kind not in ('events', 'alerts'):
+        return jsonify({"msg": "kind must be 'events' or 'alerts'"}), 400
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"msg": "format must be 'ndjson' or 'csv'"}), 400
+
+    collection = events_collection if kind == 'events' else alerts_collection
+    storage_mode = events_storage_mode if kind == 'events' else event_store.STANDARD
+    expand_ranges = kind == 'events' and request.args.get('expand_ranges', 'false').lower() == 'true'
+
+    query = {}
+    session_id = request.args.get('session_id')
+    if session_id:
+        query.update(event_store.session_filter(session_id, storage_mode))
+    if kind == 'alerts' and request.args.get('alert_type'):
+        query['alert_type'] = request.args.get('alert_type')
+
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since_dt = datetime.datetime.fromisoformat(since.replace('Z', '+00:00')) if since else None
+        until_dt = datetime.datetime.fromisoformat(until.replace('Z', '+00:00')) if until else None
+    except ValueError:
+        return jsonify({"msg": "Invalid since/until format. Use ISO 8601."}), 400
+
+    after_id = request.args.get('after_id')
+    resume_range, resume_index = None, None
+    if after_id and expand_ranges and ':' in after_id:
+        # The last row was a sample: resume at its range's position, after that sample
+        range_id, _, sample_index = after_id.rpartition(':')
+        if not ObjectId.is_valid(range_id) or not sample_index.isdigit():
+            return jsonify({"msg": "Invalid after_id for an expanded range sample."}), 400
+        resume_range = collection.find_one({'_id': ObjectId(range_id)})
+        if resume_range is None or not resume_range.get('coalesced'):
+            return jsonify({"msg": "after_id refers to an unknown event range."}), 400
+        resume_range = event_store.from_storage(resume_range, storage_mode)
+        resume_index = int(sample_index)
+        since_dt, after_id = resume_range['timestamp'], resume_range['_id']
+    elif after_id and kind == 'events' and ObjectId.is_valid(after_id):
+        after_id = ObjectId(after_id)
+    if since_dt and after_id:
+        # Resume strictly after the last row received
+        query = {'$and': [query, pagination.keyset_filter('timestamp', ASCENDING, since_dt, after_id)]}
+    elif since_dt:
+        query['timestamp'] = {'$gte': since_dt}
+    if until_dt:
+        query = {'$and': [query, {'timestamp': {'$lte': until_dt}}]}
+
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+
+    def export_docs():
+        if resume_range is not None:
+            for sample in reversed(expand_range(resume_range)):
+                if int(sample['_id'].rpartition(':')[2]) > resume_index:
+                    yield sample
+        cursor = collection.find(query).sort([('timestamp', ASCENDING), ('_id', ASCENDING)]).batch_size(batch_size)
+        try:
+            for stored in cursor:
+                stored = event_store.from_storage(stored, storage_mode)
+                if expand_ranges:
+                    for sample in reversed(expand_range(stored)):
+                        yield sample
+                else:
+                    yield stored
+        finally:
+            cursor.close()
+
+    if export_format == 'csv':
+        columns = export_stream.EVENT_COLUMNS if kind == 'events' else export_stream.ALERT_COLUMNS
+        body = export_stream.iter_csv(export_docs(), columns)
+        mimetype = 'text/csv'
+    else:
+        body = export_stream.iter_ndjson(export_docs())
+        mimetype = 'application/x-ndjson'
+
+    export_name = f"{kind}_{session_id or 'all'}.{'csv' if export_format == 'csv' else 'ndjson'}"
+    print(f"[EXPORT] Admin {get_jwt_identity()} streaming {kind} export ({export_format}) for session {session_id or 'all'}", flush=True)
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_name}"'
+    response.headers['X-Accel-Buffering'] = 'no' # Let nginx pass chunks through as they are produced
+    return response
+
 @app.route('/api/analyze-audio', methods=['POST', 'OPTIONS'])
 @jwt_required()
+@_routed_to_session_owner
 def analyze_audio_chunk():
     # Custom debug logging for OPTIONS handling
     if request.method == 'OPTIONS':
@@ -452,6 +863,10 @@ def analyze_audio_chunk():
     # headers_str = '\n'.join([f'{key}: {value}' for key, value in request.headers.items()])
     # print(f"[AUDIO_ANALYSIS_DEBUG] POST Request Headers:\n{headers_str}", flush=True)
 
+    if request.mimetype != 'application/json':
+        return _analyze_binary_audio_chunk()
+
+    # Legacy clients: base64-encoded WAV inside a JSON body
     try:
         data = request.get_json()
         if not data:
@@ -478,9 +893,6 @@ def analyze_audio_chunk():
         current_user = get_jwt_identity()
         print(f"[AUDIO_ANALYSIS_INFO] Processing audio for user: {current_user}, session: {session_id}", flush=True)
 
-        # Ensure audio_files directory exists
-        os.makedirs(AUDIO_CHUNK_DIR, exist_ok=True)
-        
         # Decode Base64 audio data
         try:
             audio_bytes = base64.b64decode(audio_data_base64)
@@ -497,110 +909,15 @@ def analyze_audio_chunk():
             return jsonify({"msg": "Error decoding audio data"}), 500
 
 
-        # Save the audio chunk to a temporary WAV file
-        # Generate a unique filename to avoid collisions if multiple requests are processed concurrently.
-        # Adding timestamp and random element for uniqueness.
-        timestamp_str = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
-        random_suffix = uuid.uuid4().hex[:6]
-        temp_audio_filename = f"temp_audio_chunk_{session_id}_{timestamp_str}_{random_suffix}.wav"
-        temp_audio_filepath = os.path.join(AUDIO_CHUNK_DIR, temp_audio_filename)
-        
-        print(f"[AUDIO_ANALYSIS_DEBUG] Attempting to save decoded audio to: {temp_audio_filepath}", flush=True)
-        try:
-            with open(temp_audio_filepath, 'wb') as audio_file:
-                audio_file.write(audio_bytes)
-            print(f"[AUDIO_ANALYSIS_INFO] Audio chunk saved to {temp_audio_filepath}", flush=True)
-        except IOError as io_err:
-            print(f"[AUDIO_ANALYSIS_ERROR] Failed to write audio file {temp_audio_filepath}: {str(io_err)}", flush=True)
-            # import traceback
-            # print(traceback.format_exc(), flush=True)
-            return jsonify({"msg": "Failed to save audio data for analysis"}), 500
-        except Exception as e:
-            print(f"[AUDIO_ANALYSIS_ERROR] Unexpected error saving audio file {temp_audio_filepath}: {str(e)}", flush=True)
-            import traceback
-            print(traceback.format_exc(), flush=True)
-            return jsonify({"msg": "Unexpected error saving audio data"}), 500
-
-        # Analyze the audio file for sound events
-        # This function should return a list of detected event types or an empty list
+        # Parse the WAV in memory; PCM samples are a view onto audio_bytes
         try:
-            print(f"[AUDIO_ANALYSIS_DEBUG] Calling detect_sound_events for {temp_audio_filepath}", flush=True)
-            detected_events = detect_sound_events(temp_audio_filepath) # from sound_event_detection.py
-            print(f"[AUDIO_ANALYSIS_INFO] Detected sound events: {detected_events} in file {temp_audio_filepath}", flush=True)
-        except Exception as e:
-            print(f"[AUDIO_ANALYSIS_ERROR] Error during detect_sound_events for {temp_audio_filepath}: {str(e)}", flush=True)
-            import traceback
-            print(traceback.format_exc(), flush=True)
-            # Clean up the temp file even if analysis fails
-            if os.path.exists(temp_audio_filepath):
-                try:
-                    os.remove(temp_audio_filepath)
-                    print(f"[AUDIO_ANALYSIS_DEBUG] Cleaned up temp audio file after error: {temp_audio_filepath}", flush=True)
-                except Exception as rm_err:
-                    print(f"[AUDIO_ANALYSIS_ERROR] Failed to cleanup temp audio file {temp_audio_filepath} after error: {str(rm_err)}", flush=True)
-            return jsonify({"msg": f"Error analyzing audio: {str(e)}"}), 500
-        finally:
-            # Ensure the temporary file is deleted after analysis (or if an error occurs before this)
-            # This finally block might be redundant if the specific error handling above also cleans up.
-            if os.path.exists(temp_audio_filepath):
-                try:
-                    os.remove(temp_audio_filepath)
-                    # print(f"[AUDIO_ANALYSIS_DEBUG] Cleaned up temp audio file: {temp_audio_filepath}", flush=True)
-                except Exception as e:
-                    print(f"[AUDIO_ANALYSIS_ERROR] Error cleaning up temp audio file {temp_audio_filepath}: {str(e)}", flush=True)
-        
-        # Process detected events: save alerts, emit SocketIO events, etc.
-        # This part is similar to how face analysis alerts are handled.
-        alert_details_list = []
-        if detected_events:
-            print(f"[AUDIO_ANALYSIS_INFO] Processing {len(detected_events)} detected audio events for session {session_id}.", flush=True)
-            for event_type in detected_events:
-                alert_id = str(uuid.uuid4())
-                alert_data = {
-                    "_id": alert_id,
-                    "session_id": session_id,
-                    "student_username": current_user,
-                    "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                    "alert_type": "audio_event",
-                    "details": {
-                        "event": event_type,
-                        "description": f"Sound event detected: {event_type}",
-                        "source_file": temp_audio_filename # Store the temp filename for reference if needed
-                    },
-                    "severity": "medium",  # Or determine severity based on event_type
-                    "is_dismissed": False,
-                    "snapshot_filename": None # No visual snapshot for audio events
-                }
-                try:
-                    alerts_collection.insert_one(alert_data)
-                    print(f"[AUDIO_ANALYSIS_INFO] Audio alert for event '{event_type}' (ID: {alert_id}) saved to DB for session {session_id}.", flush=True)
-                    
-                    # Prepare alert for SocketIO emission (without ObjectId for JSON serialization)
-                    alert_for_socket = alert_data.copy()
-                    # alert_for_socket['_id'] = str(alert_for_socket['_id']) # Already a string from uuid
-                    
-                    socketio.emit('new_alert', alert_for_socket, room=admin_dashboard_room, namespace='/ws/admin_dashboard')
-                    print(f"[AUDIO_ANALYSIS_INFO] Emitted 'new_alert' via SocketIO for audio event '{event_type}' (Alert ID: {alert_id}) to admin dashboard for session {session_id}.", flush=True)
-                    alert_details_list.append(alert_data['details'])
-                except Exception as e:
-                    print(f"[AUDIO_ANALYSIS_ERROR] Failed to save/emit audio alert for event '{event_type}' (session {session_id}): {str(e)}", flush=True)
-                    import traceback
-                    print(traceback.format_exc(), flush=True)
-                    # Continue processing other events if one fails
-
-            # Also update the main session document with the latest audio alert info
-            update_session_with_event(session_id, "audio_event", {"last_audio_events": alert_details_list})
-            print(f"[AUDIO_ANALYSIS_INFO] Updated session {session_id} with latest audio event details.", flush=True)
-        else:
-            print(f"[AUDIO_ANALYSIS_INFO] No significant sound events detected in chunk for session {session_id}.", flush=True)
+            samples, sample_rate = audio_io.decode_wav(audio_bytes)
+            print(f"[AUDIO_ANALYSIS_DEBUG] Decoded WAV: {samples.shape[0]} frames ({samples.dtype}) at {sample_rate} Hz", flush=True)
+        except audio_io.AudioDecodeError as decode_error:
+            print(f"[AUDIO_ANALYSIS_ERROR] WAV decoding failed: {str(decode_error)}", flush=True)
+            return jsonify({"msg": f"Invalid WAV audio data: {decode_error}"}), 400
 
-        # Return a summary of detected events or a success message
-        return jsonify({
-            "msg": "Audio chunk analyzed successfully.",
-            "session_id": session_id,
-            "detected_events": detected_events, # List of event types
-            "alerts_created": len(alert_details_list)
-        }), 200
+        return _process_audio_chunk(session_id, current_user, samples, sample_rate)
 
     except Exception as e:
         # This is a catch-all for any errors not caught by more specific handlers above
@@ -610,6 +927,209 @@ def analyze_audio_chunk():
         print(traceback.format_exc(), flush=True)
         return jsonify({"msg": "An unexpected error occurred during audio analysis.", "error": str(e)}), 500
 
+def _analyze_binary_audio_chunk():
+    """
+    Binary ingest: the body is the audio itself (application/octet-stream).
+
+    X-Session-Id    session the chunk belongs to (required)
+    X-Audio-Format  's16le' (default), 'f32le', 's32le', 'u8' raw PCM, or 'wav'
+    X-Sample-Rate   required for raw PCM; taken from the header for 'wav'
+    X-Audio-Channels  interleaved channels in raw PCM (default 1)
+    X-Audio-Sequence  chunk number within the session's stream (optional)
+    """
+    session_id = request.headers.get('X-Session-Id')
+    audio_format = request.headers.get('X-Audio-Format', 's16le').lower()
+    if not session_id:
+        print("[AUDIO_ANALYSIS_ERROR] X-Session-Id header is missing from binary audio request.", flush=True)
+        return jsonify({"msg": "X-Session-Id header is required"}), 400
+
+    current_user = get_jwt_identity()
+    try:
+        audio_bytes = request.get_data(cache=False)
+        if not audio_bytes:
+            return jsonify({"msg": "Request body is empty"}), 400
+
+        try:
+            if audio_format == 'wav':
+                samples, sample_rate = audio_io.decode_wav(audio_bytes)
+            else:
+                sample_rate = request.headers.get('X-Sample-Rate', type=int)
+                channels = request.headers.get('X-Audio-Channels', default=1, type=int)
+                if not sample_rate or sample_rate <= 0:
+                    return jsonify({"msg": "X-Sample-Rate header is required for raw PCM"}), 400
+                samples = audio_io.decode_pcm(audio_bytes, audio_format, channels)
+        except audio_io.AudioDecodeError as decode_error:
+            print(f"[AUDIO_ANALYSIS_ERROR] Binary audio decoding failed for session {session_id}: {str(decode_error)}", flush=True)
+            return jsonify({"msg": f"Invalid audio data: {decode_error}"}), 400
+
+        print(f"[AUDIO_ANALYSIS_DEBUG] Binary audio for session {session_id}: {len(audio_bytes)} bytes, {audio_format}, {sample_rate} Hz", flush=True)
+        sequence = request.headers.get('X-Audio-Sequence', type=int)
+        return _process_audio_chunk(session_id, current_user, samples, sample_rate, sequence)
+    except Exception as e:
+        print(f"[AUDIO_ANALYSIS_FATAL_ERROR] An unexpected error occurred in binary audio ingest for session {session_id}: {str(e)}", flush=True)
+        import traceback
+        print(traceback.format_exc(), flush=True)
+        return jsonify({"msg": "An unexpected error occurred during audio analysis.", "error": str(e)}), 500
+
+def _process_audio_chunk(session_id, current_user, samples, sample_rate, sequence=None):
+    """Run sound event detection on decoded samples and raise alerts (JSON and binary ingest)."""
+    # Analyze the audio samples for sound events
+    # This function should return a list of detected event types or an empty list
+    try:
+        # Consecutive chunks of a session are analysed as one stream; silent
+        # chunks stop after the energy gate
+        samples = audio_io.to_float32(samples)
+        analysis = _analyze_audio_samples(session_id, samples, sample_rate)
+        detected_events = analysis["events"]
+        if analysis["status"] != "silence":
+            print(f"[AUDIO_ANALYSIS_INFO] Detected sound events: {[event['event_type'] for event in detected_events]} for session {session_id}", flush=True)
+    except Exception as e:
+        print(f"[AUDIO_ANALYSIS_ERROR] Error during sound event detection for session {session_id}: {str(e)}", flush=True)
+        import traceback
+        print(traceback.format_exc(), flush=True)
+        return jsonify({"msg": f"Error analyzing audio: {str(e)}"}), 500
+    
+    if audio_recorder is not None:
+        try:
+            audio_recorder.append(session_id, samples, sample_rate, sequence)
+        except Exception as e:
+            print(f"[AUDIO_EVIDENCE_ERROR] Could not buffer audio for session {session_id}: {str(e)}", flush=True)
+
+    # Process detected events: save alerts, emit SocketIO events, etc.
+    # This part is similar to how face analysis alerts are handled.
+    alert_details_list = []
+    if detected_events:
+        print(f"[AUDIO_ANALYSIS_INFO] Processing {len(detected_events)} detected audio events for session {session_id}.", flush=True)
+        for sound_event in detected_events:
+            event_type = sound_event["event_type"]
+            event_timestamp = datetime.datetime.utcnow()
+            alert_id = str(uuid.uuid4())
+            audio_filename = _retain_sound_event_audio(session_id, alert_id, sound_event)
+            # Logged to proctoring_events like face analysis, then raised as an alert
+            if not event_writer.enqueue({
+                "session_id": session_id,
+                "username": current_user,
+                "timestamp": event_timestamp,
+                "event_type": event_type,
+                "details": {**sound_event["details"], "audio_filename": audio_filename},
+            }):
+                print(f"[AUDIO_ANALYSIS_WARNING] Event buffer full; dropped {event_type} event for session {session_id}", flush=True)
+
+            alert_data = {
+                "_id": alert_id,
+                "session_id": session_id,
+                "student_username": current_user,
+                "timestamp": event_timestamp,
+                "alert_type": event_type,
+                "message": _describe_sound_event(sound_event),
+                "details": {
+                    **sound_event["details"],
+                    "event": event_type,
+                    "description": _describe_sound_event(sound_event),
+                },
+                "severity": "medium",  # Or determine severity based on event_type
+                "is_dismissed": False,
+                "snapshot_filename": None, # No visual snapshot for audio events
+                "audio_filename": audio_filename, # Padded clip of the event, served by /api/audio_files
+            }
+            try:
+                _insert_alert(alert_data)
+                print(f"[AUDIO_ANALYSIS_INFO] Audio alert for event '{event_type}' (ID: {alert_id}) saved to DB for session {session_id}.", flush=True)
+                session_alert_counts = alert_counters.record_alert(session_id, alert_data["alert_type"], current_user)
+                _update_live_session(session_id, {"unread_alert_count": session_alert_counts["unread"]})
+                
+                # Prepare alert for SocketIO emission (without ObjectId for JSON serialization)
+                alert_for_socket = alert_data.copy()
+                alert_for_socket['timestamp'] = alert_for_socket['timestamp'].isoformat()
+                # alert_for_socket['_id'] = str(alert_for_socket['_id']) # Already a string from uuid
+                
+                socketio.emit('new_alert', alert_for_socket, room=_session_rooms(session_id, alerting=True), namespace='/ws/admin_dashboard')
+                print(f"[AUDIO_ANALYSIS_INFO] Emitted 'new_alert' via SocketIO for audio event '{event_type}' (Alert ID: {alert_id}) to admin dashboard for session {session_id}.", flush=True)
+                alert_details_list.append(alert_data['details'])
+            except Exception as e:
+                print(f"[AUDIO_ANALYSIS_ERROR] Failed to save/emit audio alert for event '{event_type}' (session {session_id}): {str(e)}", flush=True)
+                import traceback
+                print(traceback.format_exc(), flush=True)
+                # Continue processing other events if one fails
+
+        # Also update the main session document with the latest audio alert info
+        update_session_with_event(session_id, "audio_event", {
+            "audio_status": analysis["status"],
+            "audio_level_dbfs": analysis["peak_dbfs"],
+            "audio_noise_floor_dbfs": analysis["noise_floor_dbfs"],
+            "latest_audio_event_summary": ", ".join(_describe_sound_event(event) for event in detected_events),
+            "last_audio_events": alert_details_list,
+        })
+        print(f"[AUDIO_ANALYSIS_INFO] Updated session {session_id} with latest audio event details.", flush=True)
+    else:
+        # Keep the session's audio status current; the dashboard only needs a
+        # push when it changes, not for every quiet chunk
+        session_entry = active_sessions_store.get(session_id)
+        status_changed = session_entry is not None and session_entry.get("audio_status") != analysis["status"]
+        update_session_with_event(session_id, "audio_status", {
+            "audio_status": analysis["status"],
+            "audio_level_dbfs": analysis["peak_dbfs"],
+            "audio_noise_floor_dbfs": analysis["noise_floor_dbfs"],
+        }, emit=status_changed)
+
+    # Clips of events that ended in this chunk stop after their trailing padding
+    if audio_recorder is not None:
+        for ended_event in analysis.get("ended_events", []):
+            try:
+                audio_recorder.end_event(session_id, ended_event["event_type"],
+                                         ended_event["start_offset_seconds"], ended_event["duration_seconds"])
+            except Exception as e:
+                print(f"[AUDIO_EVIDENCE_ERROR] Could not close clip for session {session_id}: {str(e)}", flush=True)
+
+    # Return a summary of detected events or a success message
+    return jsonify({
+        "msg": "Audio chunk analyzed successfully.",
+        "session_id": session_id,
+        "status": analysis["status"],
+        "detected_events": [event["event_type"] for event in detected_events], # List of event types
+        "events": detected_events,
+        "alerts_created": len(alert_details_list)
+    }), 200
+
+def _retain_sound_event_audio(session_id, alert_id, sound_event):
+    """Keep the padded audio of a sound event; returns its clip filename or None."""
+    if audio_recorder is None:
+        return None
+    details = sound_event["details"]
+    duration = details.get("noise_duration_seconds", details.get("detected_speech_duration_seconds", 0.0))
+    try:
+        # Reported at its minimum duration; the clip is extended when the analyzer reports the end
+        return audio_recorder.capture(session_id, alert_id, details.get("start_offset_seconds", 0.0), duration,
+                                      event_type=sound_event["event_type"])
+    except Exception as e:
+        print(f"[AUDIO_EVIDENCE_ERROR] Could not retain audio for alert {alert_id} (session {session_id}): {str(e)}", flush=True)
+        return None
+
+def _describe_sound_event(sound_event):
+    details = sound_event["details"]
+    if sound_event["event_type"] == "speech_detected":
+        return f"Speech detected for {details['detected_speech_duration_seconds']:.1f}s"
+    if sound_event["event_type"] == "loud_noise_detected":
+        return f"Loud noise for {details['noise_duration_seconds']:.1f}s (peak {details['peak_rms_dbfs']:.1f} dBFS)"
+    return f"Sound event detected: {sound_event['event_type']}"
+
+def update_session_with_event(session_id, event_type, details, emit=True):
+    """
+    Merge the latest non-face event into the live session entry and queue the
+    changed fields for the admin dashboard (unless ``emit`` is false), as
+    analyze_face does for face results.
+    """
+    now = datetime.datetime.utcnow().isoformat()
+    session_entry = _update_live_session(session_id, {
+        **details,
+        "last_heartbeat_time": now,
+        "last_event_timestamp": now,
+    }, broadcast=emit)
+    if session_entry is None:
+        print(f"[SESSION_UPDATE] Session {session_id} not active; {event_type} not recorded on it", flush=True)
+        return False
+    return True
+
 @app.route('/api/audio_files/<path:filename>', methods=['GET', 'OPTIONS'])
 @jwt_required()
 def get_audio_file(filename):
@@ -627,6 +1147,15 @@ def get_audio_file(filename):
     
     print(f"[AUDIO_FILE_ACCESS] Admin {get_jwt_identity()} requesting audio file: {filename} from {AUDIO_CHUNK_DIR}", flush=True)
     try:
+        clip = audio_evidence.read_clip(audio_segments, filename) if audio_segments is not None else None
+        if clip is not None:
+            data, mimetype = clip
+            response = Response(data, mimetype=mimetype)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            # Stored clips never change
+            response.headers['Cache-Control'] = 'private, max-age=86400, immutable'
+            return response
+        # Clips are written once their trailing padding arrives; loose files predate segments
         return send_from_directory(AUDIO_CHUNK_DIR, filename, as_attachment=True)
     except FileNotFoundError:
         print(f"[AUDIO_FILE_ERROR] File not found: {filename} in {AUDIO_CHUNK_DIR}", flush=True)
@@ -663,6 +1192,7 @@ def get_admin_alerts():
         if per_page < 1: per_page = 1
         if per_page > 100: per_page = 100 # Max limit
         skip = (page - 1) * per_page
+        cursor_token = request.args.get('cursor') # Opaque next/prev cursor from a previous response
 
         # Filtering parameters
         query = {}
@@ -701,13 +1231,46 @@ def get_admin_alerts():
             
         order_str = request.args.get('order', 'desc').lower()
         sort_direction = DESCENDING if order_str == 'desc' else ASCENDING
+        fingerprint = pagination.query_fingerprint(query, sort_by, sort_direction)
 
-        # Fetch alerts with filters, sorting, and pagination
-        alerts_cursor = alerts_collection.find(query).sort(sort_by, sort_direction).skip(skip).limit(per_page)
-        retrieved_alerts = list(alerts_cursor)
-
-        # Get total count for pagination
-        total_alerts = alerts_collection.count_documents(query)
+        # Fetch alerts with filters, sorting, and pagination.
+        # _id breaks ties so keyset cursors are stable across equal sort values.
+        if cursor_token:
+            try:
+                cursor_value, cursor_id, backwards = pagination.decode_cursor(cursor_token, fingerprint)
+                # A "prev" cursor walks the opposite direction and the page is flipped back afterwards
+                scan_direction = -sort_direction if backwards else sort_direction
+                after_cursor = pagination.keyset_filter(sort_by, scan_direction, cursor_value, cursor_id)
+            except pagination.InvalidCursor as e:
+                return jsonify({"msg": str(e)}), 400
+            page_query = {'$and': [query, after_cursor]}
+            alerts_cursor = alerts_collection.find(page_query).sort([(sort_by, scan_direction), ('_id', scan_direction)]).limit(per_page + 1)
+            retrieved_alerts = list(alerts_cursor)
+            has_more = len(retrieved_alerts) > per_page
+            retrieved_alerts = retrieved_alerts[:per_page]
+            if backwards:
+                retrieved_alerts.reverse()
+            has_next = has_more if not backwards else True
+            has_prev = has_more if backwards else True
+        else:
+            # Page numbers stay supported for shallow pages; deep pages must use cursors
+            if skip > app.config['ALERTS_MAX_PAGE_SKIP']:
+                return jsonify({"msg": "Page too deep for page-number pagination. Use the cursor returned as next_cursor."}), 400
+            alerts_cursor = alerts_collection.find(query).sort([(sort_by, sort_direction), ('_id', sort_direction)]).skip(skip).limit(per_page + 1)
+            retrieved_alerts = list(alerts_cursor)
+            has_next = len(retrieved_alerts) > per_page
+            retrieved_alerts = retrieved_alerts[:per_page]
+            has_prev = page > 1
+
+        next_cursor = prev_cursor = None
+        if retrieved_alerts:
+            if has_next:
+                next_cursor = pagination.encode_cursor(retrieved_alerts[-1], sort_by, sort_direction, fingerprint)
+            if has_prev:
+                prev_cursor = pagination.encode_cursor(retrieved_alerts[0], sort_by, sort_direction, fingerprint, backwards=True)
+
+        # Totals come from a short-TTL cache (or collection metadata when unfiltered)
+        total_alerts, total_is_estimate = alert_count_cache.count(alerts_collection, query)
         total_pages = math.ceil(total_alerts / per_page) if per_page > 0 else 0
         if total_pages == 0 and total_alerts > 0 : total_pages = 1 # if less items than per_page
 
@@ -724,13 +1287,120 @@ def get_admin_alerts():
             "total_pages": total_pages,
             "current_page": page,
             "total_alerts": total_alerts,
-            "per_page": per_page
+            "total_is_estimate": total_is_estimate,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor
         }
         return jsonify(response_data), 200
+    except data_access.DatabaseUnavailable:
+        raise # Answered with 503 by handle_database_unavailable
     except Exception as e:
         print(f"[ERROR] Could not retrieve alerts: {str(e)}", flush=True)
         return jsonify({"msg": "Failed to retrieve alerts", "error": str(e)}), 500
 
+@app.route('/api/admin/alerts/<alert_id>/acknowledge', methods=['POST', 'OPTIONS'])
+@jwt_required()
+def acknowledge_alert(alert_id):
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'OPTIONS request successful for /api/admin/alerts/<alert_id>/acknowledge'}), 200
+
+    claims = get_jwt()
+    if claims.get("role") != 'admin':
+        return jsonify({"msg": "Administration rights required to acknowledge alerts."}), 403
+
+    try:
+        # Only the request that flips the flag decrements the unread counters
+        alert = alerts_collection.find_one_and_update(
+            {"_id": alert_id, "is_acknowledged": {"$ne": True}},
+            {"$set": {
+                "is_acknowledged": True,
+                "acknowledged_by": get_jwt_identity(),
+                "acknowledged_at": datetime.datetime.utcnow()
+            }},
+            projection={"session_id": 1, "alert_type": 1}
+        )
+        if alert is None:
+            if alerts_collection.count_documents({"_id": alert_id}, limit=1):
+                return jsonify({"msg": "Alert already acknowledged", "alert_id": alert_id}), 200
+            return jsonify({"msg": "Alert not found"}), 404
+
+        counts = alert_counters.record_acknowledged(alert["session_id"], alert.get("alert_type"))
+        _update_live_session(alert["session_id"], {"unread_alert_count": counts["unread"]})
+        return jsonify({"msg": "Alert acknowledged", "alert_id": alert_id, "session_id": alert["session_id"], "counts": counts}), 200
+    except data_access.DatabaseUnavailable:
+        raise # Answered with 503 by handle_database_unavailable
+    except Exception as e:
+        print(f"[ERROR] Could not acknowledge alert {alert_id}: {str(e)}", flush=True)
+        return jsonify({"msg": "Failed to acknowledge alert", "error": str(e)}), 500
+
+@app.route('/api/admin/alerts/counts', methods=['GET', 'OPTIONS'])
+@jwt_required()
+def get_admin_alert_counts():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'OPTIONS request successful for /api/admin/alerts/counts'}), 200
+
+    claims = get_jwt()
+    if claims.get("role") != 'admin':
+        return jsonify({"msg": "Administration rights required to view alert counts."}), 403
+
+    try:
+        session_id = request.args.get('session_id')
+        if session_id:
+            return jsonify({"session_id": session_id, "counts": alert_counters.get(session_id)}), 200
+
+        query = {}
+        if request.args.get('student_username'):
+            query['student_username'] = request.args.get('student_username')
+        sessions, totals = alert_counters.all_sessions(query)
+        for doc in sessions:
+            if isinstance(doc.get('updated_at'), datetime.datetime):
+                doc['updated_at'] = doc['updated_at'].isoformat()
+        return jsonify({"totals": totals, "sessions": sessions}), 200
+    except data_access.DatabaseUnavailable:
+        raise # Answered with 503 by handle_database_unavailable
+    except Exception as e:
+        print(f"[ERROR] Could not retrieve alert counts: {str(e)}", flush=True)
+        return jsonify({"msg": "Failed to retrieve alert counts", "error": str(e)}), 500
+
+@app.route('/api/admin/sessions/<session_id>/summary', methods=['GET', 'OPTIONS'])
+@jwt_required()
+def get_session_summary(session_id):
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'OPTIONS request successful for /api/admin/sessions/summary'}), 200
+
+    claims = get_jwt()
+    if claims.get("role") != 'admin':
+        return jsonify({"msg": "Administration rights required to view session summaries."}), 403
+
+    try:
+        summary = session_summaries_collection.find_one({"_id": session_id})
+        if summary is None:
+            if session_id in active_sessions_store:
+                return jsonify({"msg": "Session is still active; its summary is built when it ends."}), 404
+            # Sessions that ended before summaries existed, or whose worker died, are built on first read
+            summary = _build_session_summary(session_id, None, None)
+            if summary["face_samples"] == 0 and summary["total_alerts"] == 0:
+                return jsonify({"msg": "No data found for this session."}), 404
+            session_summaries_collection.replace_one({"_id": session_id}, summary, upsert=True)
+
+        for snapshot in summary.get("snapshots", []):
+            snapshot["alert_id"] = str(snapshot["alert_id"])
+            if isinstance(snapshot.get("timestamp"), datetime.datetime):
+                snapshot["timestamp"] = snapshot["timestamp"].isoformat()
+        streak = summary.get("longest_away_streak")
+        if streak:
+            streak["start"] = streak["start"].isoformat()
+            streak["end"] = streak["end"].isoformat()
+        summary["generated_at"] = summary["generated_at"].isoformat()
+        summary["session_id"] = summary.pop("_id")
+        return jsonify(summary), 200
+    except data_access.DatabaseUnavailable:
+        raise # Answered with 503 by handle_database_unavailable
+    except Exception as e:
+        print(f"[ERROR] Could not retrieve summary for session {session_id}: {str(e)}", flush=True)
+        return jsonify({"msg": "Failed to retrieve session summary", "error": str(e)}), 500
+
 @app.route('/api/admin/snapshots/<path:filename>', methods=['GET', 'OPTIONS'])
 @jwt_required()
 def get_admin_snapshot(filename):
@@ -746,14 +1416,113 @@ def get_admin_snapshot(filename):
     
     print(f"[SNAPSHOT_ACCESS] Admin {get_jwt_identity()} requesting snapshot: {filename} from {SNAPSHOT_DIR}", flush=True)
     try:
-        return send_from_directory(SNAPSHOT_DIR, filename, as_attachment=False, mimetype='image/jpeg')
-    except FileNotFoundError:
-        print(f"[SNAPSHOT_ERROR] Snapshot not found: {filename} in {SNAPSHOT_DIR}", flush=True)
-        return jsonify({"msg": "Snapshot not found."}), 404
+        # Finished sessions are served from their packed segment (one seek, one read)
+        snapshot_bytes = _read_packed_snapshot(filename)
+        if snapshot_bytes is None and os.path.isfile(os.path.join(SNAPSHOT_DIR, filename)):
+            return send_from_directory(SNAPSHOT_DIR, filename, as_attachment=False, mimetype='image/jpeg')
+        if snapshot_bytes is None:
+            # The loose file may have been compacted between the two checks
+            snapshot_bytes = _read_packed_snapshot(filename)
+        if snapshot_bytes is None:
+            print(f"[SNAPSHOT_ERROR] Snapshot not found: {filename} in {SNAPSHOT_DIR}", flush=True)
+            return jsonify({"msg": "Snapshot not found."}), 404
+        response = Response(snapshot_bytes, mimetype='image/jpeg')
+        # Packed snapshots never change, so the alert log can reuse them while browsing
+        response.headers['Cache-Control'] = 'private, max-age=86400, immutable'
+        return response
     except Exception as e:
         print(f"[SNAPSHOT_ERROR] Error serving snapshot {filename}: {str(e)}", flush=True)
         return jsonify({"msg": "Error serving snapshot."}), 500
 
+def _read_packed_snapshot(filename):
+    """Return snapshot bytes from its session segment, or None if not packed."""
+    if snapshot_segments is None:
+        return None
+    snapshot_session_id = session_id_from_filename(filename)
+    if not snapshot_session_id:
+        return None
+    return snapshot_segments.read(snapshot_session_id, filename)
+
+def _compact_session_snapshots(session_id):
+    """Pack a finished session's loose snapshots into its segment file."""
+    if snapshot_segments is None:
+        return
+    try:
+        packed = snapshot_segments.compact_directory(session_id, SNAPSHOT_DIR)
+        print(f"[SNAPSHOT_COMPACTION] Packed {packed} snapshots for session {session_id}", flush=True)
+    except Exception as e:
+        print(f"[SNAPSHOT_COMPACTION_ERROR] Failed to pack snapshots for session {session_id}: {str(e)}", flush=True)
+
+def _finalize_session(session_id, session_data, reason):
+    """
+    Wrap up a session that has left active_sessions_store (stopped, replaced
+    or abandoned): close its open event range and hand the summary and
+    snapshot packing to a background task.
+
+    Its open range and audio state are held by the worker that owns it, so
+    when that is another worker the work is handed to it.
+    """
+    session_broadcaster.discard(session_id)
+    if session_router is not None and session_router.delegate(
+            session_id, session_data, f'/internal/sessions/{session_id}/finalize',
+            {"session_data": session_data, "reason": reason}):
+        return
+    _finalize_owned_session(session_id, session_data, reason)
+
+def _finalize_owned_session(session_id, session_data, reason):
+    if event_coalescer is not None:
+        event_coalescer.close_session(session_id)
+    if audio_analyzer is not None:
+        audio_analyzer.close_session(session_id)
+    socketio.start_background_task(_finalize_session_background, session_id, dict(session_data or {}), reason)
+
+@app.route('/internal/sessions/<session_id>/finalize', methods=['POST'])
+def finalize_owned_session(session_id):
+    """_finalize_session handed over by another worker; only served on the private socket."""
+    if not is_internal(request.environ):
+        return jsonify({"msg": "Not found"}), 404
+    data = request.get_json()
+    session_broadcaster.discard(session_id)
+    _finalize_owned_session(session_id, data.get('session_data'), data.get('reason'))
+    return jsonify({"msg": "Session finalized"}), 200
+
+def _finalize_session_background(session_id, session_data, reason):
+    # The closed range may still be buffered; write it before aggregating
+    event_writer.flush()
+    if audio_recorder is not None:
+        audio_recorder.close_session(session_id)
+    _store_session_summary(session_id, session_data, reason)
+    alert_counters.forget(session_id)
+    _compact_session_snapshots(session_id)
+
+def _end_expired_session(session_id, session_data):
+    """Called by the reaper for a session removed after its heartbeat TTL."""
+    socketio.emit('student_session_ended', {"session_id": session_id, "reason": "heartbeat_timeout"},
+                  room=admin_rooms.session_rooms(session_data, alerting=True), namespace='/ws/admin_dashboard')
+    print(f"[SocketIO] Broadcast 'student_session_ended' (heartbeat timeout) for session {session_id}", flush=True)
+    _finalize_session(session_id, session_data, "heartbeat_timeout")
+
+def _build_session_summary(session_id, session_data, reason):
+    return session_summary.build_session_summary(
+        events_collection, alerts_collection, session_id,
+        session_info=session_data,
+        storage_mode=events_storage_mode,
+        end_reason=reason,
+        sample_interval=app.config['SESSION_SUMMARY_SAMPLE_INTERVAL_SECONDS'],
+        max_gap=app.config['EVENT_RANGE_MAX_GAP_SECONDS'],
+    )
+
+def _store_session_summary(session_id, session_data, reason):
+    """Aggregate a finished session into its session_summaries document."""
+    try:
+        summary = _build_session_summary(session_id, session_data, reason)
+        session_summaries_collection.replace_one({"_id": session_id}, summary, upsert=True)
+        print(f"[SESSION_SUMMARY] Stored summary for session {session_id} ({summary['face_samples']} samples, {summary['total_alerts']} alerts)", flush=True)
+        return summary
+    except Exception as e:
+        print(f"[SESSION_SUMMARY_ERROR] Failed to build summary for session {session_id}: {str(e)}", flush=True)
+        return None
+
 def _build_cors_preflight_response():
     response = jsonify({'message': 'CORS preflight successful'})
     # These headers are often managed by Flask-Cors with @cross_origin, 
@@ -853,6 +1622,82 @@ def handle_admin_disconnect():
     print(f"[SocketIO] Admin client disconnected from /ws/admin_dashboard: {request.sid}", flush=True)
     leave_room(admin_dashboard_room)
 
+def _as_list(value):
+    if value is None or value == '':
+        return []
+    return [value] if isinstance(value, str) else [str(item) for item in value if item]
+
+@socketio.on('subscribe', namespace='/ws/admin_dashboard')
+def handle_admin_subscribe(data):
+    """
+    Replace this admin's subscription: ``{"exam_ids": [...], "proctor_groups": [...],
+    "alerts_only": bool}``; no exams or groups means every session.
+    Only admins stay connected to this namespace (see handle_admin_connect).
+    """
+    data = data or {}
+    exam_ids = _as_list(data.get('exam_ids'))
+    proctor_groups = _as_list(data.get('proctor_groups'))
+    alerts_only = bool(data.get('alerts_only'))
+    for room in rooms(sid=request.sid, namespace='/ws/admin_dashboard'):
+        if admin_rooms.is_admin_room(room):
+            leave_room(room)
+    joined = admin_rooms.subscription_rooms(exam_ids, proctor_groups, alerts_only)
+    for room in joined:
+        join_room(room)
+    print(f"[SocketIO] Admin SID {request.sid} subscribed to {joined}", flush=True)
+    emit('subscribed', {"exam_ids": exam_ids, "proctor_groups": proctor_groups, "alerts_only": alerts_only, "rooms": joined})
+
+def _decode_socket_token(auth_header):
+    """Claims of a 'Bearer <JWT>' passed on a Socket.IO connect, or None if it is missing or invalid."""
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    from flask_jwt_extended.utils import decode_token
+    try:
+        with app.app_context():
+            return decode_token(auth_header.split(' ', 1)[1])
+    except Exception as e:
+        print(f"[SocketIO Auth] Could not decode token: {str(e)}", flush=True)
+        return None
+
+# Students hold one connection per monitoring session: authenticated once here,
+# kept alive by Engine.IO ping/pong, and its close is reported to admins at once
+@socketio.on('connect', namespace='/ws/student')
+def handle_student_connect():
+    claims = _decode_socket_token(request.args.get('token'))
+    session_id = request.args.get('session_id')
+    if claims is None or not session_id:
+        print(f"[SocketIO Auth] Student connection without valid token or session_id refused (SID: {request.sid})", flush=True)
+        return False
+    user_identity = claims.get(app.config.get("JWT_IDENTITY_CLAIM", "sub"))
+    session_entry = active_sessions_store.get(session_id)
+    if session_entry is None or session_entry.get("student_username") != user_identity:
+        print(f"[SocketIO Auth] '{user_identity}' has no active session {session_id}; connection refused", flush=True)
+        return False
+
+    first_socket = student_presence.connect(request.sid, session_id)
+    session_entry = _update_live_session(session_id, {
+        "student_connected": True,
+        "last_heartbeat_time": datetime.datetime.utcnow().isoformat(),
+    })
+    if first_socket and session_entry is not None:
+        socketio.emit('student_connected', {"session_id": session_id},
+                      room=admin_rooms.session_rooms(session_entry), namespace='/ws/admin_dashboard')
+    print(f"[SocketIO] Student '{user_identity}' connected to /ws/student for session {session_id} (SID: {request.sid})", flush=True)
+    emit('connection_ack', {'message': 'Connected', 'session_id': session_id})
+
+@socketio.on('disconnect', namespace='/ws/student')
+def handle_student_disconnect():
+    session_id = student_presence.disconnect(request.sid)
+    if session_id is None:
+        return  # Another socket of the session is still open on this worker
+    now = datetime.datetime.utcnow().isoformat()
+    session_entry = _update_live_session(session_id, {"student_connected": False, "last_disconnect_time": now})
+    if session_entry is None:
+        return  # Session already ended (stop, replacement or reaper)
+    socketio.emit('student_disconnected', {"session_id": session_id, "at": now},
+                  room=admin_rooms.session_rooms(session_entry), namespace='/ws/admin_dashboard')
+    print(f"[SocketIO] Student socket for session {session_id} disconnected; admins notified", flush=True)
+
 # --- Student Monitoring Session Management Endpoints (Task 3.2.2) ---
 
 @app.route('/api/student/monitoring/start', methods=['POST', 'OPTIONS'])
@@ -873,24 +1718,29 @@ def start_monitoring_session():
     
     # --- BEGIN MODIFICATION: Clean up existing sessions for the same user ---
     existing_session_ids_for_user = []
-    for sid, sdata in list(active_sessions_store.items()): # Iterate over a copy for safe deletion
+    for sid, sdata in active_sessions_store.items(): # items() returns a snapshot
         if sdata.get("student_username") == current_user:
             existing_session_ids_for_user.append(sid)
 
     for old_sid in existing_session_ids_for_user:
         if old_sid == new_session_id: # Should not happen if frontend generates unique IDs, but good check
             continue 
-        if old_sid in active_sessions_store: # Double check it still exists
-            del active_sessions_store[old_sid]
+        old_session_data = active_sessions_store.pop(old_sid)
+        if old_session_data is not None: # Another worker may already have ended it
             print(f"[Session Cleanup] Implicitly stopped and removed old session '{old_sid}' for user '{current_user}' before starting new session '{new_session_id}'.", flush=True)
-            socketio.emit('student_session_ended', {"session_id": old_sid, "reason": "new_session_started"}, room=admin_dashboard_room, namespace='/ws/admin_dashboard')
-            print(f"[SocketIO] Broadcast 'student_session_ended' (implicit due to new session) for old session {old_sid} to room {admin_dashboard_room}", flush=True)
+            socketio.emit('student_session_ended', {"session_id": old_sid, "reason": "new_session_started"},
+                          room=admin_rooms.session_rooms(old_session_data, alerting=True), namespace='/ws/admin_dashboard')
+            print(f"[SocketIO] Broadcast 'student_session_ended' (implicit due to new session) for old session {old_sid}", flush=True)
+            _finalize_session(old_sid, old_session_data, "new_session_started")
     # --- END MODIFICATION ---
 
 
     session_data = {
         "student_id": current_user, 
         "student_username": current_user,
+        # Tags that route the session's events to per-exam / per-group admin rooms
+        "exam_id": data.get('exam_id') or None,
+        "proctor_group": data.get('proctor_group') or None,
         "monitoring_start_time": datetime.datetime.utcnow().isoformat(),
         "last_heartbeat_time": datetime.datetime.utcnow().isoformat(),
         "latest_face_analysis_status": "Monitoring starting...",
@@ -899,21 +1749,26 @@ def start_monitoring_session():
         "unread_alert_count": 0,
         "last_alert_timestamp": None
     }
-    active_sessions_store[new_session_id] = session_data # Use the new_session_id provided by frontend
+    if session_router is not None:
+        session_data[OWNER_FIELD] = session_router.address # Its frames and chunks are analysed here
+    active_sessions_store.create(new_session_id, session_data) # Use the new_session_id provided by frontend
+    session_reaper.schedule(new_session_id)
     print(f"[Session] Student '{current_user}' started monitoring session: {new_session_id}", flush=True)
     
     admin_payload = {
         "session_id": new_session_id,
         "student_id": session_data["student_id"],
         "student_name": session_data["student_username"],
+        "exam_id": session_data["exam_id"],
+        "proctor_group": session_data["proctor_group"],
         "monitoring_start_time": session_data["monitoring_start_time"],
         "last_snapshot_url": None, # Initially no snapshot
         "latest_status": session_data["latest_face_analysis_status"],
         "unread_alert_count": session_data["unread_alert_count"],
         "last_alert_timestamp": session_data["last_alert_timestamp"]
     }
-    socketio.emit('new_student_session_started', admin_payload, room=admin_dashboard_room, namespace='/ws/admin_dashboard')
-    print(f"[SocketIO] Broadcast 'new_student_session_started' for session {new_session_id} to room {admin_dashboard_room}", flush=True)
+    socketio.emit('new_student_session_started', admin_payload, room=admin_rooms.session_rooms(session_data), namespace='/ws/admin_dashboard')
+    print(f"[SocketIO] Broadcast 'new_student_session_started' for session {new_session_id} (exam {session_data['exam_id']})", flush=True)
 
     return jsonify({"msg": "Monitoring session started", "session_id": new_session_id}), 200
 
@@ -926,8 +1781,7 @@ def monitoring_session_heartbeat():
     if not session_id:
         return jsonify({"msg": "session_id is required"}), 400
 
-    if session_id in active_sessions_store:
-        active_sessions_store[session_id]["last_heartbeat_time"] = datetime.datetime.utcnow().isoformat()
+    if active_sessions_store.update(session_id, {"last_heartbeat_time": datetime.datetime.utcnow().isoformat()}) is not None:
         # print(f"[Session] Heartbeat for session: {session_id}", flush=True) # Can be too verbose
         return jsonify({"msg": "Heartbeat received"}), 200
     else:
@@ -937,6 +1791,7 @@ def monitoring_session_heartbeat():
 
 @app.route('/api/student/monitoring/stop', methods=['POST', 'OPTIONS'])
 @jwt_required()
+@_routed_to_session_owner
 def stop_monitoring_session():
     data = request.get_json()
     session_id = data.get('session_id')
@@ -945,19 +1800,24 @@ def stop_monitoring_session():
     if not session_id:
         return jsonify({"msg": "session_id is required"}), 400
 
-    if session_id in active_sessions_store:
+    session_entry = active_sessions_store.get(session_id)
+    if session_entry is not None:
         # Ensure the user stopping the session is the one who owns it (or an admin, if that logic is added)
-        if active_sessions_store[session_id]["student_username"] == current_user:
-            del active_sessions_store[session_id]
+        if session_entry["student_username"] == current_user:
+            ended_session_data = active_sessions_store.pop(session_id)
+            if ended_session_data is None: # Stopped concurrently through another worker
+                return jsonify({"msg": "Session not found or already stopped"}), 404
             print(f"[Session] Student '{current_user}' stopped monitoring session: {session_id}", flush=True)
             
             # Broadcast to admin dashboard (Task 3.4.3)
-            socketio.emit('student_session_ended', {"session_id": session_id}, room=admin_dashboard_room, namespace='/ws/admin_dashboard')
-            print(f"[SocketIO] Broadcast 'student_session_ended' for session {session_id} to room {admin_dashboard_room}", flush=True)
+            socketio.emit('student_session_ended', {"session_id": session_id},
+                          room=admin_rooms.session_rooms(ended_session_data, alerting=True), namespace='/ws/admin_dashboard')
+            print(f"[SocketIO] Broadcast 'student_session_ended' for session {session_id}", flush=True)
+            _finalize_session(session_id, ended_session_data, "stopped")
             
             return jsonify({"msg": "Monitoring session stopped"}), 200
         else:
-            print(f"[Session Auth] User '{current_user}' attempted to stop session '{session_id}' owned by '{active_sessions_store[session_id]['student_username']}'. Denied.", flush=True)
+            print(f"[Session Auth] User '{current_user}' attempted to stop session '{session_id}' owned by '{session_entry['student_username']}'. Denied.", flush=True)
             return jsonify({"msg": "Unauthorized to stop this session"}), 403
     else:
         print(f"[Session] Stop request for unknown/expired session: {session_id}", flush=True)
@@ -985,8 +1845,15 @@ def get_active_dashboard_sessions():
     # sort_by = request.args.get('sort_by', 'monitoring_start_time')
     # order = request.args.get('order', 'desc')
 
+    # Same filters as the Socket.IO 'subscribe' event, so the listing matches the live feed
+    exam_ids = request.args.getlist('exam_id')
+    proctor_groups = request.args.getlist('proctor_group')
+    alerts_only = request.args.get('alerts_only', 'false').lower() == 'true'
+
     sessions_list = []
     for session_id, session_data in active_sessions_store.items():
+        if not admin_rooms.session_matches(session_data, exam_ids, proctor_groups, alerts_only):
+            continue
         # Construct snapshot URL if filename exists
         snapshot_url = None
         if session_data.get("latest_face_snapshot_filename"):
@@ -1000,14 +1867,16 @@ def get_active_dashboard_sessions():
             "session_id": session_id,
             "student_id": session_data.get("student_id", "Unknown Student"), # Safely access student_id
             "student_name": session_data["student_username"],
-            # "exam_id": session_data.get("exam_id"), # if used
+            "exam_id": session_data.get("exam_id"),
+            "proctor_group": session_data.get("proctor_group"),
             "monitoring_start_time": session_data["monitoring_start_time"],
             "last_snapshot_url": snapshot_url, 
             "latest_status": session_data["latest_face_analysis_status"], # This will be updated by analyze-face
             "latest_audio_event": session_data["latest_audio_event_summary"], # This will be updated by analyze-audio
             "unread_alert_count": session_data["unread_alert_count"],
             "last_alert_timestamp": session_data["last_alert_timestamp"],
-            "last_heartbeat_time": session_data["last_heartbeat_time"]
+            "last_heartbeat_time": session_data["last_heartbeat_time"],
+            "student_connected": session_data.get("student_connected"),
         })
     
     # Implement sorting and pagination here if query params are used
@@ -1015,6 +1884,17 @@ def get_active_dashboard_sessions():
     print(f"[Admin Dashboard] Admin '{get_jwt_identity()}' fetched {len(sessions_list)} active sessions.", flush=True)
     return jsonify(sessions_list), 200
 
+# Ends abandoned sessions and serves forwarded requests; started last so everything they call is defined
+session_reaper = SessionReaper(
+    active_sessions_store,
+    ttl=app.config['SESSION_HEARTBEAT_TTL_SECONDS'],
+    on_expire=_end_expired_session,
+)
+session_reaper.start()
+if session_router is not None:
+    session_router.start()
+    print(f"[INFO] Session routing ready: {session_router.address}", flush=True)
+
 # Note: The if __name__ == '__main__': block is typically for direct execution (python app.py)
 # When using Gunicorn (as planned for Docker), Gunicorn itself will run the Flask app object.
 # So, this block won't be executed by Gunicorn, but it's fine to keep for local dev/testing.
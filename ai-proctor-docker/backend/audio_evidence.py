@@ -0,0 +1,267 @@
+"""
+Retention of the audio around detected sound events.
+
+Audio chunks are analysed in memory and never written out whole. To still
+give admins evidence, :class:`AudioEvidenceRecorder` keeps the last few
+seconds of each session's stream (16-bit, enough to reach back to the start
+of any event the analyzer can report) and, when an alert is raised, cuts the
+event plus ``padding`` seconds either side. The analyzer reports an event
+when it reaches its minimum duration, so its clip stays open until the
+analyzer reports that the event ended (or the clip reaches
+``max_clip_seconds``); it is finished once the trailing padding has arrived,
+or with what is available when the session ends.
+
+The history only holds consecutive chunks. When chunks carry a sequence
+number and one was missed (it was handled by another worker), the history
+is started over instead of splicing audio from either side of the gap.
+
+Clips are compressed losslessly as FLAC (falling back to WAV when the
+optional ``soundfile`` package is missing) and appended to the session's
+segment file, so storage grows with incidents rather than exam length.
+Clip names follow the snapshot naming scheme, ``audio_<session_id>_<uuid>.<ext>``,
+so :func:`segment_store.session_id_from_filename` finds their segment.
+"""
+
+import collections
+import io
+import threading
+import wave
+
+import numpy as np
+
+from segment_store import session_id_from_filename
+
+FILENAME_PREFIX = 'audio_'
+MIMETYPES = {'flac': 'audio/flac', 'wav': 'audio/wav'}
+
+
+def _to_int16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def _soundfile():
+    try:
+        import soundfile  # Optional (libsndfile); only needed once a clip is kept
+    except ImportError:
+        return None
+    return soundfile
+
+
+def clip_format():
+    """``'flac'`` when soundfile is installed, otherwise ``'wav'``."""
+    return 'flac' if _soundfile() is not None else 'wav'
+
+
+def encode_clip(samples, sample_rate, audio_format='flac'):
+    """Encode int16 mono samples as FLAC or WAV (both lossless)."""
+    buffer = io.BytesIO()
+    if audio_format == 'flac':
+        _soundfile().write(buffer, samples, sample_rate, format='FLAC', subtype='PCM_16')
+        return buffer.getvalue()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def read_clip(segment_store, filename):
+    """
+    Return ``(data, mimetype)`` for a stored clip, or None.
+    """
+    session_id = session_id_from_filename(filename, prefixes=(FILENAME_PREFIX,))
+    if not session_id:
+        return None
+    data = segment_store.read(session_id, filename)
+    if data is None:
+        return None
+    return data, MIMETYPES.get(filename.rsplit('.', 1)[-1], 'application/octet-stream')
+
+
+class _PendingClip:
+    def __init__(self, filename, start, end, event_type=None, event_start=None):
+        self.filename = filename
+        self.start = start
+        self.end = end  # The max_clip_seconds cap while the event is still open
+        self.event_type = event_type  # Set while waiting for the event to end
+        self.event_start = event_start
+
+
+class _SessionHistory:
+    def __init__(self, sample_rate, sequence=None):
+        self.sample_rate = sample_rate
+        self.sequence = sequence  # Sequence number of the latest chunk, if chunks carry one
+        self.pieces = collections.deque()  # (first sample index, int16 array)
+        self.total = 0  # Samples appended so far
+        self.chunk_start = 0  # Sample index where the latest chunk begins
+        self.pending = []  # _PendingClip waiting for its event to end or for trailing padding
+
+    def extract(self, start, end):
+        parts = []
+        for first, piece in self.pieces:
+            lo, hi = max(start, first), min(end, first + len(piece))
+            if lo < hi:
+                parts.append(piece[lo - first:hi - first])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int16)
+
+
+class AudioEvidenceRecorder:
+    """
+    Cuts padded event clips out of each session's recent audio.
+
+    Parameters
+    ----------
+    segment_store : segment_store.SegmentStore
+        Where finished clips are appended.
+    padding : float
+        Seconds kept before and after each event.
+    history_seconds : float
+        Audio kept per session before the latest chunk; must cover
+        ``padding`` plus the longest minimum event duration.
+    max_clip_seconds : float
+        Clips are cut to at most this length.
+
+    """
+
+    def __init__(self, segment_store, padding=1.0, history_seconds=5.0, max_clip_seconds=30.0):
+        self.segment_store = segment_store
+        self.padding = padding
+        self.history_seconds = history_seconds
+        self.max_clip_seconds = max_clip_seconds
+        self.audio_format = clip_format()
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._clips_total = 0
+        self._bytes_total = 0
+        self._gaps_total = 0
+
+    def append(self, session_id, samples, sample_rate, sequence=None):
+        """
+        Add the session's next chunk (mono float32) and finish clips it completes.
+
+        ``sequence`` is the chunk's number in the session's stream, when the
+        client sends one; a jump means chunks in between were not seen here.
+        Call before :meth:`capture` for events found in the same chunk.
+        """
+        with self._lock:
+            history = self._sessions.get(session_id)
+            gap = (history is not None and sequence is not None and history.sequence is not None
+                   and sequence != history.sequence + 1)
+            if history is None or history.sample_rate != sample_rate or gap:
+                if history is not None:
+                    self._finish(session_id, history, history.pending)
+                self._gaps_total += gap
+                history = _SessionHistory(sample_rate, sequence)
+                self._sessions[session_id] = history
+            history.sequence = sequence
+            history.chunk_start = history.total
+            history.pieces.append((history.total, _to_int16(samples)))
+            history.total += len(samples)
+            self._finish_ready(session_id, history)
+            self._trim(history)
+
+    def capture(self, session_id, clip_id, start_offset_seconds, duration_seconds, event_type=None):
+        """
+        Retain an event that starts ``start_offset_seconds`` after the start
+        of the session's latest chunk (negative if it began earlier).
+
+        With ``event_type`` the event is treated as still in progress: the
+        clip stays open until :meth:`end_event` reports its full duration.
+
+        Returns
+        -------
+        filename : string or None
+            Name the clip is (or will shortly be) served under; None if no
+            audio is held for the session.
+
+        """
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                return None
+            rate = history.sample_rate
+            event_start = history.chunk_start + int(start_offset_seconds * rate)
+            oldest = history.pieces[0][0] if history.pieces else history.total
+            start = max(event_start - int(self.padding * rate), oldest)
+            cap = start + int(self.max_clip_seconds * rate)
+            clip = _PendingClip(f"{FILENAME_PREFIX}{session_id}_{clip_id}.{self.audio_format}", start, cap)
+            if event_type is not None:
+                clip.event_type, clip.event_start = event_type, event_start
+            else:
+                clip.end = min(event_start + int((duration_seconds + self.padding) * rate), cap)
+            history.pending.append(clip)
+            self._finish_ready(session_id, history)
+            return clip.filename
+
+    def end_event(self, session_id, event_type, start_offset_seconds, duration_seconds):
+        """
+        The analyzer reports that an event captured earlier has ended; its
+        clip now ends ``padding`` seconds after the event.
+        """
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                return
+            rate = history.sample_rate
+            event_start = history.chunk_start + int(start_offset_seconds * rate)
+            open_clips = [clip for clip in history.pending if clip.event_type == event_type]
+            if not open_clips:
+                return  # Captured by another worker, or already cut at max_clip_seconds
+            # Offsets are rounded to milliseconds; the nearest open clip of this type is the event's
+            clip = min(open_clips, key=lambda c: abs(c.event_start - event_start))
+            clip.end = min(event_start + int((duration_seconds + self.padding) * rate), clip.end)
+            clip.event_type = None
+            self._finish_ready(session_id, history)
+
+    def _finish_ready(self, session_id, history):
+        """Finish clips whose end (or cap, if their event is still open) has been reached."""
+        ready = [clip for clip in history.pending if clip.end <= history.total]
+        if ready:
+            history.pending = [clip for clip in history.pending if clip.end > history.total]
+            self._finish(session_id, history, ready)
+
+    def _finish(self, session_id, history, clips):
+        items = []
+        for clip in clips:
+            samples = history.extract(clip.start, min(clip.end, history.total))
+            if len(samples):
+                items.append((clip.filename, encode_clip(samples, history.sample_rate, self.audio_format)))
+        if not items:
+            return
+        try:
+            self.segment_store.append_many(session_id, items)
+            self._clips_total += len(items)
+            self._bytes_total += sum(len(data) for _, data in items)
+        except OSError as e:
+            print(f"[AUDIO_EVIDENCE_ERROR] Could not store {len(items)} clips for session {session_id}: {e}", flush=True)
+
+    def _trim(self, history):
+        keep_from = history.chunk_start - int(self.history_seconds * history.sample_rate)
+        if history.pending:
+            keep_from = min(keep_from, min(clip.start for clip in history.pending))
+        while history.pieces and history.pieces[0][0] + len(history.pieces[0][1]) <= keep_from:
+            history.pieces.popleft()
+
+    def close_session(self, session_id):
+        """Finish pending clips with the audio available and drop the session's history."""
+        with self._lock:
+            history = self._sessions.pop(session_id, None)
+            if history is not None:
+                self._finish(session_id, history, history.pending)
+
+    def stats(self):
+        with self._lock:
+            sessions = len(self._sessions)
+            pending = sum(len(history.pending) for history in self._sessions.values())
+            held = sum(len(piece) for history in self._sessions.values() for _, piece in history.pieces)
+        return {
+            "sessions": sessions,
+            "pending_clips": pending,
+            "held_mb": held * 2 / (1024 * 1024),
+            "format": self.audio_format,
+            "clips_total": self._clips_total,
+            "bytes_total": self._bytes_total,
+            "sequence_gaps_total": self._gaps_total,
+        }
@@ -0,0 +1,133 @@
+"""
+In-memory decoding of audio chunks into NumPy arrays.
+
+WAV containers are parsed straight from the request bytes; the sample data is
+exposed with ``np.frombuffer``, so 16-bit and 32-bit float PCM are views onto
+the original buffer rather than copies. Nothing is written to disk.
+"""
+
+import struct
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Raw PCM layouts accepted by decode_pcm (and X-Audio-Format)
+PCM_DTYPES = {
+    's16le': np.dtype('<i2'),
+    's32le': np.dtype('<i4'),
+    'f32le': np.dtype('<f4'),
+    'u8': np.dtype('u1'),
+}
+
+
+class AudioDecodeError(ValueError):
+    """Raised when audio bytes cannot be interpreted."""
+
+
+def _frames(data, dtype, channels, offset=0, length=None):
+    """View ``data`` as a (frames,) or (frames, channels) array without copying."""
+    if length is None:
+        length = len(data) - offset
+    frame_bytes = dtype.itemsize * channels
+    length -= length % frame_bytes  # Ignore a trailing partial frame
+    samples = np.frombuffer(data, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+    return samples.reshape(-1, channels) if channels > 1 else samples
+
+
+def decode_pcm(data, audio_format='s16le', channels=1):
+    """
+    Interpret headerless PCM bytes.
+
+    Returns
+    -------
+    samples : numpy.ndarray
+        Native-dtype view onto ``data``.
+
+    """
+    dtype = PCM_DTYPES.get(audio_format)
+    if dtype is None:
+        raise AudioDecodeError(f"Unsupported PCM format '{audio_format}'")
+    if channels < 1:
+        raise AudioDecodeError("channels must be at least 1")
+    return _frames(data, dtype, channels)
+
+
+def decode_wav(data):
+    """
+    Parse a RIFF/WAVE file held in memory.
+
+    Returns
+    -------
+    samples : numpy.ndarray
+        Native-dtype view onto ``data`` (24-bit PCM is unpacked to int32).
+    sample_rate : int
+
+    """
+    view = memoryview(data)
+    if len(view) < 12 or bytes(view[0:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise AudioDecodeError("Not a RIFF/WAVE file")
+
+    fmt = None
+    position = 12
+    while position + 8 <= len(view):
+        chunk_id = bytes(view[position:position + 4])
+        chunk_size = struct.unpack_from('<I', view, position + 4)[0]
+        body = position + 8
+        if chunk_id == b'fmt ':
+            if chunk_size < 16:
+                raise AudioDecodeError("Truncated fmt chunk")
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', view, body)
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                format_tag = struct.unpack_from('<H', view, body + 24)[0]  # First two bytes of the SubFormat GUID
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise AudioDecodeError("data chunk before fmt chunk")
+            # Streamed WAVs may carry a placeholder size; clamp to what arrived
+            length = min(chunk_size, len(view) - body)
+            return _decode_samples(data, body, length, *fmt), fmt[2]
+        position = body + chunk_size + (chunk_size & 1)  # Chunks are word-aligned
+    raise AudioDecodeError("No data chunk found")
+
+
+def _decode_samples(data, offset, length, format_tag, channels, sample_rate, bits):
+    if channels < 1 or sample_rate < 1:
+        raise AudioDecodeError("Invalid channel count or sample rate")
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        return _frames(data, np.dtype('<f4'), channels, offset, length)
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 64:
+        return _frames(data, np.dtype('<f8'), channels, offset, length)
+    if format_tag != WAVE_FORMAT_PCM:
+        raise AudioDecodeError(f"Unsupported WAV format tag 0x{format_tag:04x}")
+    if bits in (8, 16, 32):
+        dtype = {8: np.dtype('u1'), 16: np.dtype('<i2'), 32: np.dtype('<i4')}[bits]
+        return _frames(data, dtype, channels, offset, length)
+    if bits == 24:
+        # No native 24-bit dtype: widen into the top three bytes of an int32 (one copy)
+        raw = _frames(data, np.dtype('u1'), 3 * channels, offset, length).reshape(-1, 3)
+        widened = np.zeros((raw.shape[0], 4), dtype=np.uint8)
+        widened[:, 1:] = raw
+        samples = widened.view('<i4').ravel()
+        return samples.reshape(-1, channels) if channels > 1 else samples
+    raise AudioDecodeError(f"Unsupported PCM bit depth {bits}")
+
+
+def to_float32(samples):
+    """
+    Mono float32 samples in [-1, 1].
+
+    Float32 mono input is returned as-is (no copy); integer input is scaled
+    in one pass, and multi-channel input is averaged down to mono.
+    """
+    if samples.dtype == np.uint8:
+        samples = (samples.astype(np.float32) - 128.0) / 128.0
+    elif np.issubdtype(samples.dtype, np.integer):
+        samples = samples.astype(np.float32) / float(np.iinfo(samples.dtype).max + 1)
+    else:
+        samples = samples.astype(np.float32, copy=False)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    return samples
@@ -0,0 +1,398 @@
+"""
+Per-session streaming sound event detection.
+
+Analysing each ``/api/analyze-audio`` chunk in isolation misses speech that
+straddles two chunks (each half is shorter than the minimum duration) and
+double-counts a long noise that spans several. :class:`StreamingAudioAnalyzer`
+keeps a little state per session between calls:
+
+* the samples left over after the last whole frame, prepended to the next
+  chunk so frames line up across the boundary (only the one boundary frame
+  is assembled; the rest of the chunk is still framed as a view),
+* each detector's open run (length, trailing gap, whether it was reported),
+  so a segment crossing a boundary is measured once and alerted once,
+* a running noise-floor estimate that raises the speech threshold in noisy
+  rooms.
+
+Most exam-room audio is silence, so each chunk first gets only the cheap
+energy pass (frame RMS). If no frame reaches the lower of the loud-noise
+threshold and the adaptive speech threshold, neither detector could fire:
+the spectral pass (FFT, zero crossings) is skipped and the chunk is reported
+as silence. Audio CPU therefore follows sound activity, not student count.
+
+Sessions that stop sending audio are evicted after ``idle_timeout`` seconds.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+import sound_event_detection as sed
+
+
+class _RunTracker:
+    """Tracks one detector's run of positive frames across chunks."""
+
+    def __init__(self, min_frames, max_gap):
+        self.min_frames = min_frames
+        self.max_gap = max_gap
+        self.run_frames = 0  # Length of the open run, bridged gaps included
+        self.gap = 0  # Negative frames since the open run last saw a positive one
+        self.start_frame = 0  # Stream frame index where the open run began
+        self.peak = None
+        self.reported = False
+
+    def update(self, mask, values, first_frame):
+        """
+        Extend runs with this chunk's frame mask.
+
+        Returns
+        -------
+        qualified : list of (start_frame, length, peak)
+            Runs that reached ``min_frames`` for the first time.
+        ended : list of (start_frame, length)
+            Previously qualified runs that ended in this chunk.
+
+        """
+        n = len(mask)
+        starts, ends = sed.find_runs(sed.fill_gaps(mask, self.max_gap))
+        runs = [(int(s), int(e)) for s, e in zip(starts, ends)]
+        qualified = []
+        ended = []
+
+        open_run = None
+        if self.run_frames and runs and self.gap + runs[0][0] <= self.max_gap:
+            # The previous chunk's run continues into this one
+            s, e = runs.pop(0)
+            open_run = (self.start_frame, self.run_frames + self.gap + e,
+                        max(self.peak, float(values[s:e].max())), self.reported, e)
+        elif self.run_frames and self.gap + n <= self.max_gap and not runs:
+            self.gap += n
+            return qualified, ended
+        elif self.run_frames and self.reported:
+            ended.append((self.start_frame, self.run_frames))
+
+        candidates = [open_run] if open_run else []
+        candidates.extend(
+            (first_frame + s, e - s, float(values[s:e].max()), False, e) for s, e in runs
+        )
+
+        self.run_frames = 0
+        for start_frame, length, peak, reported, end in candidates:
+            if not reported and length >= self.min_frames:
+                qualified.append((start_frame, length, peak))
+                reported = True
+            if n - end <= self.max_gap:
+                # Still open at the end of the chunk (possibly inside a pause)
+                self.run_frames, self.gap = length, n - end
+                self.start_frame, self.peak, self.reported = start_frame, peak, reported
+            elif reported:
+                ended.append((start_frame, length))
+        return qualified, ended
+
+
+class _SessionAudioState:
+    def __init__(self, sample_rate, frame_length, min_noise_frames, min_speech_frames, hangover_frames):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.carry = np.empty(0, dtype=np.float32)
+        self.frames_processed = 0
+        self.noise_floor_dbfs = None
+        self.loud = _RunTracker(min_noise_frames, 0)
+        self.speech = _RunTracker(min_speech_frames, hangover_frames)
+        self.last_seen = time.monotonic()
+
+
+SILENCE = 'silence'
+ACTIVE = 'active'
+
+
+def _stack(blocks):
+    """One (n_frames, frame_length) array from frame blocks (no copy for a single block)."""
+    return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+
+class StreamingAudioAnalyzer:
+    """
+    Stateful detector for many concurrent sessions.
+
+    Parameters mirror :func:`sound_event_detection.detect_sound_events`;
+    ``idle_timeout`` is how long (seconds) a session's state is kept without
+    new audio; ``on_evict(session_id)`` is called for each evicted session.
+    """
+
+    # Noise floor: follow quieter rooms quickly, louder ones slowly
+    FLOOR_FALL_RATE = 0.5
+    FLOOR_RISE_RATE = 0.1
+    FLOOR_PERCENTILE = 10
+
+    def __init__(self, loud_noise_dbfs_threshold=-20.0, min_noise_duration=0.5, min_speech_duration=3.0,
+                 vad_aggressiveness=1, frame_duration_ms=sed.DEFAULT_FRAME_DURATION_MS, idle_timeout=120.0,
+                 on_evict=None):
+        self.loud_noise_dbfs_threshold = loud_noise_dbfs_threshold
+        self.min_noise_duration = min_noise_duration
+        self.min_speech_duration = min_speech_duration
+        self.vad_aggressiveness = vad_aggressiveness
+        self.frame_duration_ms = frame_duration_ms
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._analysis_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._chunks_total = 0
+        self._silent_chunks_total = 0
+        self._evicted_total = 0
+
+    def start(self):
+        """Start the idle-session eviction thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="audio-stream-evictor", daemon=True)
+        self._thread.start()
+
+    def _new_state(self, sample_rate):
+        frame_length = sed.frame_length_for(sample_rate, self.frame_duration_ms)
+        frame_seconds = frame_length / float(sample_rate)
+        return _SessionAudioState(
+            sample_rate, frame_length,
+            min_noise_frames=int(np.ceil(self.min_noise_duration / frame_seconds)),
+            min_speech_frames=int(np.ceil(self.min_speech_duration / frame_seconds)),
+            hangover_frames=int(sed.SPEECH_HANGOVER_SECONDS / frame_seconds),
+        )
+
+    def _state(self, session_id, sample_rate):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or state.sample_rate != sample_rate:
+                state = self._new_state(sample_rate)
+                self._sessions[session_id] = state
+            state.last_seen = time.monotonic()
+            return state
+
+    def _frames(self, state, samples):
+        """
+        Whole frames of carry + samples as (n_frames, frame_length) blocks.
+        Only the boundary frame is assembled; the rest is a view of ``samples``.
+        """
+        blocks = []
+        frame_length = state.frame_length
+        if len(state.carry):
+            need = frame_length - len(state.carry)
+            if len(samples) < need:
+                state.carry = np.concatenate((state.carry, samples))
+                return blocks
+            blocks.append(np.concatenate((state.carry, samples[:need])).reshape(1, frame_length))
+            samples = samples[need:]
+        n_frames = len(samples) // frame_length
+        if n_frames:
+            body = np.ascontiguousarray(samples[:n_frames * frame_length], dtype=np.float32)
+            blocks.append(body.reshape(n_frames, frame_length))
+        state.carry = np.array(samples[n_frames * frame_length:], dtype=np.float32)  # Under one frame; copied so the request buffer can go
+        return blocks
+
+    def _update_noise_floor(self, state, dbfs):
+        if not len(dbfs):
+            return
+        k = len(dbfs) * self.FLOOR_PERCENTILE // 100
+        chunk_floor = float(np.partition(dbfs, k)[k])  # Order statistic; np.percentile costs more than the FFT here
+        if state.noise_floor_dbfs is None:
+            state.noise_floor_dbfs = chunk_floor
+        else:
+            rate = self.FLOOR_FALL_RATE if chunk_floor < state.noise_floor_dbfs else self.FLOOR_RISE_RATE
+            state.noise_floor_dbfs += rate * (chunk_floor - state.noise_floor_dbfs)
+
+    def gate_dbfs(self, noise_floor_dbfs):
+        """Frames quieter than this cannot be loud noise or speech."""
+        return min(self.loud_noise_dbfs_threshold, sed.speech_min_dbfs(self.vad_aggressiveness, noise_floor_dbfs))
+
+    def process(self, session_id, samples, sample_rate):
+        """
+        Analyse the next chunk of a session's audio.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray
+            Mono float32 samples in [-1, 1].
+
+        Returns
+        -------
+        result : dict
+            ``status`` (``"silence"`` or ``"active"``), ``events`` (same shape
+            as ``detect_sound_events``), ``peak_dbfs`` and
+            ``noise_floor_dbfs``. A segment is reported once, in the chunk
+            where it first reaches its minimum duration;
+            ``start_offset_seconds`` is relative to the start of this chunk
+            and is negative when the segment began in an earlier one.
+            ``ended_events`` lists reported segments that ended in this
+            chunk (``event_type``, ``start_offset_seconds``,
+            ``duration_seconds``).
+
+        """
+        return self.process_many([(session_id, samples, sample_rate)])[0]
+
+    def process_many(self, chunks):
+        """
+        Analyse chunks from many sessions in one vectorized pass.
+
+        Parameters
+        ----------
+        chunks : list of (session_id, samples, sample_rate)
+            Chunks of one session are analysed in list order.
+
+        Returns
+        -------
+        results : list of dict
+            One :meth:`process` result per chunk, in the same order.
+
+        """
+        results = [None] * len(chunks)
+        with self._analysis_lock:
+            for indices in self._rounds(chunks):
+                self._process_round(chunks, indices, results)
+        return results
+
+    @staticmethod
+    def _rounds(chunks):
+        """Split chunk indices into rounds holding at most one chunk per session, keeping session order."""
+        rounds = []
+        seen = {}
+        for i, (session_id, _, _) in enumerate(chunks):
+            k = seen.get(session_id, 0)
+            seen[session_id] = k + 1
+            if k == len(rounds):
+                rounds.append([])
+            rounds[k].append(i)
+        return rounds
+
+    def _process_round(self, chunks, indices, results):
+        by_rate = {}
+        for i in indices:
+            session_id, samples, sample_rate = chunks[i]
+            state = self._state(session_id, sample_rate)
+            chunk_start_frame = state.frames_processed - len(state.carry) / float(state.frame_length)
+            by_rate.setdefault(sample_rate, []).append((i, state, self._frames(state, samples), chunk_start_frame))
+
+        # The energy pass reads each chunk's frames in place (silent chunks
+        # are never copied); frames of every chunk that passes the gate are
+        # stacked and share one spectral pass
+        for sample_rate, items in by_rate.items():
+            active = []
+            for i, state, blocks, chunk_start_frame in items:
+                self._chunks_total += 1
+                dbfs = np.concatenate([sed.frames_dbfs(block) for block in blocks]) if blocks else np.empty(0)
+                first_frame = state.frames_processed
+                state.frames_processed += len(dbfs)
+                self._update_noise_floor(state, dbfs)
+
+                peak_dbfs = float(dbfs.max()) if len(dbfs) else sed.SILENCE_DBFS
+                results[i] = {
+                    "status": ACTIVE,
+                    "events": [],
+                    "ended_events": [],
+                    "peak_dbfs": round(peak_dbfs, 2),
+                    "noise_floor_dbfs": round(state.noise_floor_dbfs, 2) if state.noise_floor_dbfs is not None else None,
+                }
+                if peak_dbfs < self.gate_dbfs(state.noise_floor_dbfs):
+                    # Nothing can fire: close or age open runs and skip the spectral pass
+                    self._silent_chunks_total += 1
+                    quiet = np.zeros(len(dbfs), dtype=bool)
+                    for event_type, tracker in ((sed.LOUD_NOISE, state.loud), (sed.SPEECH, state.speech)):
+                        _, ended = tracker.update(quiet, dbfs, first_frame)
+                        results[i]["ended_events"].extend(
+                            self._ended_events(state, event_type, ended, chunk_start_frame))
+                    results[i]["status"] = SILENCE
+                    continue
+                self._loud_events(state, dbfs, first_frame, chunk_start_frame, results[i])
+                active.append((i, state, blocks, dbfs, first_frame, chunk_start_frame))
+
+            if not active:
+                continue
+            all_band_ratio, all_zcr = sed.frames_spectral_features(
+                _stack([block for _, _, blocks, _, _, _ in active for block in blocks]), sample_rate)
+            row = 0
+            for i, state, _, dbfs, first_frame, chunk_start_frame in active:
+                n = len(dbfs)
+                features = {"dbfs": dbfs, "band_ratio": all_band_ratio[row:row + n], "zcr": all_zcr[row:row + n]}
+                row += n
+                self._speech_events(state, features, first_frame, chunk_start_frame, results[i])
+
+    @staticmethod
+    def _ended_events(state, event_type, ended, chunk_start_frame):
+        frame_seconds = state.frame_length / float(state.sample_rate)
+        return [{
+            "event_type": event_type,
+            "start_offset_seconds": round((start_frame - chunk_start_frame) * frame_seconds, 3),
+            "duration_seconds": round(length * frame_seconds, 3),
+        } for start_frame, length in ended]
+
+    def _loud_events(self, state, dbfs, first_frame, chunk_start_frame, result):
+        frame_seconds = state.frame_length / float(state.sample_rate)
+        qualified, ended = state.loud.update(dbfs > self.loud_noise_dbfs_threshold, dbfs, first_frame)
+        result["events"].extend({
+            "event_type": sed.LOUD_NOISE,
+            "details": {
+                "peak_rms_dbfs": round(peak, 2),
+                "noise_duration_seconds": round(length * frame_seconds, 3),
+                "rms_threshold_dbfs_used": self.loud_noise_dbfs_threshold,
+                "start_offset_seconds": round((start_frame - chunk_start_frame) * frame_seconds, 3),
+            },
+        } for start_frame, length, peak in qualified)
+        result["ended_events"].extend(self._ended_events(state, sed.LOUD_NOISE, ended, chunk_start_frame))
+
+    def _speech_events(self, state, features, first_frame, chunk_start_frame, result):
+        frame_seconds = state.frame_length / float(state.sample_rate)
+        voiced = sed.speech_mask(features, self.vad_aggressiveness, state.noise_floor_dbfs)
+        qualified, ended = state.speech.update(voiced, features["dbfs"], first_frame)
+        result["events"].extend({
+            "event_type": sed.SPEECH,
+            "details": {
+                "detected_speech_duration_seconds": round(length * frame_seconds, 3),
+                "vad_aggressiveness_mode_used": self.vad_aggressiveness,
+                "noise_floor_dbfs": round(state.noise_floor_dbfs, 2),
+                "start_offset_seconds": round((start_frame - chunk_start_frame) * frame_seconds, 3),
+            },
+        } for start_frame, length, _ in qualified)
+        result["ended_events"].extend(self._ended_events(state, sed.SPEECH, ended, chunk_start_frame))
+
+    def noise_floor(self, session_id):
+        with self._lock:
+            state = self._sessions.get(session_id)
+        return state.noise_floor_dbfs if state is not None else None
+
+    def close_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [session_id for session_id, state in self._sessions.items() if state.last_seen < cutoff]
+            for session_id in idle:
+                del self._sessions[session_id]
+            self._evicted_total += len(idle)
+        if self.on_evict is not None:
+            for session_id in idle:
+                self.on_evict(session_id)
+        return len(idle)
+
+    def _run(self):
+        while not self._stopped.wait(min(self.idle_timeout / 2.0, 30.0)):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"[AUDIO_STREAM_ERROR] Idle eviction failed: {e}", flush=True)
+
+    def stats(self):
+        with self._lock:
+            sessions = len(self._sessions)
+        return {
+            "sessions": sessions,
+            "chunks_total": self._chunks_total,
+            "silent_chunks_total": self._silent_chunks_total,
+            "evicted_total": self._evicted_total,
+            "idle_timeout_seconds": self.idle_timeout,
+        }
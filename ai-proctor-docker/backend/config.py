@@ -20,6 +20,90 @@ class Config:
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
 
+    # MongoDB connection pool (one client per worker, shared by all handlers)
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 2))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 1000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 2000))
+
+    # Deadline for a single database operation, and the circuit breaker that
+    # makes requests fail fast (503) while MongoDB is unreachable
+    MONGO_OPERATION_TIMEOUT_MS = int(os.getenv('MONGO_OPERATION_TIMEOUT_MS', 2000))
+    MONGO_BREAKER_FAILURE_THRESHOLD = int(os.getenv('MONGO_BREAKER_FAILURE_THRESHOLD', 5))
+    MONGO_BREAKER_RESET_SECONDS = float(os.getenv('MONGO_BREAKER_RESET_SECONDS', 10))
+
+    # Local spool for events and alerts written while MongoDB is unavailable
+    SPOOL_ENABLED = os.getenv('SPOOL_ENABLED', 'true').lower() == 'true'
+    SPOOL_DIR = os.getenv('SPOOL_DIR', '/app/spool')
+    SPOOL_MAX_MB = int(os.getenv('SPOOL_MAX_MB', 1024))
+    SPOOL_DRAIN_INTERVAL_MS = int(os.getenv('SPOOL_DRAIN_INTERVAL_MS', 2000))
+    SPOOL_DRAIN_BATCH = int(os.getenv('SPOOL_DRAIN_BATCH', 500))
+
+    # Sound event detection (see docs/implementation-plan/sound-detection.md)
+    SOUND_MIN_SPEECH_SECONDS = float(os.getenv('SOUND_MIN_SPEECH_SECONDS', 3.0))
+    SOUND_MIN_NOISE_SECONDS = float(os.getenv('SOUND_MIN_NOISE_SECONDS', 0.5))
+    SOUND_VAD_AGGRESSIVENESS = int(os.getenv('SOUND_VAD_AGGRESSIVENESS', 1))
+    # Streaming state of sessions that send no audio for this long is dropped
+    AUDIO_STREAM_IDLE_SECONDS = float(os.getenv('AUDIO_STREAM_IDLE_SECONDS', 120))
+    # Chunks from concurrent requests are analysed together in one pass. Off by default:
+    # `python audio_batch.py` measures no throughput gain, and batching adds queueing delay
+    AUDIO_BATCH_ENABLED = os.getenv('AUDIO_BATCH_ENABLED', 'false').lower() == 'true'
+    AUDIO_BATCH_MAX_CHUNKS = int(os.getenv('AUDIO_BATCH_MAX_CHUNKS', 32))
+    AUDIO_BATCH_MAX_WAIT_MS = int(os.getenv('AUDIO_BATCH_MAX_WAIT_MS', 20))
+    # Padded, losslessly compressed clips of sound alerts (audio_evidence.py)
+    AUDIO_EVIDENCE_ENABLED = os.getenv('AUDIO_EVIDENCE_ENABLED', 'true').lower() == 'true'
+    AUDIO_EVIDENCE_PADDING_SECONDS = float(os.getenv('AUDIO_EVIDENCE_PADDING_SECONDS', 1.0))
+    AUDIO_EVIDENCE_MAX_CLIP_SECONDS = float(os.getenv('AUDIO_EVIDENCE_MAX_CLIP_SECONDS', 30.0))
+
+    # Worker processes per host; gunicorn reads the same variable as its --workers default
+    WORKER_PROCESSES = int(os.getenv('WEB_CONCURRENCY', 1))
+
+    # Live session state: 'sqlite' is shared by all workers on the host, 'memory' suits one worker
+    SESSION_STATE_BACKEND = os.getenv('SESSION_STATE_BACKEND', 'sqlite' if WORKER_PROCESSES > 1 else 'memory')
+    SESSION_STATE_PATH = os.getenv('SESSION_STATE_PATH', '')  # Defaults to a file on /dev/shm
+    # Socket.IO fan-out between workers: 'local://' (one host), redis:// or amqp:// (several), '' (off).
+    # Only needed with more than one worker
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', 'local://' if WORKER_PROCESSES > 1 else '')
+    # With several workers, each session's requests are forwarded to the worker that started it
+    # (session_router.py), which holds its audio and event-range state
+    SESSION_ROUTING_ENABLED = os.getenv('SESSION_ROUTING_ENABLED', str(WORKER_PROCESSES > 1)).lower() == 'true'
+    SESSION_ROUTING_DIR = os.getenv('SESSION_ROUTING_DIR', '')  # Defaults to a directory on /dev/shm
+    SESSION_ROUTING_TIMEOUT_SECONDS = float(os.getenv('SESSION_ROUTING_TIMEOUT_SECONDS', 60))
+    # Changed session fields are pushed to admins as one 'sessions_delta' per interval
+    SESSIONS_DELTA_INTERVAL_MS = int(os.getenv('SESSIONS_DELTA_INTERVAL_MS', 500))
+    # Sessions without a heartbeat (or analysed frame / audio chunk) for this long are ended
+    SESSION_HEARTBEAT_TTL_SECONDS = float(os.getenv('SESSION_HEARTBEAT_TTL_SECONDS', 60))
+    # Heartbeats of students connected on /ws/student are written in one batch per interval
+    STUDENT_PRESENCE_FLUSH_SECONDS = float(os.getenv('STUDENT_PRESENCE_FLUSH_SECONDS', 15))
+
+    # Buffered event writes (face_analyzed events are flushed in bulk)
+    EVENT_WRITER_BATCH_SIZE = int(os.getenv('EVENT_WRITER_BATCH_SIZE', 500))
+    EVENT_WRITER_FLUSH_INTERVAL_MS = int(os.getenv('EVENT_WRITER_FLUSH_INTERVAL_MS', 1000))
+    EVENT_WRITER_MAX_BUFFER = int(os.getenv('EVENT_WRITER_MAX_BUFFER', 50000))
+
+    # Collapse runs of identical face_analyzed events into range documents
+    EVENT_COALESCING_ENABLED = os.getenv('EVENT_COALESCING_ENABLED', 'true').lower() == 'true'
+    EVENT_RANGE_CHECKPOINT_SECONDS = float(os.getenv('EVENT_RANGE_CHECKPOINT_SECONDS', 60))
+    EVENT_RANGE_MAX_GAP_SECONDS = float(os.getenv('EVENT_RANGE_MAX_GAP_SECONDS', 30))
+
+    # 'standard' or 'timeseries' (MongoDB time-series layout for proctoring_events)
+    EVENTS_STORAGE_MODE = os.getenv('EVENTS_STORAGE_MODE', 'standard').lower()
+
+    # Apply db_indexes.py definitions when the app connects to MongoDB
+    ENSURE_INDEXES_ON_STARTUP = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
+
+    # /api/admin/alerts pagination
+    ALERT_COUNT_CACHE_TTL_SECONDS = float(os.getenv('ALERT_COUNT_CACHE_TTL_SECONDS', 10))
+    ALERTS_MAX_PAGE_SKIP = int(os.getenv('ALERTS_MAX_PAGE_SKIP', 10000))
+
+    # Documents fetched per round trip by /api/admin/export
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+    # Session summaries: seconds one face frame stands for (the capture interval)
+    SESSION_SUMMARY_SAMPLE_INTERVAL_SECONDS = float(os.getenv('SESSION_SUMMARY_SAMPLE_INTERVAL_SECONDS', 5))
+
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
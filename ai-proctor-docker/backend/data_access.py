@@ -0,0 +1,211 @@
+"""
+Resilient MongoDB access: one pooled client, per-operation deadlines and a
+circuit breaker shared by every collection.
+
+Handlers use :class:`ResilientCollection` exactly like a pymongo
+``Collection``. Each operation (including every batch fetched while
+iterating a cursor) runs under ``pymongo.timeout``; connection failures and
+timeouts count against the breaker, and once it is open operations raise
+:class:`DatabaseUnavailable` immediately instead of waiting for server
+selection to time out. After ``reset_timeout`` seconds a single probe
+operation is let through; its outcome closes or re-opens the breaker.
+
+Errors the server actually returned (duplicate keys, validation, bulk write
+errors) are passed through unchanged and do not trip the breaker.
+"""
+
+import threading
+import time
+
+import pymongo
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+LAZY_CURSOR_METHODS = frozenset(['find', 'find_raw_batches'])
+
+
+class DatabaseUnavailable(Exception):
+    """Raised when MongoDB is unreachable, timed out, or the breaker is open."""
+
+
+def create_client(uri, config):
+    """MongoClient with the pool and timeout settings from ``config``."""
+    return MongoClient(
+        uri,
+        maxPoolSize=config['MONGO_MAX_POOL_SIZE'],
+        minPoolSize=config['MONGO_MIN_POOL_SIZE'],
+        maxIdleTimeMS=config['MONGO_MAX_IDLE_TIME_MS'],
+        waitQueueTimeoutMS=config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        serverSelectionTimeoutMS=config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        connectTimeoutMS=config['MONGO_CONNECT_TIMEOUT_MS'],
+        retryWrites=True,
+        retryReads=True,
+    )
+
+
+def is_outage(error):
+    """True for errors meaning the database could not be reached in time."""
+    return isinstance(error, ConnectionFailure) or bool(getattr(error, 'timeout', False))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.opened_total = 0
+        self.rejected_total = 0
+        self.last_error = None
+
+    def before_call(self):
+        """Raise DatabaseUnavailable unless an operation may be attempted now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected_total += 1
+            raise DatabaseUnavailable(f"Database unavailable (circuit {self.state}): {self.last_error}")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self.state != CLOSED:
+                print("[DB_BREAKER] Database reachable again, circuit closed", flush=True)
+            self.state = CLOSED
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if error is not None:
+                self.last_error = str(error)
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened_total += 1
+                    print(f"[DB_BREAKER] Circuit opened after {self._failures} failures: {self.last_error}", flush=True)
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def trip(self, error=None):
+        """Open the breaker immediately (e.g. MongoDB unreachable at startup)."""
+        with self._lock:
+            self._failures = max(self._failures, self.failure_threshold)
+        self.record_failure(error)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "opened_total": self.opened_total,
+                "rejected_total": self.rejected_total,
+                "last_error": self.last_error,
+            }
+
+
+class _Guard:
+    """Runs one database operation under the breaker and a deadline."""
+
+    def __init__(self, name, breaker, timeout):
+        self.name = name
+        self.breaker = breaker
+        self.timeout = timeout
+
+    def call(self, fn, *args, **kwargs):
+        self.breaker.before_call()
+        try:
+            with pymongo.timeout(self.timeout):
+                result = fn(*args, **kwargs)
+        except PyMongoError as e:
+            if is_outage(e):
+                self.breaker.record_failure(e)
+                raise DatabaseUnavailable(f"{self.name}: {e}") from e
+            self.breaker.record_success()  # The server answered
+            raise
+        except BaseException:
+            # StopIteration from an exhausted cursor, or a caller bug: not an outage
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+
+class ResilientCursor:
+    """Cursor proxy whose batch fetches go through the collection's guard."""
+
+    def __init__(self, cursor, guard):
+        self._cursor = cursor
+        self._guard = guard
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)  # sort/limit/skip/... only build the query
+            return self if result is self._cursor else result
+        return call
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._guard.call(next, self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class ResilientCollection:
+    """
+    Drop-in wrapper for a pymongo ``Collection``.
+
+    ``collection`` may be None when no database could be configured at all;
+    every operation then raises DatabaseUnavailable.
+    """
+
+    def __init__(self, collection, name, breaker, timeout):
+        self._collection = collection
+        self.name = name
+        self._guard = _Guard(name, breaker, timeout)
+
+    def __getattr__(self, name):
+        if self._collection is None:
+            raise DatabaseUnavailable(f"{self.name}: database not configured")
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        if name in LAZY_CURSOR_METHODS:
+            # Nothing is sent until the first batch is fetched, which the cursor guards
+            return lambda *args, **kwargs: ResilientCursor(attr(*args, **kwargs), self._guard)
+
+        def call(*args, **kwargs):
+            result = self._guard.call(attr, *args, **kwargs)
+            if hasattr(result, '__next__'):  # aggregate(), list_indexes(), ...
+                return ResilientCursor(result, self._guard)
+            return result
+        return call
+
+
+def wrap_collection(db, name, breaker, timeout):
+    return ResilientCollection(db[name] if db is not None else None, name, breaker, timeout)
@@ -0,0 +1,183 @@
+"""
+Declarative MongoDB index definitions matching the app's query shapes.
+
+``ensure_indexes`` is idempotent and runs at startup (unless
+``ENSURE_INDEXES_ON_STARTUP=false``); the same definitions can be applied or
+checked from the command line:
+
+    python db_indexes.py           # create missing indexes
+    python db_indexes.py --check   # explain each query shape, report COLLSCANs
+"""
+
+import argparse
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+from pymongo.errors import OperationFailure
+
+import event_store
+
+# collection -> list of (keys, options)
+INDEXES = {
+    'alerts': [
+        # get_admin_alerts: each filter combined with the default timestamp sort.
+        # _id is the keyset pagination tie-breaker, so it completes every sort.
+        ([('session_id', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)], {'name': 'session_timestamp_id'}),
+        ([('student_username', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)], {'name': 'student_timestamp_id'}),
+        ([('alert_type', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)], {'name': 'type_timestamp_id'}),
+        ([('severity', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)], {'name': 'severity_timestamp_id'}),
+        # Unfiltered log and date-range queries
+        ([('timestamp', DESCENDING), ('_id', DESCENDING)], {'name': 'timestamp_id'}),
+    ],
+    'users': [
+        # login_user / register_user lookups
+        ([('username', ASCENDING)], {'name': 'username_unique', 'unique': True}),
+    ],
+}
+
+EVENT_INDEXES = {
+    event_store.STANDARD: [
+        ([('session_id', ASCENDING), ('timestamp', DESCENDING)], {'name': 'session_timestamp'}),
+        ([('timestamp', DESCENDING)], {'name': 'timestamp'}),
+    ],
+    event_store.TIMESERIES: [
+        ([('meta.session_id', ASCENDING), ('timestamp', DESCENDING)], {'name': 'session_timestamp'}),
+        ([('timestamp', DESCENDING)], {'name': 'timestamp'}),
+    ],
+}
+
+# Indexes replaced by a definition above under a new name: collection -> names.
+# Dropped by ensure_indexes so they do not keep costing writes.
+OBSOLETE_INDEXES = {
+    'alerts': ['session_timestamp', 'student_timestamp', 'type_timestamp', 'severity_timestamp', 'timestamp'],
+}
+
+# Representative queries for --check: (collection, filter, sort)
+QUERY_SHAPES = [
+    ('alerts', {}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('alerts', {'session_id': '?'}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('alerts', {'student_username': '?'}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('alerts', {'alert_type': '?'}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('alerts', {'severity': '?'}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('alerts', {'timestamp': {'$gte': '?'}}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('users', {'username': '?'}, None),
+]
+
+
+def index_definitions(events_mode):
+    """All index definitions for the given events storage mode."""
+    definitions = dict(INDEXES)
+    definitions['proctoring_events'] = EVENT_INDEXES.get(events_mode, EVENT_INDEXES[event_store.STANDARD])
+    return definitions
+
+
+def ensure_indexes(db, events_mode=event_store.STANDARD):
+    """
+    Create any missing indexes and drop the obsolete ones.
+
+    Each index is created separately so one conflict (e.g. duplicate
+    usernames blocking the unique index) does not prevent the others.
+
+    Returns
+    -------
+    failures : list of string
+        Human-readable description of indexes that could not be created or dropped.
+
+    """
+    failures = []
+    for collection_name, specs in index_definitions(events_mode).items():
+        for keys, options in specs:
+            try:
+                db[collection_name].create_indexes([IndexModel(keys, **options)])
+            except OperationFailure as e:
+                failures.append(f"{collection_name}.{options['name']}: {e}")
+                print(f"[DB_INDEX_WARNING] Could not create index {collection_name}.{options['name']}: {e}", flush=True)
+    for collection_name, names in OBSOLETE_INDEXES.items():
+        existing = set(db[collection_name].index_information())
+        for name in names:
+            if name not in existing:
+                continue
+            try:
+                db[collection_name].drop_index(name)
+                print(f"[DB_INDEX] Dropped obsolete index {collection_name}.{name}", flush=True)
+            except OperationFailure as e:
+                failures.append(f"{collection_name}.{name} (drop): {e}")
+                print(f"[DB_INDEX_WARNING] Could not drop index {collection_name}.{name}: {e}", flush=True)
+    return failures
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        yield plan['stage']
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        yield from _plan_stages(child)
+
+
+def check_query_plans(db, events_mode=event_store.STANDARD):
+    """
+    Explain each known query shape and report the ones without index support.
+
+    Returns
+    -------
+    report : list of dict
+        One entry per shape with its winning plan stages and a ``collscan``
+        flag.
+
+    """
+    shapes = list(QUERY_SHAPES)
+    shapes.append(('proctoring_events', event_store.session_filter('?', events_mode), [('timestamp', DESCENDING)]))
+    shapes.append(('proctoring_events', {}, [('timestamp', DESCENDING)]))
+
+    report = []
+    for collection_name, query, sort in shapes:
+        cursor = db[collection_name].find(query).limit(50)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        stages = list(_plan_stages(winning_plan))
+        report.append({
+            'collection': collection_name,
+            'filter': query,
+            'sort': sort,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+        })
+    return report
+
+
+def main():
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description='Create or check the ExamGuard MongoDB indexes.')
+    parser.add_argument('--uri', default=get_config().MONGO_URI)
+    parser.add_argument('--check', action='store_true', help='report query shapes that fall back to COLLSCAN')
+    args = parser.parse_args()
+
+    db = MongoClient(args.uri).get_default_database()
+    events_mode = (
+        event_store.TIMESERIES
+        if event_store.collection_type(db, 'proctoring_events') == 'timeseries'
+        else event_store.STANDARD
+    )
+
+    if not args.check:
+        failures = ensure_indexes(db, events_mode)
+        print(f"[DB_INDEX] Indexes ensured ({len(failures)} failures)", flush=True)
+        raise SystemExit(1 if failures else 0)
+
+    collscans = 0
+    for entry in check_query_plans(db, events_mode):
+        status = 'COLLSCAN' if entry['collscan'] else 'ok'
+        collscans += entry['collscan']
+        print(f"[DB_INDEX_CHECK] {status:8} {entry['collection']} filter={entry['filter']} "
+              f"sort={entry['sort']} plan={' <- '.join(entry['stages'])}", flush=True)
+    raise SystemExit(1 if collscans else 0)
+
+
+if __name__ == '__main__':
+    main()
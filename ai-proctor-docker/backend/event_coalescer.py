@@ -0,0 +1,191 @@
+"""
+Run-length coalescing of consecutive identical ``face_analyzed`` events.
+
+For most of an exam a student's state does not change between frames
+(``eye_status: forward``, ``face_count: 1``), so storing one document per
+frame is almost entirely redundant. The coalescer keeps one open *range*
+document per session and extends it while the state stays the same:
+
+    {
+        "_id": ObjectId, "event_type": "face_analyzed", "coalesced": True,
+        "session_id": ..., "username": ...,
+        "timestamp": <first sample>, "end_timestamp": <last sample>,
+        "sample_count": N, "details": {...}
+    }
+
+Ranges are written through the :class:`event_writer.BufferedEventWriter` as
+upserts when they open, periodically while they grow, and when they close.
+In append-only mode (time-series storage, where documents cannot be updated)
+each range is inserted once when it closes, and ranges are closed after the
+checkpoint interval so an open range never holds more than that much data.
+"""
+
+import atexit
+import datetime
+import threading
+
+from bson import ObjectId
+
+
+def _state_key(event):
+    details = event.get("details") or {}
+    return (event.get("username"), tuple(sorted(details.items())))
+
+
+def expand_range(event):
+    """
+    Expand a stored range into per-sample events, newest first.
+
+    Sample timestamps are spread evenly between the range start and end;
+    plain (non-range) events are returned unchanged.
+
+    """
+    if not event.get("coalesced"):
+        return [event]
+    count = max(int(event.get("sample_count", 1)), 1)
+    start = event["timestamp"]
+    end = event.get("end_timestamp") or start
+    step = (end - start) / (count - 1) if count > 1 else datetime.timedelta(0)
+    samples = []
+    for i in reversed(range(count)):
+        sample = {k: v for k, v in event.items() if k not in ("end_timestamp", "sample_count", "coalesced")}
+        sample["_id"] = f"{event['_id']}:{i}"
+        sample["timestamp"] = start + step * i
+        sample["range_id"] = event["_id"]
+        samples.append(sample)
+    return samples
+
+
+class FaceEventCoalescer:
+    """
+    Collapses consecutive identical events per session into range documents.
+
+    Parameters
+    ----------
+    writer : event_writer.BufferedEventWriter
+        Writer used for all range upserts.
+    checkpoint_interval : float
+        Seconds between re-writes of a range that is still growing. Bounds
+        how much of an open range can be lost on a crash.
+    max_gap : float
+        A sample arriving more than this many seconds after the previous one
+        starts a new range even if the state is unchanged, so gaps in
+        monitoring stay visible on the timeline.
+    append_only : bool
+        Insert each range once when it closes instead of upserting it.
+
+    """
+
+    def __init__(self, writer, checkpoint_interval=60.0, max_gap=30.0, append_only=False):
+        self.writer = writer
+        self.append_only = append_only
+        self.checkpoint_interval = checkpoint_interval
+        self.max_gap = datetime.timedelta(seconds=max_gap)
+
+        self._open_ranges = {}  # session_id -> {"key", "doc", "dirty", "opened_at", "checkpointed_at"}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._samples_total = 0
+        self._ranges_total = 0
+
+    def start(self):
+        """Start periodic checkpointing and register the shutdown flush."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="event-coalescer", daemon=True)
+        self._thread.start()
+        # atexit runs handlers in reverse order, so register after the writer
+        # to close ranges before its final flush.
+        atexit.register(self.close_all)
+
+    def add(self, event):
+        """Record one ``face_analyzed`` event for its session."""
+        session_id = event["session_id"]
+        timestamp = event["timestamp"]
+        key = _state_key(event)
+        with self._lock:
+            self._samples_total += 1
+            current = self._open_ranges.get(session_id)
+            if (current is not None and current["key"] == key
+                    and timestamp - current["doc"]["end_timestamp"] <= self.max_gap):
+                current["doc"]["end_timestamp"] = timestamp
+                current["doc"]["sample_count"] += 1
+                current["dirty"] = True
+                return
+
+            if current is not None:
+                self._finish(current)
+            doc = {
+                **event,
+                "_id": ObjectId(),
+                "coalesced": True,
+                "end_timestamp": timestamp,
+                "sample_count": 1,
+            }
+            now = datetime.datetime.utcnow()
+            current = {"key": key, "doc": doc, "dirty": True, "opened_at": now, "checkpointed_at": now}
+            self._open_ranges[session_id] = current
+            self._ranges_total += 1
+            if not self.append_only:
+                # Write the opening sample straight away so live review sees state changes
+                self._write(current)
+
+    def close_session(self, session_id):
+        """Write and forget the open range of a finished session."""
+        with self._lock:
+            current = self._open_ranges.pop(session_id, None)
+            if current is not None:
+                self._finish(current)
+
+    def close_all(self):
+        """Write every open range (used at shutdown)."""
+        with self._lock:
+            for current in self._open_ranges.values():
+                self._finish(current)
+            self._open_ranges.clear()
+        self._stopped.set()
+
+    def _write(self, current):
+        self.writer.enqueue_replace(dict(current["doc"]))
+        current["dirty"] = False
+        current["checkpointed_at"] = datetime.datetime.utcnow()
+
+    def _finish(self, current):
+        """Write a range that will not be extended any further."""
+        if self.append_only:
+            self.writer.enqueue(dict(current["doc"]))
+        elif current["dirty"]:
+            self._write(current)
+
+    def checkpoint(self):
+        """Write ranges that have grown since their last write; drop idle ones."""
+        now = datetime.datetime.utcnow()
+        due_before = now - datetime.timedelta(seconds=self.checkpoint_interval)
+        with self._lock:
+            for session_id, current in list(self._open_ranges.items()):
+                idle = now - current["doc"]["end_timestamp"] > self.max_gap
+                if idle or (self.append_only and current["opened_at"] <= due_before):
+                    # Idle: the next sample would open a new range anyway
+                    self._finish(current)
+                    del self._open_ranges[session_id]
+                elif current["dirty"] and current["checkpointed_at"] <= due_before:
+                    self._write(current)
+
+    def _run(self):
+        while not self._stopped.wait(self.checkpoint_interval):
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"[EVENT_COALESCER_ERROR] Checkpoint failed: {e}", flush=True)
+
+    def stats(self):
+        """Sample-to-range ratio for the metrics endpoint."""
+        with self._lock:
+            open_ranges = len(self._open_ranges)
+        return {
+            "open_ranges": open_ranges,
+            "samples_total": self._samples_total,
+            "ranges_total": self._ranges_total,
+            "compression_ratio": (self._samples_total / self._ranges_total) if self._ranges_total else None,
+        }
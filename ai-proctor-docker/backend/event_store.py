@@ -0,0 +1,95 @@
+"""
+Storage layout of the ``proctoring_events`` collection.
+
+Two modes are supported:
+
+``standard``
+    Plain collection, one document per event (or coalesced range) with
+    ``session_id`` and ``username`` at the top level.
+
+``timeseries``
+    MongoDB time-series collection with ``timestamp`` as timeField and
+    ``meta: {session_id, username}`` as metaField. Mongo buckets a session's
+    events together, so per-session timeline scans read a few compressed
+    buckets instead of thousands of documents. Time-series documents cannot
+    be updated in place, so coalesced ranges are written once, when closed.
+
+Handlers use :func:`to_storage`, :func:`from_storage` and
+:func:`session_filter` so they do not care which layout is active.
+"""
+
+STANDARD = 'standard'
+TIMESERIES = 'timeseries'
+STORAGE_MODES = (STANDARD, TIMESERIES)
+
+META_FIELDS = ('session_id', 'username')
+
+TIMESERIES_OPTIONS = {
+    'timeField': 'timestamp',
+    'metaField': 'meta',
+    'granularity': 'seconds',
+}
+
+
+def collection_type(db, name):
+    """Return 'timeseries', 'collection' or None if ``name`` does not exist."""
+    for info in db.list_collections(filter={'name': name}):
+        return info.get('type', 'collection')
+    return None
+
+
+def ensure_events_collection(db, requested_mode, name='proctoring_events'):
+    """
+    Create the events collection in the requested layout if it is missing.
+
+    An existing collection is never converted here (use
+    ``migrate_events_timeseries.py``); its actual layout wins.
+
+    Returns
+    -------
+    mode : string
+        The storage mode in effect for ``name``.
+
+    """
+    if requested_mode not in STORAGE_MODES:
+        print(f"[WARNING] Unknown EVENTS_STORAGE_MODE '{requested_mode}', using '{STANDARD}'", flush=True)
+        requested_mode = STANDARD
+
+    existing = collection_type(db, name)
+    if existing is None:
+        if requested_mode == TIMESERIES:
+            db.create_collection(name, timeseries=TIMESERIES_OPTIONS)
+            print(f"[INFO] Created time-series collection '{name}'", flush=True)
+        return requested_mode
+
+    actual_mode = TIMESERIES if existing == 'timeseries' else STANDARD
+    if actual_mode != requested_mode:
+        print(f"[WARNING] EVENTS_STORAGE_MODE is '{requested_mode}' but '{name}' is a {existing}; "
+              f"using '{actual_mode}'. Run migrate_events_timeseries.py to convert.", flush=True)
+    return actual_mode
+
+
+def to_storage(event, mode):
+    """Convert an application event document to the stored layout."""
+    if mode != TIMESERIES:
+        return event
+    stored = {k: v for k, v in event.items() if k not in META_FIELDS}
+    stored['meta'] = {field: event.get(field) for field in META_FIELDS}
+    return stored
+
+
+def from_storage(event, mode):
+    """Convert a stored event document back to the application layout."""
+    if mode != TIMESERIES or 'meta' not in event:
+        return event
+    meta = event.pop('meta') or {}
+    for field in META_FIELDS:
+        event[field] = meta.get(field)
+    return event
+
+
+def session_filter(session_id, mode):
+    """Query filter selecting one session's events."""
+    if mode == TIMESERIES:
+        return {'meta.session_id': session_id}
+    return {'session_id': session_id}
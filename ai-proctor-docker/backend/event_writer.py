@@ -0,0 +1,281 @@
+"""
+Buffered, bulk writer for high-volume proctoring events.
+
+``analyze_face`` produces one ``face_analyzed`` event per frame. Writing each
+with ``insert_one`` puts a MongoDB round trip on every request; instead the
+handler enqueues the document and a background flusher writes batches with
+unordered ``insert_many`` whenever the batch size or flush interval is hit.
+
+Documents that are updated in place (coalesced event ranges) are queued as
+replacements keyed by ``_id``; only the latest version of each is written,
+as an upsert in the same unordered bulk request.
+
+With a :class:`spool.Spool` attached, batches that cannot be written (the
+database is down, slow or the circuit breaker is open) are appended to the
+local spool instead of being held in memory. While the spool still has
+records to replay, new batches are spooled behind them so the database sees
+every write in the order it was made.
+"""
+
+import atexit
+import collections
+import threading
+import time
+
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class BufferedEventWriter:
+    """
+    Bounded in-memory buffer flushed to a collection with ``insert_many``.
+
+    Parameters
+    ----------
+    collection : pymongo.collection.Collection or None
+        Target collection. While None, events stay buffered.
+    batch_size : int
+        Flush as soon as this many events are pending; also the largest batch.
+    flush_interval : float
+        Flush at least this often (seconds) when events are pending.
+    max_buffer : int
+        Hard cap on pending events. Events enqueued beyond it are dropped and
+        counted, so a database outage cannot exhaust worker memory.
+    prepare : callable, optional
+        Applied to every document as it is enqueued, e.g. to convert it to
+        the collection's storage layout.
+    spool : spool.Spool, optional
+        Durable fallback for batches the database did not accept.
+
+    """
+
+    def __init__(self, collection, batch_size=500, flush_interval=1.0, max_buffer=50000, name='events',
+                 prepare=None, spool=None):
+        self.collection = collection
+        self.prepare = prepare
+        self.spool = spool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.name = name
+
+        self._buffer = collections.deque()
+        self._replacements = collections.OrderedDict()  # _id -> latest document
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+        self._written_total = 0
+        self._dropped_total = 0
+        self._failed_flushes = 0
+        self._spooled_total = 0
+        self._last_flush_latency_ms = None
+        self._max_flush_latency_ms = 0.0
+        self._last_flush_at = None
+        self._last_error = None
+
+    def start(self):
+        """Start the background flusher and register the shutdown flush."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _pending_count(self):
+        return len(self._buffer) + len(self._replacements)
+
+    def enqueue(self, doc):
+        """
+        Queue one document for writing.
+
+        Returns
+        -------
+        accepted : bool
+            False if the buffer is full and the document was dropped.
+
+        """
+        if self.prepare is not None:
+            doc = self.prepare(doc)
+        with self._lock:
+            if self._pending_count() >= self.max_buffer:
+                self._dropped_total += 1
+                return False
+            self._buffer.append(doc)
+            pending = self._pending_count()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def enqueue_replace(self, doc):
+        """
+        Queue an upsert of ``doc`` by its ``_id``.
+
+        A newer version of a document that is still pending replaces the
+        older one, so a range extended many times between flushes costs a
+        single write.
+
+        Returns
+        -------
+        accepted : bool
+            False if the buffer is full and the document was dropped.
+
+        """
+        if self.prepare is not None:
+            doc = self.prepare(doc)
+        with self._lock:
+            doc_id = doc['_id']
+            if doc_id not in self._replacements and self._pending_count() >= self.max_buffer:
+                self._dropped_total += 1
+                return False
+            self._replacements[doc_id] = doc
+            pending = self._pending_count()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _requeue(self, docs, replacements=()):
+        """Put unwritten documents back at the front, respecting the bound."""
+        with self._lock:
+            for doc in replacements:
+                # A newer version enqueued during the flush supersedes this one
+                if doc['_id'] not in self._replacements:
+                    self._replacements[doc['_id']] = doc
+                    self._replacements.move_to_end(doc['_id'], last=False)
+            room = self.max_buffer - self._pending_count()
+            if room < len(docs):
+                self._dropped_total += len(docs) - max(room, 0)
+                docs = docs[:max(room, 0)]
+            self._buffer.extendleft(reversed(docs))
+
+    def flush(self):
+        """
+        Write everything currently pending, one batch at a time.
+
+        Returns
+        -------
+        written : int
+            Number of documents acknowledged by the database.
+
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending_count():
+                        break
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                    replacements = []
+                    while self._replacements and len(batch) + len(replacements) < self.batch_size:
+                        replacements.append(self._replacements.popitem(last=False)[1])
+                batch_written = self._write_batch(batch, replacements)
+                written += batch_written
+                if batch_written < len(batch) + len(replacements) and self._last_error is not None:
+                    break  # Database is failing; retry on the next tick
+        return written
+
+    def _spill(self, batch, replacements):
+        """Append a batch to the spool; requeue it in memory if that fails."""
+        try:
+            self.spool.append_many(self.collection.name, batch, replacements)
+        except Exception as e:
+            print(f"[EVENT_WRITER_ERROR] Could not spool {len(batch) + len(replacements)} {self.name}: {e}", flush=True)
+            self._requeue(batch, replacements)
+            return 0
+        self._spooled_total += len(batch) + len(replacements)
+        return len(batch) + len(replacements)
+
+    def _write_batch(self, batch, replacements=()):
+        total = len(batch) + len(replacements)
+        if self.spool is not None and self.spool.pending():
+            # Earlier writes are still being replayed; queue behind them
+            return self._spill(batch, replacements)
+        if self.collection is None:
+            self._requeue(batch, replacements)
+            self._failed_flushes += 1
+            self._last_error = "collection unavailable"
+            return 0
+
+        started = time.perf_counter()
+        try:
+            if replacements:
+                requests = [InsertOne(doc) for doc in batch]
+                requests.extend(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in replacements)
+                self.collection.bulk_write(requests, ordered=False)
+            else:
+                self.collection.insert_many(batch, ordered=False)
+            written = total
+            self._last_error = None
+        except BulkWriteError as bwe:
+            # Unordered: everything not listed in writeErrors was written.
+            # Duplicates mean the document is already stored, so drop them.
+            errors = [err for err in bwe.details.get('writeErrors', []) if err.get('code') != DUPLICATE_KEY_ERROR]
+            failed = [err['index'] for err in errors]
+            written = total - len(failed)
+            if failed:
+                self._requeue([batch[i] for i in failed if i < len(batch)],
+                              [replacements[i - len(batch)] for i in failed if i >= len(batch)])
+                self._failed_flushes += 1
+                self._last_error = errors[0].get('errmsg')
+            else:
+                self._last_error = None
+        except Exception as e:
+            self._failed_flushes += 1
+            self._last_error = str(e)
+            print(f"[EVENT_WRITER_ERROR] Flush of {total} {self.name} failed: {e}", flush=True)
+            if self.spool is not None:
+                return self._spill(batch, replacements)
+            self._requeue(batch, replacements)
+            return 0
+
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        self._written_total += written
+        self._last_flush_latency_ms = latency_ms
+        self._max_flush_latency_ms = max(self._max_flush_latency_ms, latency_ms)
+        self._last_flush_at = time.time()
+        return written
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[EVENT_WRITER_ERROR] Unexpected flusher error: {e}", flush=True)
+
+    def close(self):
+        """Stop the flusher and write whatever is still buffered."""
+        self._stopped = True
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[EVENT_WRITER_ERROR] Final flush failed: {e}", flush=True)
+        with self._lock:
+            remaining = self._pending_count()
+        if remaining:
+            print(f"[EVENT_WRITER_WARNING] {remaining} {self.name} were still buffered at shutdown", flush=True)
+
+    def stats(self):
+        """Queue depth and flush latency for the metrics endpoint."""
+        with self._lock:
+            queue_depth = self._pending_count()
+        return {
+            "queue_depth": queue_depth,
+            "max_buffer": self.max_buffer,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "written_total": self._written_total,
+            "dropped_total": self._dropped_total,
+            "failed_flushes": self._failed_flushes,
+            "spooled_total": self._spooled_total,
+            "last_flush_latency_ms": self._last_flush_latency_ms,
+            "max_flush_latency_ms": self._max_flush_latency_ms,
+            "last_flush_at": self._last_flush_at,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,69 @@
+"""
+Chunked NDJSON / CSV serialisation of Mongo cursors for streaming exports.
+
+The generators pull documents from a cursor (which fetches them from the
+server in batches) and yield the encoded output in chunks of roughly
+``chunk_size`` bytes, so memory use stays constant however many documents
+an exam produced.
+"""
+
+import csv
+import datetime
+import io
+import json
+
+from bson import ObjectId
+
+EVENT_COLUMNS = ['_id', 'timestamp', 'end_timestamp', 'sample_count', 'session_id', 'username',
+                 'event_type', 'details']
+ALERT_COLUMNS = ['_id', 'timestamp', 'session_id', 'username', 'student_username', 'alert_type',
+                 'severity', 'message', 'snapshot_filename', 'audio_filename', 'is_acknowledged', 'details']
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, sort_keys=True)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_ndjson(docs, chunk_size=64 * 1024):
+    """Yield newline-delimited JSON for ``docs`` in ~``chunk_size`` chunks."""
+    parts = []
+    size = 0
+    for doc in docs:
+        line = json.dumps(doc, default=_json_default) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def iter_csv(docs, columns, chunk_size=64 * 1024):
+    """Yield CSV (header first) for ``docs`` in ~``chunk_size`` chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for doc in docs:
+        writer.writerow([_csv_value(doc.get(column)) for column in columns])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
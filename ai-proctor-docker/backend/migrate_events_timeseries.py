@@ -0,0 +1,203 @@
+"""
+Migrate proctoring_events to the MongoDB time-series layout.
+
+Copies every document from the existing plain collection into a new
+time-series collection (``meta: {session_id, username}`` as metaField), then
+optionally swaps the names so the app picks up the new layout when started
+with ``EVENTS_STORAGE_MODE=timeseries``.
+
+Each pass copies the source documents that are not in the target yet,
+found by walking both collections' ``_id``s in order, so documents written
+late with a lower ``_id`` (ObjectIds from different workers, spool replays)
+are picked up by the next pass. Time-series documents cannot be updated,
+so a pass run while the app is live only copies *settled* documents: those
+older than ``--settle-seconds``, and coalesced ranges whose last sample is
+that old and so can no longer grow. ``--swap`` copies everything that is
+left and refuses to run while the source is still being written to; stop
+the app first.
+
+Usage:
+    python migrate_events_timeseries.py                      # copy settled events into proctoring_events_ts
+    python migrate_events_timeseries.py --swap               # app stopped: copy the rest, then rename into place
+    python migrate_events_timeseries.py --benchmark SESSION  # compare timeline query latency
+"""
+
+import argparse
+import datetime
+import statistics
+import time
+
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+import event_store
+from config import get_config
+
+SCAN_FIELDS = {'_id': 1, 'timestamp': 1, 'end_timestamp': 1, 'coalesced': 1}
+
+
+def _target_ids(target, batch_size):
+    """The target's _ids in ascending order."""
+    cursor = target.find({}, {'_id': 1}).sort('_id', ASCENDING).allow_disk_use(True).batch_size(batch_size)
+    for doc in cursor:
+        yield doc['_id']
+
+
+def _settled(doc, settled_before):
+    if settled_before is None:
+        return True
+    last_sample = doc.get('end_timestamp') if doc.get('coalesced') else None
+    return max(doc['timestamp'], last_sample or doc['timestamp']) < settled_before
+
+
+def copy_events(source, target, batch_size, settled_before=None):
+    """
+    Copy the source documents missing from the target.
+
+    Parameters
+    ----------
+    settled_before : datetime, optional
+        Only copy documents (and ranges whose last sample is) older than
+        this; the rest are left for a later pass.
+
+    Returns
+    -------
+    copied, skipped, deferred : tuple of int
+        Documents copied, documents without a datetime ``timestamp`` (which a
+        time-series collection cannot hold), and documents left for later.
+
+    """
+    target_ids = _target_ids(target, batch_size)
+    next_target_id = next(target_ids, None)
+    copied = skipped = deferred = 0
+    pending_ids = []
+
+    def copy_pending():
+        docs = source.find({'_id': {'$in': pending_ids}}).sort('_id', ASCENDING)
+        batch = [event_store.to_storage(doc, event_store.TIMESERIES) for doc in docs]
+        if batch:
+            target.insert_many(batch, ordered=True)
+        pending_ids.clear()
+        return len(batch)
+
+    for doc in source.find({}, SCAN_FIELDS).sort('_id', ASCENDING).batch_size(batch_size):
+        while next_target_id is not None and next_target_id < doc['_id']:
+            next_target_id = next(target_ids, None)
+        if next_target_id == doc['_id']:
+            continue  # Copied by an earlier pass
+        if not isinstance(doc.get('timestamp'), datetime.datetime):
+            skipped += 1  # timeField is mandatory in a time-series collection
+            continue
+        if not _settled(doc, settled_before):
+            deferred += 1
+            continue
+        pending_ids.append(doc['_id'])
+        if len(pending_ids) >= batch_size:
+            copied += copy_pending()
+            print(f"[MIGRATE] Copied {copied} events...", flush=True)
+    if pending_ids:
+        copied += copy_pending()
+    return copied, skipped, deferred
+
+
+def last_write(source):
+    """Time of the newest sample in the source (range ends included), or None."""
+    newest = source.find_one({}, sort=[('timestamp', DESCENDING)], projection={'timestamp': 1})
+    newest_range = source.find_one({'coalesced': True}, sort=[('end_timestamp', DESCENDING)],
+                                   projection={'end_timestamp': 1})
+    times = [doc.get(field) for doc, field in ((newest, 'timestamp'), (newest_range, 'end_timestamp'))
+             if doc is not None and isinstance(doc.get(field), datetime.datetime)]
+    return max(times) if times else None
+
+
+def time_timeline_query(collection, session_filter, runs):
+    """Return (median ms, p95 ms, docs examined) for a session timeline scan."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        list(collection.find(session_filter).sort('timestamp', ASCENDING))
+        timings.append((time.perf_counter() - started) * 1000.0)
+    timings.sort()
+    explain = collection.find(session_filter).sort('timestamp', ASCENDING).explain()
+    examined = explain.get('executionStats', {}).get('totalDocsExamined')
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95, examined
+
+
+def benchmark(db, standard_name, timeseries_name, session_id, runs):
+    print(f"[BENCHMARK] Timeline query for session {session_id}, {runs} runs each", flush=True)
+    for name, mode in ((standard_name, event_store.STANDARD), (timeseries_name, event_store.TIMESERIES)):
+        if event_store.collection_type(db, name) is None:
+            print(f"[BENCHMARK] {name}: missing, skipped", flush=True)
+            continue
+        median_ms, p95_ms, examined = time_timeline_query(
+            db[name], event_store.session_filter(session_id, mode), runs)
+        print(f"[BENCHMARK] {name} ({mode}): median {median_ms:.1f} ms, p95 {p95_ms:.1f} ms, "
+              f"docs examined {examined}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--uri', default=get_config().MONGO_URI)
+    parser.add_argument('--source', default='proctoring_events')
+    parser.add_argument('--target', default='proctoring_events_ts')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--swap', action='store_true',
+                        help='with the app stopped: copy everything left, then rename source to '
+                             '<source>_legacy and target to source')
+    parser.add_argument('--settle-seconds', type=int, default=600,
+                        help='live passes only copy events (and range ends) older than this')
+    parser.add_argument('--quiet-seconds', type=int, default=120,
+                        help='--swap refuses to run if the source was written to more recently than this')
+    parser.add_argument('--benchmark', metavar='SESSION_ID',
+                        help='only time a session timeline query on both collections')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    db = client.get_default_database()
+
+    if args.benchmark:
+        benchmark(db, args.source, args.target, args.benchmark, args.runs)
+        return
+
+    if event_store.collection_type(db, args.source) == 'timeseries':
+        print(f"[MIGRATE] '{args.source}' is already a time-series collection; nothing to do.", flush=True)
+        return
+    target_type = event_store.collection_type(db, args.target)
+    if target_type is None:
+        db.create_collection(args.target, timeseries=event_store.TIMESERIES_OPTIONS)
+        print(f"[MIGRATE] Created time-series collection '{args.target}'", flush=True)
+    elif target_type != 'timeseries':
+        raise SystemExit(f"'{args.target}' exists and is not a time-series collection")
+
+    now = datetime.datetime.utcnow()
+    if args.swap:
+        newest = last_write(db[args.source])
+        if newest is not None and newest > now - datetime.timedelta(seconds=args.quiet_seconds):
+            raise SystemExit(f"'{args.source}' was written to at {newest.isoformat()}Z; stop the app "
+                             f"(and wait {args.quiet_seconds}s after its last write) before --swap")
+        settled_before = None
+    else:
+        settled_before = now - datetime.timedelta(seconds=args.settle_seconds)
+
+    copied, skipped, deferred = copy_events(db[args.source], db[args.target], args.batch_size, settled_before)
+    print(f"[MIGRATE] Copied {copied} events into '{args.target}'", flush=True)
+    if skipped:
+        print(f"[MIGRATE_WARNING] Skipped {skipped} events without a datetime timestamp; "
+              f"they stay in '{args.source}' only", flush=True)
+    if deferred:
+        print(f"[MIGRATE] {deferred} events from the last {args.settle_seconds}s (or ranges still growing) "
+              f"were left for the next pass", flush=True)
+
+    if args.swap:
+        legacy_name = f"{args.source}_legacy"
+        db[args.source].rename(legacy_name)
+        db[args.target].rename(args.source)
+        print(f"[MIGRATE] '{args.source}' renamed to '{legacy_name}'; '{args.target}' is now '{args.source}'. "
+              f"Restart the app with EVENTS_STORAGE_MODE=timeseries.", flush=True)
+        print(f"[MIGRATE] Compare with: python migrate_events_timeseries.py --benchmark <session_id> "
+              f"--source {legacy_name} --target {args.source}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Keyset (cursor) pagination helpers and a short-TTL count cache.
+
+Skip/limit pagination makes page N cost N * per_page index entries, and an
+exact ``count_documents`` on every request repeats the same work. Cursors
+instead remember the (sort value, ``_id``) of the last row returned, so every
+page is a bounded index range scan regardless of depth.
+"""
+
+import base64
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from bson import Decimal128, ObjectId, json_util
+from pymongo import ASCENDING
+
+# BSON types in MongoDB's cross-type sort order, as $type aliases. A missing
+# field sorts as null.
+SORT_TYPE_ORDER = ['null', 'number', 'string', 'object', 'binData', 'objectId', 'bool', 'date']
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor is malformed or belongs to a different query."""
+
+
+def query_fingerprint(query, sort_by, direction):
+    """Stable short hash identifying a filter + sort combination."""
+    canonical = json_util.dumps({'q': query, 's': sort_by, 'd': direction}, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_cursor(doc, sort_by, direction, fingerprint, backwards=False):
+    """Opaque cursor pointing just past ``doc`` in the given sort order."""
+    payload = {
+        'v': doc.get(sort_by),
+        'id': doc['_id'],
+        'f': fingerprint,
+        'b': backwards,
+    }
+    raw = json_util.dumps(payload).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, fingerprint):
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    Returns
+    -------
+    value, last_id, backwards : tuple
+
+    Raises
+    ------
+    InvalidCursor
+        If the cursor cannot be decoded or was issued for another query.
+
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json_util.loads(raw.decode('utf-8'))
+    except Exception as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if payload.get('f') != fingerprint:
+        raise InvalidCursor("Cursor does not match the current filters or sort order")
+    return payload.get('v'), payload['id'], bool(payload.get('b'))
+
+
+def _sort_type(value):
+    """$type alias of a cursor value, for placing it in the cross-type sort order."""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float, Decimal128)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, dict):
+        return 'object'
+    if isinstance(value, bytes):
+        return 'binData'
+    if isinstance(value, ObjectId):
+        return 'objectId'
+    if isinstance(value, datetime.datetime):
+        return 'date'
+    raise InvalidCursor(f"Unsupported cursor value type: {type(value).__name__}")
+
+
+def keyset_filter(sort_by, direction, value, last_id):
+    """
+    Filter selecting rows strictly after (value, last_id) in sort order.
+
+    Sorting is always on (sort_by, _id) in the same direction, so _id breaks
+    ties between rows with equal sort values.
+
+    ``$gt``/``$lt`` only compare values of the same BSON type, while a sort
+    orders rows of different types (and missing fields, as null) by type
+    first. The filter therefore also selects every row whose sort field is
+    of a type that comes later in that order, so paging carries on past a
+    type boundary, e.g. from alerts without a severity to those with one, or
+    from legacy string timestamps to dates.
+
+    """
+    op = '$gt' if direction == ASCENDING else '$lt'
+    if sort_by == '_id':
+        return {'_id': {op: last_id}}
+
+    value_type = _sort_type(value)
+    branches = [{sort_by: value, '_id': {op: last_id}}]  # {field: None} also matches a missing field
+    if value is not None:
+        branches.insert(0, {sort_by: {op: value}})
+
+    rank = SORT_TYPE_ORDER.index(value_type)
+    if direction == ASCENDING:
+        later_types = SORT_TYPE_ORDER[rank + 1:]
+    else:
+        later_types = SORT_TYPE_ORDER[:rank]
+        if later_types:
+            # $type 'null' does not match a missing field, an equality on None matches both
+            branches.append({sort_by: None})
+            later_types = later_types[1:]
+    if later_types:
+        branches.append({sort_by: {'$type': later_types}})
+    return {'$or': branches}
+
+
+class CountCache:
+    """
+    Small TTL cache of ``count_documents`` results keyed by query.
+
+    Unfiltered counts use ``estimated_document_count`` (collection metadata)
+    and are reported as estimates.
+    """
+
+    def __init__(self, ttl_seconds=10.0, max_entries=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, collection, query):
+        """
+        Returns
+        -------
+        total, is_estimate : tuple of (int, bool)
+
+        """
+        if not query:
+            return collection.estimated_document_count(), True
+
+        key = (collection.name, json_util.dumps(query, sort_keys=True))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] > now:
+                return cached[1], False
+
+        total = collection.count_documents(query)
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total, False
@@ -0,0 +1,197 @@
+"""
+Append-only per-session segment files with an offset index.
+
+Finished sessions leave behind hundreds of small media files (alert and debug
+snapshots). Packing them into one segment file per session keeps the inode
+count down, and the index lets any single item be served with one seek and
+one read.
+
+Layout inside ``segment_dir``::
+
+    <session>.seg   concatenated payloads, only ever appended to
+    <session>.idx   one "name<TAB>offset<TAB>length" line per payload
+
+Appends hold an exclusive ``flock`` on the segment file from the offset
+lookup to the index write, so several worker processes can append to the
+same session.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import threading
+
+_SAFE_SESSION_RE = re.compile(r'^[A-Za-z0-9_.-]{1,128}$')
+
+
+def session_id_from_filename(filename, prefixes=('alert_', 'debug_')):
+    """
+    Recover the session id embedded in a media filename.
+
+    Snapshot names are built as ``<prefix><session_id>_<suffix>.<ext>`` where
+    the suffix (alert uuid or timestamp) never contains an underscore.
+
+    Parameters
+    ----------
+    filename : string
+        Bare filename, e.g. ``alert_session_123_abc_<uuid>.jpg``.
+    prefixes : tuple of string, optional
+        Known filename prefixes.
+
+    Returns
+    -------
+    session_id : string or None
+        None if the filename does not follow the naming scheme.
+
+    """
+    for prefix in prefixes:
+        if filename.startswith(prefix):
+            stem = os.path.splitext(filename[len(prefix):])[0]
+            if '_' not in stem:
+                return None
+            return stem.rsplit('_', 1)[0] or None
+    return None
+
+
+class SegmentStore:
+    """Packs named blobs into per-session append-only segment files."""
+
+    def __init__(self, segment_dir):
+        self.segment_dir = segment_dir
+        self._lock = threading.Lock()
+        # session key -> (index file size when loaded, {name: (offset, length)})
+        self._index_cache = {}
+        os.makedirs(self.segment_dir, exist_ok=True)
+
+    def _session_key(self, session_id):
+        if _SAFE_SESSION_RE.match(session_id) and not session_id.startswith('.'):
+            return session_id
+        return hashlib.sha1(session_id.encode('utf-8')).hexdigest()
+
+    def _paths(self, session_id):
+        key = self._session_key(session_id)
+        return (os.path.join(self.segment_dir, key + '.seg'),
+                os.path.join(self.segment_dir, key + '.idx'))
+
+    def _load_index(self, session_id):
+        """Return the name -> (offset, length) map, reloading if the index grew."""
+        key = self._session_key(session_id)
+        _, idx_path = self._paths(session_id)
+        try:
+            size = os.path.getsize(idx_path)
+        except OSError:
+            return {}
+
+        cached = self._index_cache.get(key)
+        if cached and cached[0] == size:
+            return cached[1]
+
+        index = {}
+        with open(idx_path, 'r', encoding='utf-8') as idx_file:
+            for line in idx_file:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 3 or not line.endswith('\n'):
+                    continue  # Torn trailing line from an interrupted (or in-progress) append
+                index[parts[0]] = (int(parts[1]), int(parts[2]))
+        self._index_cache[key] = (size, index)
+        return index
+
+    def lookup(self, session_id, name):
+        """Return (offset, length) of ``name`` in the session segment, or None."""
+        return self._load_index(session_id).get(name)
+
+    def read(self, session_id, name):
+        """
+        Read one packed item.
+
+        Returns
+        -------
+        data : bytes or None
+            None if the item is not in the segment.
+
+        """
+        entry = self.lookup(session_id, name)
+        if entry is None:
+            return None
+        offset, length = entry
+        seg_path, _ = self._paths(session_id)
+        fd = os.open(seg_path, os.O_RDONLY)
+        try:
+            return os.pread(fd, length, offset)
+        finally:
+            os.close(fd)
+
+    def append_many(self, session_id, items):
+        """
+        Append ``(name, data)`` pairs to the session segment.
+
+        Payloads are fsynced before their index lines are written, so a crash
+        can at worst leave unreferenced bytes at the end of the segment.
+        Names already present in the index are skipped.
+
+        Returns
+        -------
+        appended : list of string
+            Names that were written.
+
+        """
+        seg_path, idx_path = self._paths(session_id)
+        with self._lock, open(seg_path, 'ab') as seg_file:
+            # Other processes append to the same files; the offset, payloads
+            # and index lines must not interleave with theirs
+            fcntl.flock(seg_file, fcntl.LOCK_EX)
+            try:
+                existing = self._load_index(session_id)
+                entries = []
+                offset = seg_file.seek(0, os.SEEK_END)
+                for name, data in items:
+                    if name in existing or '\t' in name or '\n' in name:
+                        continue
+                    seg_file.write(data)
+                    entries.append((name, offset, len(data)))
+                    offset += len(data)
+                seg_file.flush()
+                os.fsync(seg_file.fileno())
+
+                if entries:
+                    with open(idx_path, 'a', encoding='utf-8') as idx_file:
+                        idx_file.writelines(f"{name}\t{off}\t{length}\n" for name, off, length in entries)
+                        idx_file.flush()
+                        os.fsync(idx_file.fileno())
+                return [name for name, _, _ in entries]
+            finally:
+                fcntl.flock(seg_file, fcntl.LOCK_UN)
+
+    def compact_directory(self, session_id, source_dir, prefixes=('alert_', 'debug_')):
+        """
+        Move a session's loose files from ``source_dir`` into its segment.
+
+        Loose files are removed only after they are durably indexed, so the
+        operation can be re-run safely after an interruption.
+
+        Returns
+        -------
+        packed : int
+            Number of files removed from ``source_dir``.
+
+        """
+        names = sorted(
+            name for name in os.listdir(source_dir)
+            if session_id_from_filename(name, prefixes) == session_id
+            and os.path.isfile(os.path.join(source_dir, name))
+        )
+        packed = 0
+        # Work in batches so a long session never holds every image in memory.
+        for start in range(0, len(names), 64):
+            batch = []
+            for name in names[start:start + 64]:
+                with open(os.path.join(source_dir, name), 'rb') as loose_file:
+                    batch.append((name, loose_file.read()))
+            self.append_many(session_id, batch)
+            index = self._load_index(session_id)
+            for name, _ in batch:
+                if name in index:
+                    os.remove(os.path.join(source_dir, name))
+                    packed += 1
+        return packed
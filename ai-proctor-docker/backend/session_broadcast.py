@@ -0,0 +1,133 @@
+"""
+Throttled, coalesced session updates for the admin dashboard.
+
+Pushing the whole session entry to every admin for every analysed frame
+scales with students x frame rate. Instead, request handlers report which
+fields of a session actually changed (see ``update_changed`` in
+session_state.py) and :class:`SessionDeltaBroadcaster` sends one
+``sessions_delta`` message per tick::
+
+    {"sessions": {"<session_id>": {"latest_status": "...", ...}, ...}}
+
+Only fields changed since the previous tick are included, and each session
+appears once per tick however often it was updated. Sessions are grouped by
+the set of rooms that should hear about them (see admin_rooms.py), one
+message per group, so an admin receives each session at most once per tick
+and only for the rooms they joined.
+
+Values are read from the session store when the tick fires rather than
+remembered from the update, so when updates to one session land on several
+workers, the last message admins receive always carries the latest stored
+values.
+"""
+
+import threading
+import time
+
+
+class SessionDeltaBroadcaster:
+    """
+    Collects changed session fields and emits them once per ``interval``.
+
+    Parameters
+    ----------
+    store : session_state backend
+        Read at each tick for the current values of the changed fields.
+    emit : callable
+        Called as ``emit(payload, rooms)`` for each ``sessions_delta`` message.
+    rooms : callable
+        ``rooms(entry, changed_field_names)``: the rooms that should receive
+        a session's delta.
+    interval : float
+        Seconds between ticks.
+    rename : dict, optional
+        Store field name -> name used by the dashboard.
+
+    """
+
+    def __init__(self, store, emit, rooms, interval=0.5, rename=None):
+        self.store = store
+        self.emit = emit
+        self.rooms = rooms
+        self.interval = interval
+        self.rename = rename or {}
+
+        self._dirty = {}  # session_id -> set of changed field names
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._updates_total = 0
+        self._messages_total = 0
+        self._sessions_sent_total = 0
+        self._fields_sent_total = 0
+        self._last_tick_sessions = 0
+        self._last_tick_ms = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="session-delta-broadcaster", daemon=True)
+        self._thread.start()
+
+    def mark(self, session_id, fields):
+        """Record that ``fields`` (names) of a session changed."""
+        if not fields:
+            return
+        with self._lock:
+            self._updates_total += 1
+            self._dirty.setdefault(session_id, set()).update(fields)
+
+    def discard(self, session_id):
+        """Drop pending changes of a session that has ended."""
+        with self._lock:
+            self._dirty.pop(session_id, None)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[SESSION_DELTA_ERROR] Tick failed: {e}", flush=True)
+
+    def flush(self):
+        """Emit everything marked since the previous tick (if anything)."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        started = time.perf_counter()
+        by_rooms = {}  # tuple of rooms -> {session_id: changed fields}
+        for session_id, fields in dirty.items():
+            entry = self.store.get(session_id)
+            if entry is None:
+                continue  # Ended since; admins get student_session_ended instead
+            delta = {self.rename.get(name, name): entry.get(name) for name in fields}
+            by_rooms.setdefault(tuple(self.rooms(entry, fields)), {})[session_id] = delta
+        sent = 0
+        for rooms, sessions in by_rooms.items():
+            self.emit({"sessions": sessions}, list(rooms))
+            self._messages_total += 1
+            sent += len(sessions)
+            self._fields_sent_total += sum(len(delta) for delta in sessions.values())
+        self._sessions_sent_total += sent
+        self._last_tick_sessions = sent
+        self._last_tick_ms = (time.perf_counter() - started) * 1000.0
+
+    def close(self):
+        self._stopped.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._dirty)
+        return {
+            "interval_ms": self.interval * 1000.0,
+            "pending_sessions": pending,
+            "updates_total": self._updates_total,
+            "messages_total": self._messages_total,
+            "sessions_sent_total": self._sessions_sent_total,
+            "fields_sent_total": self._fields_sent_total,
+            "last_tick_sessions": self._last_tick_sessions,
+            "last_tick_ms": self._last_tick_ms,
+        }
@@ -0,0 +1,163 @@
+"""
+Expiry of sessions whose student has gone silent.
+
+Sessions normally end through ``/api/student/monitoring/stop`` or when the
+student starts a new one; a closed tab or lost connection would otherwise
+leave the entry in the live store forever. :class:`SessionReaper` keeps a
+min-heap of ``(deadline, session_id)``, where the deadline is the session's
+``last_heartbeat_time`` plus the TTL, and sleeps until the earliest one:
+
+* Heartbeats do not touch the heap. When a deadline comes up, the session's
+  current ``last_heartbeat_time`` is read from the shared store (any worker
+  may have recorded it) and the session is pushed back with its new
+  deadline, so each live session costs one check per TTL, never a scan.
+* Expired sessions are removed with ``pop_if``, which re-checks the
+  heartbeat inside the store's write transaction. A heartbeat that lands
+  first keeps the session, and when several workers hold the same session
+  only one of them gets it back and reports the expiry.
+
+Every worker loads the sessions already in the store when it starts, so
+sessions created by a worker that has since exited are still reaped.
+"""
+
+import datetime
+import heapq
+import threading
+import time
+
+HEARTBEAT_FIELD = 'last_heartbeat_time'
+
+
+def _last_heartbeat(entry):
+    """The entry's heartbeat as a UTC datetime (naive, like utcnow()), or None."""
+    value = entry.get(HEARTBEAT_FIELD) or entry.get('monitoring_start_time')
+    try:
+        return datetime.datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SessionReaper:
+    """
+    Background expiry of sessions without a recent heartbeat.
+
+    Parameters
+    ----------
+    store : session_state backend
+    ttl : float
+        Seconds without a heartbeat after which a session is ended.
+    on_expire : callable
+        Called as ``on_expire(session_id, entry)`` for each session removed.
+    max_sleep : float
+        Longest wait between checks, so newly scheduled sessions are picked up.
+
+    """
+
+    def __init__(self, store, ttl=60.0, on_expire=None, max_sleep=5.0):
+        self.store = store
+        self.ttl = ttl
+        self.on_expire = on_expire
+        self.max_sleep = max_sleep
+
+        self._heap = []  # (deadline as epoch seconds, session_id)
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+        self._checks_total = 0
+        self._expired_total = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+        self._thread.start()
+
+    def schedule(self, session_id, last_heartbeat=None):
+        """Track a session; ``last_heartbeat`` defaults to now."""
+        deadline = self._deadline(last_heartbeat)
+        with self._lock:
+            if session_id in self._scheduled:
+                return  # Its pending check will pick up the newer heartbeat
+            self._scheduled.add(session_id)
+            heapq.heappush(self._heap, (deadline, session_id))
+            earliest = self._heap[0][1] == session_id
+        if earliest:
+            self._wakeup.set()
+
+    def _deadline(self, last_heartbeat):
+        if last_heartbeat is None:
+            return time.time() + self.ttl
+        return last_heartbeat.replace(tzinfo=datetime.timezone.utc).timestamp() + self.ttl
+
+    def _load_existing(self):
+        for session_id, entry in self.store.items():
+            self.schedule(session_id, _last_heartbeat(entry))
+
+    def _run(self):
+        try:
+            self._load_existing()
+        except Exception as e:
+            print(f"[SESSION_REAPER_ERROR] Could not load existing sessions: {e}", flush=True)
+        while not self._stopped:
+            with self._lock:
+                wait = self._heap[0][0] - time.time() if self._heap else self.max_sleep
+            if wait > 0:
+                self._wakeup.wait(min(wait, self.max_sleep))
+                self._wakeup.clear()
+                continue
+            try:
+                self._check_due()
+            except Exception as e:
+                print(f"[SESSION_REAPER_ERROR] Expiry check failed: {e}", flush=True)
+
+    def _check_due(self):
+        now = time.time()
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    return
+                _, session_id = heapq.heappop(self._heap)
+                self._scheduled.discard(session_id)
+            self._checks_total += 1
+            entry = self.store.get(session_id)
+            if entry is None:
+                continue  # Ended through stop, a new session or another worker's reaper
+            last = _last_heartbeat(entry)
+            if last is not None and self._deadline(last) > now:
+                self.schedule(session_id, last)
+                continue
+            cutoff = datetime.datetime.fromtimestamp(now - self.ttl, datetime.timezone.utc).replace(tzinfo=None)
+            expired = self.store.pop_if(
+                session_id, lambda current: (_last_heartbeat(current) or cutoff) <= cutoff)
+            if expired is None:
+                current = self.store.get(session_id)  # A heartbeat arrived just in time
+                if current is not None:
+                    self.schedule(session_id, _last_heartbeat(current))
+                continue
+            self._expired_total += 1
+            print(f"[SESSION_REAPER] Session {session_id} expired: no heartbeat since {expired.get(HEARTBEAT_FIELD)}",
+                  flush=True)
+            if self.on_expire is not None:
+                try:
+                    self.on_expire(session_id, expired)
+                except Exception as e:
+                    print(f"[SESSION_REAPER_ERROR] Ending session {session_id} failed: {e}", flush=True)
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def stats(self):
+        with self._lock:
+            scheduled = len(self._heap)
+            next_deadline = self._heap[0][0] if self._heap else None
+        return {
+            "ttl_seconds": self.ttl,
+            "scheduled": scheduled,
+            "next_check_in_seconds": max(0.0, next_deadline - time.time()) if next_deadline is not None else None,
+            "checks_total": self._checks_total,
+            "expired_total": self._expired_total,
+        }
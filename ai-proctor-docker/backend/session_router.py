@@ -0,0 +1,267 @@
+"""
+Sticky routing of a live session's requests to one worker process.
+
+The shared session store (session_state.py) only holds the live entries.
+The rest of a session's state lives in the process that analyses it: the
+streaming audio analyzer's carry and open runs (audio_stream.py), the audio
+evidence history (audio_evidence.py) and the coalescer's open event ranges
+(event_coalescer.py). With several workers, frames and chunks of one session
+must therefore all be analysed by the same process, and the session must be
+finalized there.
+
+The load balancer (gunicorn's shared listening socket) cannot do this: it
+hands each connection to whichever worker accepts it first. Instead:
+
+* Every worker also serves the app on a private Unix socket,
+  ``<directory>/worker-<pid>.sock`` (mode 0700 directory, like the local
+  Socket.IO bus). Requests arriving there are marked internal in the WSGI
+  environ; only those may reach internal endpoints.
+* The worker that starts a session records its socket path in the session
+  entry (:data:`OWNER_FIELD`). A session-scoped request that lands on
+  another worker is forwarded, headers and body unchanged, to the owner and
+  its response relayed back. Internal requests are always handled locally,
+  so a request is forwarded at most once.
+* If the owner cannot be reached (it exited or was restarted), the worker
+  takes the session over with a compare-and-set on the owner field, so only
+  one worker wins; the others forward to the winner. State held by the dead
+  worker is lost with it, as it would be with a single worker.
+
+A live session without an owner (started before routing was enabled) is
+taken over the same way by the first worker that gets one of its requests.
+Requests for sessions that are not live are handled wherever they land.
+"""
+
+import http.client
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from wsgiref.simple_server import WSGIRequestHandler
+
+from socketio_bus import ensure_private_directory
+
+OWNER_FIELD = 'owner_worker'
+INTERNAL_ENVIRON_KEY = 'examguard.internal'
+MAX_ROUTING_ATTEMPTS = 3  # Owner changes followed before handling a request locally
+
+# Not forwarded in either direction (RFC 9110 section 7.6.1), plus headers the
+# relaying worker sets itself
+_SKIPPED_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer',
+    'transfer-encoding', 'upgrade', 'content-length', 'host', 'server', 'date',
+}
+
+
+class WorkerUnavailable(OSError):
+    """The owning worker's socket does not accept connections."""
+
+
+def is_internal(environ):
+    """True for requests that arrived on a worker's private socket."""
+    return bool(environ.get(INTERNAL_ENVIRON_KEY))
+
+
+def default_directory():
+    """A tmpfs-backed directory when /dev/shm exists, otherwise under the temp directory."""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'examguard-workers')
+
+
+def _forwarded_headers(headers):
+    return [(name, value) for name, value in headers if name.lower() not in _SKIPPED_HEADERS]
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self._path)
+        except OSError as e:
+            sock.close()
+            raise WorkerUnavailable(f"{self._path}: {e}") from e
+        self.sock = sock
+
+
+class _InternalRequestHandler(WSGIRequestHandler):
+    def setup(self):
+        super().setup()
+        self.client_address = ('local', 0)  # Unix sockets have no peer address
+
+    def get_environ(self):
+        environ = super().get_environ()
+        environ[INTERNAL_ENVIRON_KEY] = True
+        return environ
+
+    def log_request(self, code='-', size='-'):
+        pass  # The app logs what it handles
+
+
+class _UnixWSGIServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, app):
+        super().__init__(path, _InternalRequestHandler)
+        self.app = app
+        self.base_environ = {
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '0',
+            'GATEWAY_INTERFACE': 'CGI/1.1',
+            'SCRIPT_NAME': '',
+        }
+
+    def get_app(self):
+        return self.app
+
+
+class SessionRouter:
+    """
+    Forwards a session's requests to the worker that owns it.
+
+    Parameters
+    ----------
+    wsgi_app : callable
+        The app served on this worker's private socket.
+    store : session_state backend
+        Shared live session entries; the owner is kept in :data:`OWNER_FIELD`.
+    directory : str
+        Shared by every worker on the host.
+    timeout : float
+        Seconds to wait for the owner's response to a forwarded request.
+    name : str
+        Socket file name in ``directory``; one per worker, by default from the pid.
+
+    """
+
+    def __init__(self, wsgi_app, store, directory=None, timeout=60.0, name=None):
+        self.wsgi_app = wsgi_app
+        self.store = store
+        self.directory = directory or default_directory()
+        self.timeout = timeout
+        self.address = os.path.join(self.directory, name or f'worker-{os.getpid()}.sock')
+
+        self._server = None
+        self._thread = None
+        self._forwarded_total = 0
+        self._takeovers_total = 0
+
+    def start(self):
+        if self._server is not None:
+            return
+        ensure_private_directory(self.directory)
+        try:
+            os.unlink(self.address)  # Left by an earlier process with the same pid
+        except FileNotFoundError:
+            pass
+        self._server = _UnixWSGIServer(self.address, self.wsgi_app)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="session-router", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        try:
+            os.unlink(self.address)
+        except FileNotFoundError:
+            pass
+
+    def forward(self, session_id, method, path, headers, body):
+        """
+        Send a request for ``session_id`` to its owner.
+
+        Returns
+        -------
+        response : tuple or None
+            ``(status, headers, body)`` of the owner's response, or None when
+            this worker should handle the request itself: it owns the session,
+            has just taken it over, or the session is not live.
+
+        Raises
+        ------
+        OSError or http.client.HTTPException
+            The owner accepted the request but did not answer in time.
+
+        """
+        for _ in range(MAX_ROUTING_ATTEMPTS):
+            entry = self.store.get(session_id)
+            if entry is None:
+                return None  # Unknown or ended; the endpoint answers as usual
+            owner = entry.get(OWNER_FIELD)
+            if owner == self.address:
+                return None
+            if owner is None:
+                if self._take_over(session_id, None):
+                    return None
+                continue
+            try:
+                response = self._request(owner, method, path, headers, body)
+            except WorkerUnavailable as e:
+                if self._take_over(session_id, owner):
+                    self._takeovers_total += 1
+                    print(f"[SESSION_ROUTER] Took over session {session_id}: owner unreachable ({e})", flush=True)
+                    return None
+                continue  # Another worker took it over first
+            self._forwarded_total += 1
+            return response
+        return None
+
+    def delegate(self, session_id, entry, path, payload):
+        """
+        POST ``payload`` as JSON to ``path`` on the worker that owned the
+        (already removed) session ``entry``.
+
+        Returns
+        -------
+        delivered : bool
+            False when this worker owned it, it had no owner, or the owner
+            is gone; the caller then does the work itself.
+
+        """
+        owner = (entry or {}).get(OWNER_FIELD)
+        if owner is None or owner == self.address:
+            return False
+        body = json.dumps(payload).encode('utf-8')
+        try:
+            status, _, _ = self._request(owner, 'POST', path, [('Content-Type', 'application/json')], body)
+        except WorkerUnavailable:
+            return False
+        except (OSError, http.client.HTTPException) as e:
+            print(f"[SESSION_ROUTER_ERROR] {path} on {owner} for session {session_id} failed: {e}", flush=True)
+            return False
+        return 200 <= status < 300
+
+    def _take_over(self, session_id, owner):
+        return self.store.update_if(
+            session_id, {OWNER_FIELD: self.address},
+            lambda entry: entry.get(OWNER_FIELD) == owner) is not None
+
+    def _request(self, address, method, path, headers, body):
+        connection = _UnixHTTPConnection(address, self.timeout)
+        try:
+            connection.connect()
+            connection.putrequest(method, path, skip_host=True, skip_accept_encoding=True)
+            connection.putheader('Host', 'localhost')
+            for name, value in _forwarded_headers(headers):
+                connection.putheader(name, value)
+            connection.putheader('Content-Length', str(len(body)))
+            connection.endheaders(body)
+            response = connection.getresponse()
+            return response.status, _forwarded_headers(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def stats(self):
+        return {
+            "address": self.address,
+            "forwarded_total": self._forwarded_total,
+            "takeovers_total": self._takeovers_total,
+        }
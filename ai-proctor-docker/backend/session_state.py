@@ -0,0 +1,356 @@
+"""
+Live monitoring session state shared by all worker processes.
+
+With several workers, heartbeats, analysis results and dashboard reads for
+one session can land on any of them, so the per-session entries (student,
+start time, latest statuses, unread alert count, ...) cannot live in one
+process's dict. Two backends share one interface:
+
+``InMemorySessionState``
+    A locked dict; correct only with a single worker.
+``SqliteSessionState``
+    One row per session (JSON) in a SQLite file that every worker on the host
+    opens, by default on the ``/dev/shm`` tmpfs. Field updates are
+    read-merge-write under ``BEGIN IMMEDIATE``, so concurrent updates of
+    different fields from different workers never lose each other. Each
+    process keeps a read cache that is dropped whenever
+    ``PRAGMA data_version`` shows another connection has committed, so reads
+    that nothing has invalidated never touch the table.
+
+Entries must be JSON-serializable (they are also emitted over Socket.IO).
+Values returned by the backends are copies; change state with
+:meth:`update`, never by mutating a returned dict.
+
+Only these entries are shared. The rest of a session's state lives in the
+worker that owns the session (the streaming audio analyzer's carry and open
+runs, the audio evidence history, the coalescer's open event ranges), and
+session_router.py sends each session's requests and its finalization to that
+worker.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+MEMORY = 'memory'
+SQLITE = 'sqlite'
+
+
+def _changed_fields(entry, fields):
+    return {name for name, value in fields.items() if name not in entry or entry[name] != value}
+
+
+class InMemorySessionState:
+    """Session entries in this process only."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return dict(entry) if entry is not None else None
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._sessions
+
+    def create(self, session_id, entry):
+        with self._lock:
+            self._sessions[session_id] = dict(entry)
+
+    def update(self, session_id, fields):
+        """
+        Merge ``fields`` into an existing entry.
+
+        Returns
+        -------
+        entry : dict or None
+            The merged entry, or None if the session does not exist.
+
+        """
+        return self.update_changed(session_id, fields)[0]
+
+    def update_changed(self, session_id, fields):
+        """
+        Like :meth:`update`, also returning the names of the fields whose value changed.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None, set()
+            changed = _changed_fields(entry, fields)
+            entry.update(fields)
+            return dict(entry), changed
+
+    def update_if(self, session_id, fields, predicate):
+        """Merge ``fields`` if ``predicate(entry)`` holds, atomically; returns the merged entry or None."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or not predicate(dict(entry)):
+                return None
+            entry.update(fields)
+            return dict(entry)
+
+    def update_many(self, updates):
+        """Merge ``{session_id: fields}``; returns the ids that exist."""
+        with self._lock:
+            updated = []
+            for session_id, fields in updates.items():
+                entry = self._sessions.get(session_id)
+                if entry is not None:
+                    entry.update(fields)
+                    updated.append(session_id)
+            return updated
+
+    def pop(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def pop_if(self, session_id, predicate):
+        """Remove and return the entry if ``predicate(entry)`` holds, atomically; otherwise None."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or not predicate(dict(entry)):
+                return None
+            return self._sessions.pop(session_id)
+
+    def items(self):
+        with self._lock:
+            return [(session_id, dict(entry)) for session_id, entry in self._sessions.items()]
+
+    def stats(self):
+        with self._lock:
+            return {"backend": MEMORY, "sessions": len(self._sessions)}
+
+
+class SqliteSessionState:
+    """
+    Session entries in a SQLite table shared by the workers on one host.
+
+    Parameters
+    ----------
+    path : str
+        Database file; every worker must use the same one.
+    timeout : float
+        Seconds to wait for another worker's write lock.
+
+    """
+
+    def __init__(self, path, timeout=5.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')  # State is rebuilt by heartbeats; no fsync per write
+        self._conn.execute('CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+        self._lock = threading.Lock()
+
+        self._cache = {}  # session_id -> entry, valid while data_version is unchanged
+        self._cache_complete = False  # True once every row is cached (after items())
+        self._data_version = None
+        self._reads = 0
+        self._cache_hits = 0
+        self._writes = 0
+
+    def _sync_cache(self):
+        """Drop the cache if another connection has committed since it was filled."""
+        version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != self._data_version:
+            self._cache.clear()
+            self._cache_complete = False
+            self._data_version = version
+
+    def _load(self, session_id):
+        row = self._conn.execute('SELECT data FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, session_id):
+        with self._lock:
+            self._reads += 1
+            self._sync_cache()
+            if session_id in self._cache:
+                self._cache_hits += 1
+                entry = self._cache[session_id]
+            elif self._cache_complete:
+                self._cache_hits += 1
+                return None
+            else:
+                entry = self._cache[session_id] = self._load(session_id)
+            return dict(entry) if entry is not None else None
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def _write(self, operation):
+        """Run ``operation`` inside a write transaction; our own commits do not bump data_version."""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = operation()
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._writes += 1
+        return result
+
+    def create(self, session_id, entry):
+        data = json.dumps(entry)
+        with self._lock:
+            self._sync_cache()
+            self._write(lambda: self._conn.execute(
+                'INSERT OR REPLACE INTO sessions (id, data) VALUES (?, ?)', (session_id, data)))
+            self._cache[session_id] = json.loads(data)
+
+    def update(self, session_id, fields):
+        """
+        Atomically merge ``fields`` into an existing entry.
+
+        Returns
+        -------
+        entry : dict or None
+            The merged entry, or None if the session does not exist.
+
+        """
+        return self.update_changed(session_id, fields)[0]
+
+    def update_changed(self, session_id, fields):
+        """
+        Like :meth:`update`, also returning the names of the fields whose value
+        changed. The comparison is made inside the write transaction, so it is
+        against what the last writer from any worker stored.
+        """
+        def merge():
+            entry = self._load(session_id)
+            if entry is None:
+                return None, set()
+            changed = _changed_fields(entry, fields)
+            entry.update(fields)
+            self._conn.execute('UPDATE sessions SET data = ? WHERE id = ?', (json.dumps(entry), session_id))
+            return entry, changed
+
+        with self._lock:
+            self._sync_cache()
+            entry, changed = self._write(merge)
+            self._cache[session_id] = entry
+            return (dict(entry) if entry is not None else None), changed
+
+    def update_if(self, session_id, fields, predicate):
+        """
+        Merge ``fields`` if ``predicate(entry)`` holds; returns the merged
+        entry or None. Like :meth:`pop_if`, the check runs inside the write
+        transaction, so it is a compare-and-set across workers.
+        """
+        def merge_if():
+            entry = self._load(session_id)
+            if entry is None or not predicate(dict(entry)):
+                return entry, False
+            entry.update(fields)
+            self._conn.execute('UPDATE sessions SET data = ? WHERE id = ?', (json.dumps(entry), session_id))
+            return entry, True
+
+        with self._lock:
+            self._sync_cache()
+            entry, merged = self._write(merge_if)
+            self._cache[session_id] = entry
+            return dict(entry) if merged else None
+
+    def update_many(self, updates):
+        """
+        Merge ``{session_id: fields}`` in one write transaction; returns the
+        ids that exist.
+        """
+        def merge_all():
+            merged = {}
+            for session_id, fields in updates.items():
+                entry = self._load(session_id)
+                if entry is None:
+                    continue
+                entry.update(fields)
+                merged[session_id] = entry
+            self._conn.executemany('UPDATE sessions SET data = ? WHERE id = ?',
+                                   [(json.dumps(entry), session_id) for session_id, entry in merged.items()])
+            return merged
+
+        if not updates:
+            return []
+        with self._lock:
+            self._sync_cache()
+            merged = self._write(merge_all)
+            self._cache.update(merged)
+            return list(merged)
+
+    def pop(self, session_id):
+        def delete():
+            entry = self._load(session_id)
+            if entry is not None:
+                self._conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+            return entry
+
+        with self._lock:
+            self._sync_cache()
+            entry = self._write(delete)
+            self._cache[session_id] = None
+            return entry
+
+    def pop_if(self, session_id, predicate):
+        """
+        Remove and return the entry if ``predicate(entry)`` holds; otherwise None.
+        The check runs inside the write transaction, so no other worker's
+        update can land between it and the delete.
+        """
+        def delete_if():
+            entry = self._load(session_id)
+            if entry is None or not predicate(dict(entry)):
+                return entry, False
+            self._conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+            return entry, True
+
+        with self._lock:
+            self._sync_cache()
+            entry, deleted = self._write(delete_if)
+            self._cache[session_id] = None if deleted else entry
+            return entry if deleted else None
+
+    def items(self):
+        with self._lock:
+            self._reads += 1
+            self._sync_cache()
+            if self._cache_complete:
+                self._cache_hits += 1
+            else:
+                rows = self._conn.execute('SELECT id, data FROM sessions').fetchall()
+                self._cache = {session_id: json.loads(data) for session_id, data in rows}
+                self._cache_complete = True
+            return [(session_id, dict(entry)) for session_id, entry in self._cache.items() if entry is not None]
+
+    def stats(self):
+        with self._lock:
+            sessions = self._conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return {
+            "backend": SQLITE,
+            "path": self.path,
+            "sessions": sessions,
+            "reads": self._reads,
+            "cache_hits": self._cache_hits,
+            "writes": self._writes,
+        }
+
+
+def default_sqlite_path():
+    """A tmpfs-backed path when /dev/shm exists, otherwise the temp directory."""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'examguard-sessions.db')
+
+
+def create_session_state(backend, path=None):
+    if backend == MEMORY:
+        return InMemorySessionState()
+    if backend == SQLITE:
+        return SqliteSessionState(path or default_sqlite_path())
+    raise ValueError(f"Unknown session state backend '{backend}'")
@@ -0,0 +1,158 @@
+"""
+Precomputed per-session summary reports.
+
+When a monitoring session ends, :func:`build_session_summary` reads the
+session's events and alerts once and condenses them into a single document
+in ``session_summaries``:
+
+    {
+        "_id": <session_id>, "student_username": ...,
+        "monitoring_start_time": ..., "monitoring_end_time": ..., "end_reason": ...,
+        "gaze_seconds": {"forward": 1710.0, "left": 42.5, ...},
+        "face_samples": 372,
+        "alert_counts": {"looking_away": 7, ...}, "total_alerts": 9,
+        "longest_away_streak": {"seconds": 35.0, "start": ..., "end": ...},
+        "snapshots": [{"alert_id", "alert_type", "timestamp", "snapshot_filename"}, ...],
+        "generated_at": ...
+    }
+
+Review pages then load a finished session with one ``find_one``.
+"""
+
+import datetime
+
+from pymongo import ASCENDING
+
+import event_store
+
+MAX_SNAPSHOT_REFERENCES = 500
+
+
+def _gaze_state(event):
+    details = event.get("details") or {}
+    return details.get("eye_status") or "unknown"
+
+
+def _is_away(event):
+    details = event.get("details") or {}
+    return bool(details.get("looking_away"))
+
+
+def summarize_face_events(events, sample_interval, max_gap):
+    """
+    Time spent per gaze state and the longest looking-away streak.
+
+    Parameters
+    ----------
+    events : iterable of dict
+        ``face_analyzed`` events or coalesced ranges, in timestamp order.
+    sample_interval : float
+        Seconds one sample is assumed to cover after its timestamp.
+    max_gap : float
+        Gaps longer than this (seconds) are not attributed to any state and
+        break an away streak.
+
+    Returns
+    -------
+    gaze_seconds : dict
+    samples : int
+    longest_streak : dict or None
+
+    """
+    gaze_seconds = {}
+    samples = 0
+    longest = None
+    streak_start = streak_end = None
+    previous = None
+    interval = datetime.timedelta(seconds=sample_interval)
+    gap_limit = datetime.timedelta(seconds=max_gap)
+
+    def close_streak():
+        nonlocal longest
+        if streak_start is None:
+            return
+        seconds = (streak_end - streak_start).total_seconds()
+        if longest is None or seconds > longest["seconds"]:
+            longest = {"seconds": seconds, "start": streak_start, "end": streak_end}
+
+    for event in events:
+        start = event["timestamp"]
+        end = event.get("end_timestamp") or start
+        samples += int(event.get("sample_count", 1))
+
+        if previous is not None:
+            # Credit the previous item up to this one, capped by one sample
+            prev_end = previous.get("end_timestamp") or previous["timestamp"]
+            covered = min(start - prev_end, interval)
+            if covered > datetime.timedelta(0):
+                state = _gaze_state(previous)
+                gaze_seconds[state] = gaze_seconds.get(state, 0.0) + covered.total_seconds()
+            if start - prev_end > gap_limit:
+                close_streak()
+                streak_start = None
+
+        state = _gaze_state(event)
+        gaze_seconds[state] = gaze_seconds.get(state, 0.0) + (end - start).total_seconds()
+
+        if _is_away(event):
+            if streak_start is None:
+                streak_start = start
+            streak_end = end + interval
+        else:
+            close_streak()
+            streak_start = None
+        previous = event
+
+    if previous is not None:
+        state = _gaze_state(previous)
+        gaze_seconds[state] = gaze_seconds.get(state, 0.0) + sample_interval
+    close_streak()
+    return gaze_seconds, samples, longest
+
+
+def build_session_summary(events_collection, alerts_collection, session_id, session_info=None,
+                          storage_mode=event_store.STANDARD, end_reason=None,
+                          sample_interval=5.0, max_gap=30.0):
+    """Aggregate one session's events and alerts into a summary document."""
+    session_info = session_info or {}
+
+    query = {**event_store.session_filter(session_id, storage_mode), "event_type": "face_analyzed"}
+    cursor = events_collection.find(query, projection={"timestamp": 1, "end_timestamp": 1, "sample_count": 1, "details": 1})
+    events = (event_store.from_storage(doc, storage_mode) for doc in cursor.sort("timestamp", ASCENDING))
+    gaze_seconds, samples, longest_streak = summarize_face_events(events, sample_interval, max_gap)
+
+    alert_counts = {
+        row["_id"] or "unknown": row["count"]
+        for row in alerts_collection.aggregate([
+            {"$match": {"session_id": session_id}},
+            {"$group": {"_id": "$alert_type", "count": {"$sum": 1}}},
+        ])
+    }
+
+    snapshots = []
+    snapshot_cursor = alerts_collection.find(
+        {"session_id": session_id, "snapshot_filename": {"$ne": None}},
+        projection={"alert_type": 1, "timestamp": 1, "snapshot_filename": 1},
+    ).sort("timestamp", ASCENDING).limit(MAX_SNAPSHOT_REFERENCES)
+    for alert in snapshot_cursor:
+        snapshots.append({
+            "alert_id": alert["_id"],
+            "alert_type": alert.get("alert_type"),
+            "timestamp": alert.get("timestamp"),
+            "snapshot_filename": alert["snapshot_filename"],
+        })
+
+    return {
+        "_id": session_id,
+        "student_username": session_info.get("student_username"),
+        "monitoring_start_time": session_info.get("monitoring_start_time"),
+        "monitoring_end_time": datetime.datetime.utcnow().isoformat(),
+        "end_reason": end_reason,
+        "gaze_seconds": gaze_seconds,
+        "face_samples": samples,
+        "alert_counts": alert_counts,
+        "total_alerts": sum(alert_counts.values()),
+        "longest_away_streak": longest_streak,
+        "snapshots": snapshots,
+        "generated_at": datetime.datetime.utcnow(),
+    }
@@ -0,0 +1,313 @@
+"""
+Socket.IO fan-out across worker processes and nodes.
+
+Without a message queue, ``socketio.emit(..., room=admin_dashboard_room)``
+only reaches admins connected to the worker that produced the event. With a
+python-socketio pub/sub client manager every emit is delivered locally and
+also published on a queue, and every other worker re-emits it to its own
+clients. ``SOCKETIO_MESSAGE_QUEUE`` picks the transport:
+
+``local://`` or ``local:///path/to/directory``
+    :class:`LocalSocketManager`, the broker stand-in for a single node (and
+    tests). Each worker binds a Unix datagram socket in the directory (by
+    default on ``/dev/shm``) and publishes to every other socket there; there
+    is no broker process. Messages are Extended JSON, never pickles, and the
+    directory must be private to the app's user (mode 0700): anyone who can
+    bind a socket in it receives every broadcast.
+``redis://...`` / ``amqp://...``
+    python-socketio's Redis / Kombu managers, for several nodes.
+empty
+    No queue (a single worker; the default unless ``WEB_CONCURRENCY`` > 1).
+
+Every manager stamps outgoing messages and the receiving worker records the
+time from publish until its own clients have been sent the event;
+:meth:`DeliveryLatencyMixin.stats` reports percentiles over the recent
+deliveries. Across nodes these include any clock skew between hosts.
+
+Run ``python socketio_bus.py`` to measure local-bus delivery latency with
+several receiving workers under load.
+"""
+
+import collections
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+import uuid
+
+import socketio
+from bson import json_util
+
+LOCAL_SCHEME = 'local://'
+SENT_AT_KEY = 'sent_at'
+LATENCY_WINDOW = 4096  # Most recent deliveries kept for percentiles
+MAX_DATAGRAM_BYTES = 4 * 1024 * 1024
+SEND_TIMEOUT = 0.05  # Seconds a publish waits on a peer whose buffer is full
+
+
+def _percentiles_ms(latencies):
+    ordered = sorted(latencies)
+
+    def at(fraction):
+        if not ordered:
+            return None
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000.0, 3)
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": at(1.0), "samples": len(ordered)}
+
+
+class DeliveryLatencyMixin:
+    """Stamps published messages and records publish-to-delivery time on the receiving worker."""
+
+    def _init_latency(self):
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._published_total = 0
+        self._received_total = 0
+
+    def _publish(self, data):
+        data[SENT_AT_KEY] = time.time()
+        self._published_total += 1
+        return super()._publish(data)
+
+    def _handle_emit(self, message):
+        result = super()._handle_emit(message)
+        sent_at = message.get(SENT_AT_KEY)
+        if sent_at is not None and message.get('host_id') != self.host_id:
+            self._received_total += 1
+            self._latencies.append(time.time() - sent_at)
+        return result
+
+    def stats(self):
+        return {
+            "manager": self.name,
+            "published_total": self._published_total,
+            "received_total": self._received_total,
+            "delivery_latency_ms": _percentiles_ms(self._latencies),
+        }
+
+
+class LocalBus:
+    """
+    Broadcast datagrams between the processes on one node.
+
+    Every member binds ``<directory>/<member id>.sock``; a publish is sent to
+    every other socket in the directory. A socket left behind by a process
+    that died is removed the first time a send to it is refused.
+
+    Parameters
+    ----------
+    directory : str
+        Shared by every member; tmpfs (``/dev/shm``) keeps it off disk.
+
+    """
+
+    REFRESH_SECONDS = 1.0  # How long a directory listing is reused
+
+    def __init__(self, directory):
+        ensure_private_directory(directory)
+        self.directory = directory
+        self.path = os.path.join(directory, uuid.uuid4().hex + '.sock')
+        self._recv_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._recv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, MAX_DATAGRAM_BYTES)
+        self._recv_sock.bind(self.path)
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._send_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, MAX_DATAGRAM_BYTES)
+        self._send_sock.settimeout(SEND_TIMEOUT)
+        self._lock = threading.Lock()
+        self._peers = []
+        self._peers_listed_at = None
+        self.dropped_total = 0
+
+    def peers(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._peers_listed_at is None or now - self._peers_listed_at > self.REFRESH_SECONDS:
+                self._peers = [
+                    os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                    if name.endswith('.sock') and os.path.join(self.directory, name) != self.path
+                ]
+                self._peers_listed_at = now
+            return list(self._peers)
+
+    def publish(self, payload):
+        for peer in self.peers():
+            try:
+                with self._lock:
+                    self._send_sock.sendto(payload, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+                with self._lock:
+                    self._peers_listed_at = None
+            except OSError as e:
+                # A peer that is not keeping up (timeout) or a message too large for a datagram
+                self.dropped_total += 1
+                print(f"[SOCKETIO_BUS_WARNING] Dropped {len(payload)}-byte message to {peer}: {e}", flush=True)
+
+    def receive(self):
+        return self._recv_sock.recv(MAX_DATAGRAM_BYTES)
+
+    def close(self):
+        self._recv_sock.close()
+        self._send_sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def ensure_private_directory(path):
+    """
+    Create ``path`` (and missing parents) with mode 0700, or check that an
+    existing one is a real directory owned by this user and closed to others.
+
+    Raises
+    ------
+    PermissionError
+        If the directory exists with another owner, group/other permissions,
+        or is a symlink; another local user could have planted it.
+
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(parent):
+        ensure_private_directory(parent)
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be owned by uid {os.getuid()} with mode 0700 "
+                              f"(found uid {info.st_uid}, mode {stat.S_IMODE(info.st_mode):o})")
+
+
+def default_local_directory():
+    """A tmpfs-backed directory when /dev/shm exists, otherwise under the temp directory."""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'examguard-socketio')
+
+
+class _LocalPubSubManager(socketio.PubSubManager):
+    name = 'local'
+
+    def __init__(self, url=LOCAL_SCHEME, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        directory = url[len(LOCAL_SCHEME):] or default_local_directory()
+        ensure_private_directory(directory)  # Whoever controls it could swap the channel directory
+        self.bus = LocalBus(os.path.join(directory, channel))
+
+    def _publish(self, data):
+        self.bus.publish(json_util.dumps(data).encode('utf-8'))
+
+    def _listen(self):
+        # Decoded here so the base class never falls back to unpickling raw bytes
+        while True:
+            payload = self.bus.receive()
+            try:
+                yield json_util.loads(payload.decode('utf-8'))
+            except ValueError as e:
+                print(f"[SOCKETIO_BUS_WARNING] Ignored undecodable {len(payload)}-byte message: {e}", flush=True)
+
+
+class LocalSocketManager(DeliveryLatencyMixin, _LocalPubSubManager):
+    """Client manager that fans emits out to the other workers on this node."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_latency()
+
+    def stats(self):
+        stats = super().stats()
+        stats["peers"] = len(self.bus.peers())
+        stats["dropped_total"] = self.bus.dropped_total
+        return stats
+
+
+class TrackedRedisManager(DeliveryLatencyMixin, socketio.RedisManager):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_latency()
+
+
+class TrackedKombuManager(DeliveryLatencyMixin, socketio.KombuManager):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_latency()
+
+
+def create_client_manager(url, channel='socketio'):
+    """
+    Client manager for a ``SOCKETIO_MESSAGE_QUEUE`` URL, or None when it is empty.
+    """
+    if not url:
+        return None
+    if url.startswith(LOCAL_SCHEME):
+        return LocalSocketManager(url, channel=channel)
+    if url.startswith(('redis://', 'rediss://')):
+        return TrackedRedisManager(url, channel=channel)
+    return TrackedKombuManager(url, channel=channel)
+
+
+def _receiver(url, ready, results):
+    manager = LocalSocketManager(url)
+    ready.put(True)
+    for data in manager._listen():
+        if data.get('method') != 'emit':
+            break
+        manager._handle_emit(data)  # No clients connected: measures transport plus dispatch
+    results.put(manager.stats())
+    manager.bus.close()
+
+
+def main():
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description='Local Socket.IO bus delivery latency under load.')
+    parser.add_argument('--workers', type=int, default=4, help='Receiving worker processes')
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=2000.0, help='Messages per second (0 = as fast as possible)')
+    parser.add_argument('--payload-bytes', type=int, default=1024)
+    args = parser.parse_args()
+
+    url = LOCAL_SCHEME + tempfile.mkdtemp(prefix='socketio-bus-')
+    ready, results = multiprocessing.Queue(), multiprocessing.Queue()
+    receivers = [multiprocessing.Process(target=_receiver, args=(url, ready, results)) for _ in range(args.workers)]
+    for process in receivers:
+        process.start()
+    for _ in receivers:
+        ready.get()
+
+    publisher = LocalSocketManager(url)
+    payload = {"session_id": "benchmark", "details": "x" * args.payload_bytes}
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+    started = time.perf_counter()
+    for i in range(args.messages):
+        publisher.emit('new_alert', payload, namespace='/ws/admin_dashboard', room='admin_dashboard')
+        if interval:
+            delay = started + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    elapsed = time.perf_counter() - started
+    publisher._publish({'method': 'stop', 'host_id': publisher.host_id})
+
+    print(f"{args.messages} messages of ~{args.payload_bytes} B to {args.workers} workers "
+          f"in {elapsed:.2f}s ({args.messages / elapsed:.0f} msg/s), dropped {publisher.bus.dropped_total}")
+    for _ in receivers:
+        stats = results.get()
+        latency = stats["delivery_latency_ms"]
+        print(f"received {stats['received_total']:>6}  p50 {latency['p50']} ms  p95 {latency['p95']} ms  "
+              f"p99 {latency['p99']} ms  max {latency['max']} ms")
+    for process in receivers:
+        process.join()
+    publisher.bus.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+"""
+Vectorized sound event detection for proctoring audio chunks.
+
+Implements the two events defined in
+docs/implementation-plan/sound-detection.md:
+
+``loud_noise_detected``
+    Frame RMS above ``rms_threshold_dbfs`` for at least
+    ``min_noise_duration_seconds``.
+``speech_detected``
+    Voice-like frames (enough energy, most spectral energy in the 300-3400 Hz
+    speech band, zero-crossing rate in the voiced range) sustained for at
+    least ``min_speech_duration_seconds``. ``vad_aggressiveness_mode`` (0-3)
+    tightens the voice criteria the same way the WebRTC VAD modes do.
+
+All features are computed for every frame at once: the signal is framed with
+``as_strided`` (a view, no copy), RMS uses one ``einsum`` over the frames and
+the band energies one batched ``rfft``. No librosa is involved.
+
+Run ``python sound_event_detection.py`` for a chunks/second/core benchmark.
+"""
+
+import functools
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+LOUD_NOISE = 'loud_noise_detected'
+SPEECH = 'speech_detected'
+
+DEFAULT_FRAME_DURATION_MS = 30
+SPEECH_BAND_HZ = (300.0, 3400.0)
+SILENCE_DBFS = -100.0
+
+# Per vad_aggressiveness_mode (0 = most permissive ... 3 = strictest)
+SPEECH_MIN_DBFS = (-55.0, -50.0, -45.0, -40.0)
+SPEECH_MIN_BAND_RATIO = (0.4, 0.5, 0.6, 0.7)
+SPEECH_MIN_DB_ABOVE_FLOOR = (6.0, 9.0, 12.0, 15.0)
+SPEECH_ZCR_RANGE = (0.01, 0.35)
+# Pauses between words shorter than this do not end a speech segment
+SPEECH_HANGOVER_SECONDS = 0.3
+# Frames per rfft call are capped so each block's spectrum stays cache-sized
+SPECTRAL_BLOCK_SAMPLES = 1 << 17
+
+
+def frame_signal(samples, frame_length, hop_length=None):
+    """
+    Read-only (n_frames, frame_length) view of ``samples``.
+
+    A trailing partial frame is ignored.
+    """
+    hop_length = hop_length or frame_length
+    samples = np.ascontiguousarray(samples)
+    if len(samples) < frame_length:
+        return np.empty((0, frame_length), dtype=samples.dtype)
+    n_frames = 1 + (len(samples) - frame_length) // hop_length
+    stride = samples.strides[0]
+    return as_strided(samples, shape=(n_frames, frame_length), strides=(hop_length * stride, stride), writeable=False)
+
+
+@functools.lru_cache(maxsize=16)
+def _spectral_setup(frame_length, sample_rate):
+    window = np.hanning(frame_length).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_length, d=1.0 / sample_rate)
+    band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+    return window, band
+
+
+def frame_length_for(sample_rate, frame_duration_ms=DEFAULT_FRAME_DURATION_MS):
+    return max(int(sample_rate * frame_duration_ms / 1000), 2)
+
+
+def frames_dbfs(frames):
+    """RMS level in dBFS of each row of a (n_frames, frame_length) array (one ``einsum``, no FFT)."""
+    mean_square = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+    return 10.0 * np.log10(np.maximum(mean_square, 10 ** (SILENCE_DBFS / 10.0)))
+
+
+def frames_spectral_features(frames, sample_rate):
+    """
+    Speech-band energy ratio and zero-crossing rate of each row of a
+    (n_frames, frame_length) array.
+
+    Returns
+    -------
+    band_ratio, zcr : numpy.ndarray
+
+    """
+    frame_length = frames.shape[1]
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+
+    window, band = _spectral_setup(frame_length, sample_rate)
+    band_ratio = np.empty(len(frames))
+    block_rows = max(SPECTRAL_BLOCK_SAMPLES // frame_length, 1)
+    for start in range(0, len(frames), block_rows):
+        spectrum = np.fft.rfft(frames[start:start + block_rows] * window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        band_ratio[start:start + block_rows] = power[:, band].sum(axis=1) / np.maximum(power.sum(axis=1), 1e-20)
+    return band_ratio, zcr
+
+
+def frame_dbfs(samples, sample_rate, frame_duration_ms=DEFAULT_FRAME_DURATION_MS):
+    """Per-frame RMS level in dBFS (the cheap pass)."""
+    return frames_dbfs(frame_signal(samples, frame_length_for(sample_rate, frame_duration_ms)))
+
+
+def frame_spectral_features(samples, sample_rate, frame_duration_ms=DEFAULT_FRAME_DURATION_MS):
+    """Per-frame speech-band energy ratio and zero-crossing rate."""
+    return frames_spectral_features(frame_signal(samples, frame_length_for(sample_rate, frame_duration_ms)), sample_rate)
+
+
+def frame_features(samples, sample_rate, frame_duration_ms=DEFAULT_FRAME_DURATION_MS):
+    """
+    Per-frame loudness, speech-band energy ratio and zero-crossing rate.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray
+        Mono float32 samples in [-1, 1].
+    sample_rate : int
+    frame_duration_ms : int
+
+    Returns
+    -------
+    features : dict
+        ``dbfs``, ``band_ratio`` and ``zcr`` arrays (one value per frame)
+        plus ``frame_seconds``.
+
+    """
+    band_ratio, zcr = frame_spectral_features(samples, sample_rate, frame_duration_ms)
+    return {
+        "dbfs": frame_dbfs(samples, sample_rate, frame_duration_ms),
+        "band_ratio": band_ratio,
+        "zcr": zcr,
+        "frame_seconds": frame_length_for(sample_rate, frame_duration_ms) / float(sample_rate),
+    }
+
+
+def speech_min_dbfs(aggressiveness=1, noise_floor_dbfs=None):
+    """Lowest frame level that can count as speech."""
+    mode = min(max(int(aggressiveness), 0), 3)
+    min_dbfs = SPEECH_MIN_DBFS[mode]
+    if noise_floor_dbfs is not None:
+        min_dbfs = max(min_dbfs, noise_floor_dbfs + SPEECH_MIN_DB_ABOVE_FLOOR[mode])
+    return min_dbfs
+
+
+def speech_mask(features, aggressiveness=1, noise_floor_dbfs=None):
+    """Boolean array marking voice-like frames."""
+    mode = min(max(int(aggressiveness), 0), 3)
+    zcr = features["zcr"]
+    return (
+        (features["dbfs"] >= speech_min_dbfs(mode, noise_floor_dbfs))
+        & (features["band_ratio"] >= SPEECH_MIN_BAND_RATIO[mode])
+        & (zcr >= SPEECH_ZCR_RANGE[0]) & (zcr <= SPEECH_ZCR_RANGE[1])
+    )
+
+
+def find_runs(mask):
+    """
+    Contiguous True runs in a boolean array.
+
+    Returns
+    -------
+    starts, ends : numpy.ndarray
+        Frame index of each run's start and one past its end.
+
+    """
+    padded = np.concatenate(([False], np.asarray(mask, dtype=bool), [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+def fill_gaps(mask, max_gap):
+    """Set short False gaps between True runs to True."""
+    mask = np.array(mask, dtype=bool)
+    if max_gap <= 0 or not mask.any():
+        return mask
+    starts, ends = find_runs(mask)
+    for gap_start, gap_end in zip(ends[:-1], starts[1:]):
+        if gap_end - gap_start <= max_gap:
+            mask[gap_start:gap_end] = True
+    return mask
+
+
+def _longest_run(mask, min_frames):
+    starts, ends = find_runs(mask)
+    if not len(starts):
+        return None
+    lengths = ends - starts
+    longest = int(np.argmax(lengths))
+    if lengths[longest] < min_frames:
+        return None
+    return int(starts[longest]), int(ends[longest])
+
+
+def events_from_features(features, loud_noise_dbfs_threshold=-20.0, min_noise_duration=0.5,
+                         min_speech_duration=3.0, vad_aggressiveness=1, noise_floor_dbfs=None,
+                         time_offset=0.0):
+    """
+    Sound events for one chunk's frame features.
+
+    At most one event of each type is returned per chunk, describing the
+    longest qualifying segment. ``start_offset_seconds`` is relative to the
+    start of the samples the features were computed from, plus
+    ``time_offset``.
+    """
+    frame_seconds = features["frame_seconds"]
+    dbfs = features["dbfs"]
+    events = []
+
+    loud = _longest_run(dbfs > loud_noise_dbfs_threshold, int(np.ceil(min_noise_duration / frame_seconds)))
+    if loud is not None:
+        start, end = loud
+        events.append({
+            "event_type": LOUD_NOISE,
+            "details": {
+                "peak_rms_dbfs": round(float(dbfs[start:end].max()), 2),
+                "noise_duration_seconds": round((end - start) * frame_seconds, 3),
+                "rms_threshold_dbfs_used": loud_noise_dbfs_threshold,
+                "start_offset_seconds": round(time_offset + start * frame_seconds, 3),
+            },
+        })
+
+    voiced = speech_mask(features, vad_aggressiveness, noise_floor_dbfs)
+    voiced = fill_gaps(voiced, int(SPEECH_HANGOVER_SECONDS / frame_seconds))
+    speech = _longest_run(voiced, int(np.ceil(min_speech_duration / frame_seconds)))
+    if speech is not None:
+        start, end = speech
+        events.append({
+            "event_type": SPEECH,
+            "details": {
+                "detected_speech_duration_seconds": round((end - start) * frame_seconds, 3),
+                "vad_aggressiveness_mode_used": vad_aggressiveness,
+                "start_offset_seconds": round(time_offset + start * frame_seconds, 3),
+            },
+        })
+    return events
+
+
+def detect_sound_events(samples, sample_rate, loud_noise_dbfs_threshold=-20.0, min_noise_duration=0.5,
+                        min_speech_duration=3.0, vad_aggressiveness=1,
+                        frame_duration_ms=DEFAULT_FRAME_DURATION_MS):
+    """
+    Detect loud noise and sustained speech in one audio chunk.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray
+        Mono float32 samples in [-1, 1] (see ``audio_io.to_float32``).
+    sample_rate : int
+
+    Returns
+    -------
+    events : list of dict
+        ``{"event_type": ..., "details": {...}}`` with the details listed in
+        the sound detection plan.
+
+    """
+    features = frame_features(samples, sample_rate, frame_duration_ms)
+    return events_from_features(
+        features,
+        loud_noise_dbfs_threshold=loud_noise_dbfs_threshold,
+        min_noise_duration=min_noise_duration,
+        min_speech_duration=min_speech_duration,
+        vad_aggressiveness=vad_aggressiveness,
+    )
+
+
+def _synthetic_chunk(sample_rate, seconds, rng):
+    """Room noise with four seconds of a vowel-like voice (140 Hz pitch, formants near 700 and 1800 Hz)."""
+    t = np.arange(int(sample_rate * seconds), dtype=np.float64) / sample_rate
+    signal = rng.normal(0.0, 0.003, t.shape)
+    voiced = (t > 0.5) & (t < 4.5)
+    pitch = 140.0
+    voice = np.zeros_like(t)
+    for k in range(1, 25):
+        f = k * pitch
+        gain = 0.1 / k + np.exp(-((f - 700.0) / 300.0) ** 2) + 0.6 * np.exp(-((f - 1800.0) / 400.0) ** 2)
+        voice += gain * np.sin(2 * np.pi * f * t)
+    signal[voiced] += 0.03 * voice[voiced]
+    return signal.astype(np.float32)
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Benchmark detect_sound_events on synthetic chunks (single core).')
+    parser.add_argument('--sample-rate', type=int, default=48000)
+    parser.add_argument('--chunk-seconds', type=float, default=5.0)
+    parser.add_argument('--chunks', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chunk = _synthetic_chunk(args.sample_rate, args.chunk_seconds, rng)
+    print(f"Events on sample chunk: {detect_sound_events(chunk, args.sample_rate)}")
+
+    detect_sound_events(chunk, args.sample_rate)  # Warm the window/band cache
+    started = time.process_time()
+    for _ in range(args.chunks):
+        detect_sound_events(chunk, args.sample_rate)
+    elapsed = time.process_time() - started
+    rate = args.chunks / elapsed if elapsed > 0 else float('inf')
+    print(f"{args.chunks} chunks of {args.chunk_seconds}s @ {args.sample_rate} Hz: "
+          f"{rate:.1f} chunks/s/core ({rate * args.chunk_seconds:.0f}x real time)")
+
+
+if __name__ == '__main__':
+    main()
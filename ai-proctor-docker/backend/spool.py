@@ -0,0 +1,339 @@
+"""
+Durable local spool for writes that could not reach MongoDB.
+
+Records are appended to ``<directory>/spool-<slot>.log``, each framed as
+
+    <uint32 length> <uint32 crc32(payload)> <float64 unix time> <payload>
+
+where the payload is Extended JSON (``bson.json_util``) of
+``{"c": collection, "op": "insert" | "replace" | "update", "d": document}``.
+Documents carry their ``_id`` before they are spooled, so replaying a record
+twice is harmless: duplicate inserts (E11000) are ignored and replacements
+are upserts. An update record's document is ``{"_id": ..., "filter": ...,
+"update": ...}``, replayed as an upsert; its filter must make it a no-op the
+second time (an upsert that then collides on ``_id`` is a duplicate too).
+
+A background drainer replays records in file order and persists its read
+offset in ``spool-<slot>.offset`` after every acknowledged batch. Once the
+file is fully drained it is truncated. Each worker process locks one slot
+with ``flock``; spool files left by a previous run are picked up by whichever
+worker locks that slot next.
+"""
+
+import fcntl
+import os
+import struct
+import threading
+import time
+import zlib
+
+from bson import ObjectId, json_util
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+HEADER = struct.Struct('<IId')
+MAX_RECORD_BYTES = 16 * 1024 * 1024
+DUPLICATE_KEY_ERROR = 11000
+
+INSERT = 'insert'
+REPLACE = 'replace'
+UPDATE = 'update'
+
+
+class SpoolFull(Exception):
+    """Raised when appending would grow the spool past ``max_bytes``."""
+
+
+class Spool:
+    """
+    Append-only, checksummed write spool with an in-order background drainer.
+
+    Parameters
+    ----------
+    directory : str
+        Where spool files live; must survive restarts (a volume in Docker).
+    collections : dict
+        Collection name -> collection used when replaying records.
+    max_bytes : int
+        Appends beyond this file size raise :class:`SpoolFull`.
+    drain_interval : float
+        Seconds between drain attempts while records are pending.
+    drain_batch : int
+        Records replayed per bulk write.
+    max_slots : int
+        Number of slot files tried when locking one for this process.
+
+    """
+
+    def __init__(self, directory, collections, max_bytes=1024 ** 3, drain_interval=2.0, drain_batch=500,
+                 max_slots=16):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.collections = collections
+        self.max_bytes = max_bytes
+        self.drain_interval = drain_interval
+        self.drain_batch = drain_batch
+
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+        self._lock_file, self.slot = self._acquire_slot(max_slots)
+        self.path = os.path.join(directory, f'spool-{self.slot}.log')
+        self._offset_path = os.path.join(directory, f'spool-{self.slot}.offset')
+        self._file = open(self.path, 'ab')
+        self._offset = self._load_offset()
+        self._size = self._file.seek(0, os.SEEK_END)
+        self._oldest_pending_at = None
+
+        self._appended_total = 0
+        self._drained_total = 0
+        self._corrupt_total = 0
+        self._last_drain_rate = None
+        self._last_drain_at = None
+        self._last_error = None
+
+        self._recover_tail()
+
+    def _acquire_slot(self, max_slots):
+        for slot in range(max_slots):
+            lock_file = open(os.path.join(self.directory, f'spool-{slot}.lock'), 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            return lock_file, slot
+        raise OSError(f"All {max_slots} spool slots in {self.directory} are locked")
+
+    def _load_offset(self):
+        try:
+            with open(self._offset_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_offset(self, offset):
+        tmp_path = self._offset_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._offset_path)
+
+    def _recover_tail(self):
+        """Drop a record left half-written by a crash, and note the oldest pending record."""
+        valid_end = self._offset
+        oldest = None
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                length, _, written_at = HEADER.unpack(header)
+                if length > MAX_RECORD_BYTES or len(f.read(length)) < length:
+                    break
+                valid_end = f.tell()
+                if oldest is None:
+                    oldest = written_at
+        if valid_end < self._size:
+            print(f"[SPOOL_WARNING] Truncating {self._size - valid_end} bytes of incomplete records in {self.path}", flush=True)
+            self._file.truncate(valid_end)
+            self._size = valid_end
+        if self._offset > self._size:
+            self._offset = self._size
+        self._oldest_pending_at = oldest
+        if self._size > self._offset:
+            print(f"[SPOOL] Found {self._size - self._offset} bytes of unreplayed records in {self.path}", flush=True)
+
+    def start(self):
+        """Start the background drainer."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=f"spool-{self.slot}-drainer", daemon=True)
+        self._thread.start()
+
+    def pending(self):
+        """True while records are waiting to be replayed."""
+        with self._lock:
+            return self._size > self._offset
+
+    def append(self, collection_name, doc, op=INSERT):
+        self.append_many(collection_name, [doc] if op == INSERT else [], [doc] if op == REPLACE else [],
+                         [doc] if op == UPDATE else [])
+
+    def append_many(self, collection_name, inserts=(), replacements=(), updates=()):
+        """
+        Durably append insert, replace and update records, in that order.
+
+        Raises
+        ------
+        SpoolFull
+            If the records would push the file past ``max_bytes``.
+        OSError
+            If the file cannot be written.
+
+        """
+        frames = []
+        now = time.time()
+        for op, docs in ((INSERT, inserts), (REPLACE, replacements), (UPDATE, updates)):
+            for doc in docs:
+                doc.setdefault('_id', ObjectId())
+                payload = json_util.dumps({'c': collection_name, 'op': op, 'd': doc}).encode('utf-8')
+                frames.append(HEADER.pack(len(payload), zlib.crc32(payload), now) + payload)
+        if not frames:
+            return
+        data = b''.join(frames)
+        with self._lock:
+            if self._size + len(data) > self.max_bytes:
+                raise SpoolFull(f"Spool {self.path} would exceed {self.max_bytes} bytes")
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._size == self._offset:
+                self._oldest_pending_at = now
+            self._size += len(data)
+            self._appended_total += len(frames)
+        self._wakeup.set()
+
+    def _read_records(self, start, end, limit):
+        """Decode up to ``limit`` records between byte offsets ``start`` and ``end``."""
+        records = []
+        position = start
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            while position < end and len(records) < limit:
+                header = f.read(HEADER.size)
+                length, crc, written_at = HEADER.unpack(header)
+                if length > MAX_RECORD_BYTES:
+                    # The length itself is corrupt; nothing after it can be framed
+                    print(f"[SPOOL_ERROR] Corrupt record header at offset {position} in {self.path}; discarding {end - position} bytes", flush=True)
+                    self._corrupt_total += 1
+                    return records, end, None
+                payload = f.read(length)
+                position += HEADER.size + length
+                if zlib.crc32(payload) != crc:
+                    print(f"[SPOOL_ERROR] Checksum mismatch at offset {position - HEADER.size - length} in {self.path}; skipping record", flush=True)
+                    self._corrupt_total += 1
+                    continue
+                records.append((json_util.loads(payload.decode('utf-8')), written_at))
+        next_written_at = None
+        if position < end:
+            with open(self.path, 'rb') as f:
+                f.seek(position)
+                next_written_at = HEADER.unpack(f.read(HEADER.size))[2]
+        return records, position, next_written_at
+
+    def _replay(self, records):
+        """Write records in order; each run of one collection is one bulk write."""
+        runs = []
+        for record, _ in records:
+            if not runs or runs[-1][0] != record['c']:
+                runs.append((record['c'], []))
+            runs[-1][1].append(record)
+        for collection_name, run in runs:
+            collection = self.collections.get(collection_name)
+            if collection is None:
+                print(f"[SPOOL_ERROR] Dropping {len(run)} records for unknown collection {collection_name}", flush=True)
+                continue
+            # A later replacement of the same document supersedes earlier ones
+            last_replace = {record['d']['_id']: i for i, record in enumerate(run) if record['op'] == REPLACE}
+            requests = []
+            for i, record in enumerate(run):
+                doc = record['d']
+                if record['op'] == INSERT:
+                    requests.append(InsertOne(doc))
+                elif record['op'] == UPDATE:
+                    requests.append(UpdateOne(doc['filter'], doc['update'], upsert=True))
+                elif last_replace[doc['_id']] == i:
+                    requests.append(ReplaceOne({'_id': doc['_id']}, doc, upsert=True))
+            try:
+                collection.bulk_write(requests, ordered=False)
+            except BulkWriteError as bwe:
+                errors = [err for err in bwe.details.get('writeErrors', []) if err.get('code') != DUPLICATE_KEY_ERROR]
+                for err in errors:
+                    # Rejected by the server (not an outage): retrying cannot succeed
+                    print(f"[SPOOL_ERROR] Dropping spooled {collection_name} record rejected by the database: {err.get('errmsg')}", flush=True)
+
+    def drain(self):
+        """
+        Replay pending records until the spool is empty or a write fails.
+
+        Returns
+        -------
+        drained : int
+            Number of records replayed.
+
+        """
+        drained = 0
+        started = time.perf_counter()
+        with self._drain_lock:
+            while True:
+                with self._lock:
+                    start, end = self._offset, self._size
+                if start >= end:
+                    break
+                records, position, next_written_at = self._read_records(start, end, self.drain_batch)
+                try:
+                    self._replay(records)
+                except Exception as e:
+                    self._last_error = str(e)
+                    print(f"[SPOOL_WARNING] Drain paused after {drained} records: {e}", flush=True)
+                    break
+                self._save_offset(position)
+                drained += len(records)
+                with self._lock:
+                    self._offset = position
+                    self._oldest_pending_at = next_written_at
+                    self._drained_total += len(records)
+                    self._last_error = None
+                    if self._offset == self._size:
+                        # Fully drained: start the file over
+                        self._file.truncate(0)
+                        self._size = self._offset = 0
+                        self._save_offset(0)
+        if drained:
+            elapsed = time.perf_counter() - started
+            self._last_drain_rate = drained / elapsed if elapsed > 0 else None
+            self._last_drain_at = time.time()
+            print(f"[SPOOL] Replayed {drained} spooled records ({self._last_drain_rate or 0:.0f}/s)", flush=True)
+        return drained
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.drain_interval)
+            self._wakeup.clear()
+            if not self.pending():
+                continue
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"[SPOOL_ERROR] Unexpected drainer error: {e}", flush=True)
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        with self._lock:
+            self._file.close()
+        self._lock_file.close()
+
+    def stats(self):
+        """Spool size, age of the oldest pending record and drain rate."""
+        with self._lock:
+            pending_bytes = self._size - self._offset
+            oldest = self._oldest_pending_at
+        return {
+            "slot": self.slot,
+            "pending_bytes": pending_bytes,
+            "max_bytes": self.max_bytes,
+            "oldest_pending_age_seconds": (time.time() - oldest) if pending_bytes and oldest else 0.0,
+            "appended_total": self._appended_total,
+            "drained_total": self._drained_total,
+            "corrupt_total": self._corrupt_total,
+            "last_drain_rate_per_second": self._last_drain_rate,
+            "last_drain_at": self._last_drain_at,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,95 @@
+"""
+Report what each of app.py's imports costs at worker boot.
+
+Every top-level import in app.py (or the modules given on the command line)
+is imported in a fresh interpreter, so the numbers are what that module adds
+on its own: wall-clock seconds and resident memory (MB) gained. Shared
+dependencies are counted for every module that pulls them in; compare rows,
+don't add them up.
+
+Usage::
+
+    python startup_report.py                  # app.py's imports
+    python startup_report.py librosa scipy    # specific modules
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+_PROBE = r"""
+import json, sys, time
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+before = rss_mb()
+started = time.perf_counter()
+error = None
+try:
+    __import__(sys.argv[1])
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+print(json.dumps({"seconds": time.perf_counter() - started, "mb": rss_mb() - before, "error": error}))
+"""
+
+
+def app_imports(path):
+    """Top-level modules imported at module level by ``path``, in order."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            if name not in modules:
+                modules.append(name)
+    return modules
+
+
+def measure(module, cwd):
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE, module],
+        cwd=cwd, capture_output=True, text=True, timeout=300,
+    )
+    try:
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {"seconds": 0.0, "mb": 0.0, "error": (result.stderr.strip().splitlines() or ['no output'])[-1]}
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Per-import startup time and memory.')
+    parser.add_argument('modules', nargs='*', help="Modules to measure (default: app.py's imports)")
+    parser.add_argument('--app', default=os.path.join(here, 'app.py'))
+    args = parser.parse_args()
+
+    modules = args.modules or app_imports(args.app)
+    rows = [(module, measure(module, here)) for module in modules]
+    rows.sort(key=lambda row: row[1]["seconds"], reverse=True)
+
+    print(f"{'module':<32} {'seconds':>8} {'MB':>8}")
+    for module, cost in rows:
+        note = f"  ({cost['error']})" if cost["error"] else ""
+        print(f"{module:<32} {cost['seconds']:>8.3f} {cost['mb']:>8.1f}{note}")
+
+
+if __name__ == '__main__':
+    main()
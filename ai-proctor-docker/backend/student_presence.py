@@ -0,0 +1,117 @@
+"""
+Student liveness from persistent Socket.IO connections.
+
+An HTTP heartbeat costs a request, JWT verification and a JSON parse to move
+one timestamp. On the ``/ws/student`` namespace the student authenticates
+once at connect. After that the connection itself is the liveness signal:
+Engine.IO's ping/pong frames keep it open, and a client that stops
+answering them is disconnected. :class:`StudentPresence` tracks the
+sessions with an open connection on this worker. Every ``flush_interval``
+it writes ``last_heartbeat_time`` for all of them in one
+``update_many`` call, so a connected student costs one field in one batched
+write per interval. Disconnects are reported by the caller as they happen.
+"""
+
+import datetime
+import threading
+import time
+
+
+class StudentPresence:
+    """
+    Connected student sockets on this worker and their batched heartbeats.
+
+    Parameters
+    ----------
+    store : session_state backend
+    flush_interval : float
+        Seconds between heartbeat writes; keep well under the reaper TTL.
+
+    """
+
+    def __init__(self, store, flush_interval=15.0):
+        self.store = store
+        self.flush_interval = flush_interval
+
+        self._sockets = {}  # socket sid -> session_id
+        self._sessions = {}  # session_id -> number of open sockets
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._connects_total = 0
+        self._disconnects_total = 0
+        self._flushes_total = 0
+        self._last_flush_sessions = 0
+        self._last_flush_ms = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="student-presence", daemon=True)
+        self._thread.start()
+
+    def connect(self, sid, session_id):
+        """Returns True if this is the session's first open socket on this worker."""
+        with self._lock:
+            self._connects_total += 1
+            self._sockets[sid] = session_id
+            self._sessions[session_id] = self._sessions.get(session_id, 0) + 1
+            return self._sessions[session_id] == 1
+
+    def disconnect(self, sid):
+        """
+        Forget a socket. Returns its session id if that was the session's last
+        open socket on this worker, otherwise None.
+        """
+        with self._lock:
+            session_id = self._sockets.pop(sid, None)
+            if session_id is None:
+                return None
+            self._disconnects_total += 1
+            remaining = self._sessions.get(session_id, 1) - 1
+            if remaining > 0:
+                self._sessions[session_id] = remaining
+                return None
+            self._sessions.pop(session_id, None)
+            return session_id
+
+    def session_of(self, sid):
+        with self._lock:
+            return self._sockets.get(sid)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[STUDENT_PRESENCE_ERROR] Heartbeat flush failed: {e}", flush=True)
+
+    def flush(self):
+        with self._lock:
+            session_ids = list(self._sessions)
+        if not session_ids:
+            return
+        started = time.perf_counter()
+        now = datetime.datetime.utcnow().isoformat()
+        self.store.update_many({session_id: {"last_heartbeat_time": now} for session_id in session_ids})
+        self._flushes_total += 1
+        self._last_flush_sessions = len(session_ids)
+        self._last_flush_ms = (time.perf_counter() - started) * 1000.0
+
+    def close(self):
+        self._stopped.set()
+
+    def stats(self):
+        with self._lock:
+            sockets, sessions = len(self._sockets), len(self._sessions)
+        return {
+            "flush_interval_seconds": self.flush_interval,
+            "connected_sockets": sockets,
+            "connected_sessions": sessions,
+            "connects_total": self._connects_total,
+            "disconnects_total": self._disconnects_total,
+            "flushes_total": self._flushes_total,
+            "last_flush_sessions": self._last_flush_sessions,
+            "last_flush_ms": self._last_flush_ms,
+        }
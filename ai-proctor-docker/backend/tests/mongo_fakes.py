@@ -0,0 +1,56 @@
+"""
+mongomock collections for the tests.
+
+mongomock's own ``bulk_write`` does not accept the request objects of the
+installed pymongo, so :class:`FakeCollection` applies them one by one and
+reports duplicates the way an unordered bulk write does. Setting
+``fail_with`` makes every call raise that exception, standing in for an
+outage.
+"""
+
+import mongomock
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+class FakeCollection:
+    def __init__(self, name='events'):
+        self._collection = mongomock.MongoClient().db[name]
+        self.fail_with = None
+        self.bulk_writes = []  # Number of requests in each bulk_write call
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            if self.fail_with is not None:
+                raise self.fail_with
+            return attribute(*args, **kwargs)
+        return call
+
+    def insert_many(self, docs, ordered=True):
+        return self.bulk_write([InsertOne(doc) for doc in docs], ordered=ordered)
+
+    def bulk_write(self, requests, ordered=True):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.bulk_writes.append(len(requests))
+        errors = []
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._collection.insert_one(request._doc)
+                elif isinstance(request, ReplaceOne):
+                    self._collection.replace_one(request._filter, request._doc, upsert=request._upsert)
+                elif isinstance(request, UpdateOne):
+                    self._collection.update_one(request._filter, request._doc, upsert=request._upsert)
+                else:
+                    raise TypeError(f"Unsupported request {request!r}")
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': []})
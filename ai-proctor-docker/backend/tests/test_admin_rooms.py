@@ -0,0 +1,59 @@
+import pytest
+
+import admin_rooms
+from admin_rooms import ALL_ROOM
+
+TAGGED = {"exam_id": "e1", "proctor_group": "g1"}
+
+
+@pytest.mark.parametrize('entry, rooms', [
+    ({}, [ALL_ROOM]),
+    (TAGGED, [ALL_ROOM, 'exam:e1', 'group:g1']),
+    ({**TAGGED, "unread_alert_count": 2},
+     [ALL_ROOM, 'exam:e1', 'group:g1', ALL_ROOM + ':alerts', 'exam:e1:alerts', 'group:g1:alerts']),
+    ({"exam_id": None, "proctor_group": "g1"}, [ALL_ROOM, 'group:g1']),
+])
+def test_session_rooms(entry, rooms):
+    assert admin_rooms.session_rooms(entry) == rooms
+
+
+def test_alerting_can_be_forced():
+    assert admin_rooms.session_rooms({}, alerting=True) == [ALL_ROOM, ALL_ROOM + ':alerts']
+    assert admin_rooms.session_rooms({"unread_alert_count": 1}, alerting=False) == [ALL_ROOM]
+
+
+def test_clearing_the_last_unread_alert_reaches_the_alerts_rooms():
+    entry = {"exam_id": "e1", "unread_alert_count": 0}
+    assert 'exam:e1:alerts' in admin_rooms.delta_rooms(entry, {"unread_alert_count"})
+    assert 'exam:e1:alerts' not in admin_rooms.delta_rooms(entry, {"latest_status"})
+
+
+def test_subscription_rooms():
+    assert admin_rooms.subscription_rooms() == [ALL_ROOM]
+    assert admin_rooms.subscription_rooms(alerts_only=True) == [ALL_ROOM + ':alerts']
+    assert admin_rooms.subscription_rooms(['e1', 'e2'], ['g1']) == ['exam:e1', 'exam:e2', 'group:g1']
+
+
+def test_every_subscription_room_is_an_admin_room():
+    rooms = admin_rooms.subscription_rooms(['e1'], ['g1'], alerts_only=True) + admin_rooms.subscription_rooms()
+    assert all(admin_rooms.is_admin_room(room) for room in rooms + [ALL_ROOM + ':alerts'])
+    assert not admin_rooms.is_admin_room('student_s1')
+
+
+@pytest.mark.parametrize('filters, matches', [
+    ({}, True),
+    ({"exam_ids": ['e1']}, True),
+    ({"exam_ids": ['e2'], "proctor_groups": ['g1']}, True),
+    ({"exam_ids": ['e2']}, False),
+    ({"alerts_only": True}, False),
+])
+def test_session_matches(filters, matches):
+    assert admin_rooms.session_matches(TAGGED, **filters) is matches
+
+
+def test_subscription_and_emit_rooms_agree():
+    entry = {**TAGGED, "unread_alert_count": 1}
+    for filters in ({}, {"exam_ids": ['e1']}, {"proctor_groups": ['g1'], "alerts_only": True}):
+        joined = set(admin_rooms.subscription_rooms(**filters))
+        assert joined & set(admin_rooms.session_rooms(entry))
+        assert admin_rooms.session_matches(entry, **filters)
@@ -0,0 +1,123 @@
+import pytest
+
+import data_access
+from alert_counters import AlertCounters
+from mongo_fakes import FakeCollection
+from spool import Spool
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection('alert_counters')
+
+
+def test_counts_are_shared_by_every_worker(collection):
+    first, second = AlertCounters(collection), AlertCounters(collection)
+    first.record_alert('s1', 'looking_away', username='alice')
+    counts = second.record_alert('s1', 'no_face_detected')
+
+    assert counts == {"total": 2, "unread": 2,
+                      "by_type": {"looking_away": 1, "no_face_detected": 1},
+                      "unread_by_type": {"looking_away": 1, "no_face_detected": 1}}
+    assert first.get('s1') == counts
+    stored = collection.find_one({'_id': 's1'})
+    assert stored['student_username'] == 'alice'
+    assert len(stored['applied_ops']) == 2
+
+
+def test_acknowledging_moves_an_alert_out_of_unread(collection):
+    counters = AlertCounters(collection)
+    counters.record_alert('s1', 'looking_away')
+    counters.record_alert('s1', 'looking_away')
+    counts = counters.record_acknowledged('s1', 'looking_away')
+    assert counts["total"] == 2
+    assert counts["unread"] == 1
+    assert counts["unread_by_type"] == {"looking_away": 1}
+
+
+def test_alert_types_are_safe_field_names(collection):
+    counts = AlertCounters(collection).record_alert('s1', 'sound.$speech')
+    assert counts["by_type"] == {"sound__speech": 1}
+
+
+def test_applied_ops_are_bounded(collection):
+    counters = AlertCounters(collection)
+    for _ in range(70):
+        counters.record_alert('s1', 'looking_away')
+    stored = collection.find_one({'_id': 's1'})
+    assert stored['total'] == 70
+    assert len(stored['applied_ops']) == 64
+    assert 'applied_ops' not in counters.get('s1')
+
+
+def test_increments_are_spooled_during_an_outage_and_replayed_once(collection, tmp_path):
+    spool = Spool(str(tmp_path / 'spool'), {'alert_counters': collection})
+    try:
+        counters = AlertCounters(collection, spool=spool)
+        counters.record_alert('s1', 'looking_away')
+
+        collection.fail_with = data_access.DatabaseUnavailable('circuit open')
+        counts = counters.record_alert('s1', 'looking_away')
+        assert counts["total"] == 2  # From the cache while MongoDB is away
+        assert spool.pending()
+
+        collection.fail_with = None
+        assert spool.drain() == 1
+        assert collection.find_one({'_id': 's1'})['total'] == 2
+    finally:
+        spool.close()
+
+
+def test_replaying_an_increment_that_was_applied_does_nothing(collection, tmp_path):
+    spool = Spool(str(tmp_path / 'spool'), {'alert_counters': collection})
+    try:
+        counters = AlertCounters(collection, spool=spool)
+        counters.record_alert('s1', 'looking_away')
+
+        # The update reached MongoDB but its reply was lost, so it was spooled as well
+        update = collection.find_one_and_update
+        applied = []
+
+        def lost_reply(*args, **kwargs):
+            applied.append(update(*args, **kwargs))
+            raise data_access.DatabaseUnavailable('timed out')
+
+        collection.find_one_and_update = lost_reply
+        counters.record_alert('s1', 'looking_away')
+        del collection.find_one_and_update
+        assert applied and collection.find_one({'_id': 's1'})['total'] == 2
+
+        spool.drain()
+        assert collection.find_one({'_id': 's1'})['total'] == 2
+    finally:
+        spool.close()
+
+
+def test_without_a_collection_counts_are_kept_in_memory():
+    counters = AlertCounters(None)
+    counters.record_alert('s1', 'looking_away')
+    counters.record_acknowledged('s1', 'looking_away')
+    counts = counters.record_acknowledged('s1', 'looking_away')
+    assert counts["unread"] == 0  # Never negative
+    assert counters.all_sessions() == ([], {"total": 0, "unread": 0, "by_type": {}, "unread_by_type": {}})
+
+
+def test_all_sessions_sums_the_matching_sessions(collection):
+    counters = AlertCounters(collection)
+    counters.record_alert('s1', 'looking_away', username='alice')
+    counters.record_alert('s2', 'looking_away', username='bob')
+    counters.record_alert('s2', 'no_face_detected', username='bob')
+
+    sessions, totals = counters.all_sessions()
+    assert sorted(doc['_id'] for doc in sessions) == ['s1', 's2']
+    assert totals["by_type"] == {"looking_away": 2, "no_face_detected": 1}
+
+    sessions, totals = counters.all_sessions({'student_username': 'bob'})
+    assert [doc['_id'] for doc in sessions] == ['s2'] and totals["total"] == 2
+
+
+def test_forget_only_drops_the_cache(collection):
+    counters = AlertCounters(collection)
+    counters.record_alert('s1', 'looking_away')
+    counters.forget('s1')
+    assert counters.get('s1')["total"] == 1
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from audio_batch import AudioBatchWorker
+
+
+class RecordingAnalyzer:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def process_many(self, chunks):
+        self.batches.append([session_id for session_id, _, _ in chunks])
+        if self.fail:
+            raise ValueError('bad chunk')
+        return [{"session_id": session_id, "samples": len(samples)} for session_id, samples, _ in chunks]
+
+
+@pytest.fixture
+def make_worker():
+    workers = []
+
+    def make(analyzer, **kwargs):
+        worker = AudioBatchWorker(analyzer, **kwargs)
+        workers.append(worker)
+        return worker
+
+    yield make
+    for worker in workers:
+        worker.close()
+
+
+def _analyze_in_threads(worker, session_ids, results):
+    threads = [threading.Thread(target=lambda s=s: results.__setitem__(s, worker.analyze(s, [0.0] * len(s), 16000)))
+               for s in session_ids]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _wait_for_queue(worker, size):
+    deadline = time.monotonic() + 5
+    while worker.stats()["queued"] < size and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_waiting_chunks_are_analysed_together_and_each_gets_its_result(make_worker):
+    analyzer = RecordingAnalyzer()
+    worker = make_worker(analyzer, max_batch=8, max_wait=0.0)
+    results = {}
+    threads = _analyze_in_threads(worker, ['a', 'bb', 'ccc'], results)
+    _wait_for_queue(worker, 3)
+    worker.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(analyzer.batches) == 1 and sorted(analyzer.batches[0]) == ['a', 'bb', 'ccc']
+    assert results == {s: {"session_id": s, "samples": len(s)} for s in ('a', 'bb', 'ccc')}
+    assert worker.stats()["mean_batch_size"] == 3.0
+
+
+def test_batches_are_capped_at_max_batch(make_worker):
+    analyzer = RecordingAnalyzer()
+    worker = make_worker(analyzer, max_batch=2, max_wait=0.0)
+    threads = _analyze_in_threads(worker, ['a', 'b', 'c', 'd', 'e'], {})
+    _wait_for_queue(worker, 5)
+    worker.start()
+    for thread in threads:
+        thread.join(5)
+    assert [len(batch) for batch in analyzer.batches] == [2, 2, 1]
+
+
+def test_first_chunk_waits_for_more_up_to_max_wait(make_worker):
+    analyzer = RecordingAnalyzer()
+    worker = make_worker(analyzer, max_batch=2, max_wait=5.0)
+    worker.start()
+    results = {}
+    threads = _analyze_in_threads(worker, ['a'], results)
+    time.sleep(0.05)
+    threads += _analyze_in_threads(worker, ['b'], results)
+    for thread in threads:
+        thread.join(5)
+    assert [sorted(batch) for batch in analyzer.batches] == [['a', 'b']]  # The batch filled before the wait ran out
+
+
+def test_a_failed_batch_raises_in_every_request(make_worker):
+    worker = make_worker(RecordingAnalyzer(fail=True), max_wait=0.0)
+    worker.start()
+    with pytest.raises(ValueError, match='bad chunk'):
+        worker.analyze('s1', [0.0], 16000)
+    assert worker.stats()["batches_total"] == 1
+
+
+def test_analyze_times_out_when_the_worker_is_not_running(make_worker):
+    worker = make_worker(RecordingAnalyzer())
+    with pytest.raises(TimeoutError):
+        worker.analyze('s1', [0.0], 16000, timeout=0.01)
@@ -0,0 +1,113 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+import audio_evidence
+from audio_evidence import AudioEvidenceRecorder, read_clip
+from segment_store import SegmentStore
+
+RATE = 1000
+
+
+@pytest.fixture(autouse=True)
+def wav_clips(monkeypatch):
+    monkeypatch.setattr(audio_evidence, '_soundfile', lambda: None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SegmentStore(str(tmp_path / 'segments'))
+
+
+@pytest.fixture
+def recorder(store):
+    return AudioEvidenceRecorder(store, padding=1.0, history_seconds=5.0, max_clip_seconds=30.0)
+
+
+def _chunk(index, seconds=1.0):
+    """Samples whose int16 value is their position in the stream, so clips show where they were cut."""
+    length = int(RATE * seconds)
+    return (np.arange(index * length, (index + 1) * length) + 0.5) / 32767.0
+
+
+def _clip(store, filename):
+    data, mimetype = read_clip(store, filename)
+    assert mimetype == 'audio/wav'
+    with wave.open(io.BytesIO(data)) as wav_file:
+        assert wav_file.getframerate() == RATE
+        return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype='<i2')
+
+
+def test_clip_is_padded_on_both_sides(recorder, store):
+    recorder.append('s1', _chunk(0), RATE)
+    recorder.append('s1', _chunk(1), RATE)
+    filename = recorder.capture('s1', 'c1', start_offset_seconds=0.5, duration_seconds=0.5)
+    assert filename == 'audio_s1_c1.wav'
+    assert read_clip(store, filename) is None  # Waiting for the trailing padding
+
+    recorder.append('s1', _chunk(2), RATE)
+    samples = _clip(store, filename)
+    assert samples[0] == 500 and samples[-1] == 2999
+
+
+def test_event_that_began_in_an_earlier_chunk(recorder, store):
+    for index in range(3):
+        recorder.append('s1', _chunk(index), RATE)
+    filename = recorder.capture('s1', 'c1', start_offset_seconds=-1.5, duration_seconds=0.5)
+    samples = _clip(store, filename)  # Event 0.5..1.0 s; already complete with its padding
+    assert samples[0] == 0 and samples[-1] == 1999
+
+
+def test_open_event_clip_ends_when_the_event_ends(recorder, store):
+    recorder.append('s1', _chunk(0), RATE)
+    filename = recorder.capture('s1', 'c1', 0.2, 0.5, event_type='speech_detected')
+    for index in range(1, 4):
+        recorder.append('s1', _chunk(index), RATE)
+    assert read_clip(store, filename) is None
+
+    recorder.append('s1', _chunk(4), RATE)
+    recorder.end_event('s1', 'speech_detected', start_offset_seconds=-3.8, duration_seconds=3.5)
+    samples = _clip(store, filename)
+    assert samples[0] == 0 and samples[-1] == 4699  # Event 0.2..3.7 s, one second of padding after
+
+
+def test_open_event_clip_is_cut_at_the_maximum_length(store):
+    recorder = AudioEvidenceRecorder(store, padding=0.0, max_clip_seconds=2.0)
+    recorder.append('s1', _chunk(0), RATE)
+    filename = recorder.capture('s1', 'c1', 0.0, 0.5, event_type='loud_noise_detected')
+    recorder.append('s1', _chunk(1), RATE)
+    assert len(_clip(store, filename)) == 2000
+    recorder.end_event('s1', 'loud_noise_detected', -1.0, 5.0)  # Nothing left to end
+    assert recorder.stats()["pending_clips"] == 0
+
+
+def test_sequence_gap_finishes_clips_and_starts_over(recorder, store):
+    recorder.append('s1', _chunk(0), RATE, sequence=1)
+    filename = recorder.capture('s1', 'c1', 0.5, 0.5)
+    recorder.append('s1', _chunk(5), RATE, sequence=6)  # Chunks 2-5 went to another worker
+
+    samples = _clip(store, filename)
+    assert samples[0] == 0 and samples[-1] == 999  # Nothing spliced from after the gap
+    assert recorder.stats()["sequence_gaps_total"] == 1
+
+
+def test_closing_a_session_keeps_the_audio_available(recorder, store):
+    recorder.append('s1', _chunk(0), RATE)
+    filename = recorder.capture('s1', 'c1', 0.8, 0.1, event_type='speech_detected')
+    recorder.close_session('s1')
+    assert _clip(store, filename)[-1] == 999
+    assert recorder.stats()["sessions"] == 0
+    assert recorder.capture('s1', 'c2', 0.0, 1.0) is None
+
+
+def test_history_is_trimmed(recorder):
+    for index in range(20):
+        recorder.append('s1', _chunk(index), RATE)
+    assert recorder.stats()["held_mb"] * 1024 * 1024 / 2 <= 6 * RATE
+
+
+def test_read_clip_rejects_unknown_names(store):
+    assert read_clip(store, 'nonsense.wav') is None
+    assert read_clip(store, 'audio_s1_missing.wav') is None
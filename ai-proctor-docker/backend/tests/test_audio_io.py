@@ -0,0 +1,92 @@
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+import audio_io
+from audio_io import AudioDecodeError
+
+
+def _wav(frames, sample_rate=16000, channels=1, sampwidth=2):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(sampwidth)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(frames)
+    return buffer.getvalue()
+
+
+def _float_wav(samples, sample_rate=16000, extra_chunk=b''):
+    data = np.asarray(samples, dtype='<f4').tobytes()
+    fmt = struct.pack('<HHIIHH', audio_io.WAVE_FORMAT_IEEE_FLOAT, 1, sample_rate, sample_rate * 4, 4, 32)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + extra_chunk
+    body += b'data' + struct.pack('<I', len(data)) + data
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def test_16_bit_wav_is_a_view_onto_the_request_bytes():
+    pcm = np.array([0, 1000, -1000, 32767], dtype='<i2')
+    data = _wav(pcm.tobytes())
+    samples, sample_rate = audio_io.decode_wav(data)
+    assert sample_rate == 16000
+    assert samples.tolist() == pcm.tolist()
+    assert not samples.flags.owndata
+
+
+def test_24_bit_stereo_wav_is_widened_to_int32():
+    left, right = 0x123456, -0x123456
+    frame = left.to_bytes(3, 'little', signed=True) + right.to_bytes(3, 'little', signed=True)
+    samples, _ = audio_io.decode_wav(_wav(frame * 2, channels=2, sampwidth=3))
+    assert samples.shape == (2, 2)
+    assert (samples >> 8).tolist() == [[left, right], [left, right]]
+
+
+def test_float_wav_with_an_odd_sized_chunk_before_data():
+    extra = b'LIST' + struct.pack('<I', 3) + b'abc' + b'\0'  # Padded to an even size
+    samples, _ = audio_io.decode_wav(_float_wav([0.5, -0.25], extra_chunk=extra))
+    assert samples.dtype == np.dtype('<f4')
+    assert samples.tolist() == [0.5, -0.25]
+
+
+def test_streamed_wav_with_a_placeholder_size_is_clamped():
+    data = bytearray(_wav(np.arange(4, dtype='<i2').tobytes()))
+    data[40:44] = struct.pack('<I', 0xFFFFFFFF)  # data chunk size of a streamed WAV
+    samples, _ = audio_io.decode_wav(bytes(data))
+    assert samples.tolist() == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'not a wav file', 'Not a RIFF/WAVE'),
+    (b'RIFF\x04\x00\x00\x00WAVE', 'No data chunk'),
+    (b'RIFF\x0c\x00\x00\x00WAVEdata\x00\x00\x00\x00', 'before fmt'),
+])
+def test_malformed_wav_is_rejected(data, message):
+    with pytest.raises(AudioDecodeError, match=message):
+        audio_io.decode_wav(data)
+
+
+def test_raw_pcm_ignores_a_trailing_partial_frame():
+    data = np.array([1, 2, 3, 4], dtype='<i2').tobytes() + b'\x05'
+    assert audio_io.decode_pcm(data, 's16le', channels=2).tolist() == [[1, 2], [3, 4]]
+
+
+def test_unknown_pcm_format_is_rejected():
+    with pytest.raises(AudioDecodeError):
+        audio_io.decode_pcm(b'\0\0', 's24be')
+    with pytest.raises(AudioDecodeError):
+        audio_io.decode_pcm(b'\0\0', 's16le', channels=0)
+
+
+def test_to_float32_scales_and_downmixes():
+    assert audio_io.to_float32(np.array([-32768, 16384], dtype='<i2')).tolist() == [-1.0, 0.5]
+    assert audio_io.to_float32(np.array([0, 128], dtype='u1')).tolist() == [-1.0, 0.0]
+    stereo = np.array([[0.5, -0.5], [1.0, 0.0]], dtype=np.float32)
+    assert audio_io.to_float32(stereo).tolist() == [0.0, 0.5]
+
+
+def test_to_float32_keeps_float_mono_without_copying():
+    samples = np.zeros(8, dtype=np.float32)
+    assert audio_io.to_float32(samples) is samples
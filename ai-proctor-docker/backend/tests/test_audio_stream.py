@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+import sound_event_detection as sed
+from audio_stream import SILENCE, StreamingAudioAnalyzer
+
+RATE = 16000
+
+
+def _quiet(seconds, rng):
+    return rng.normal(0.0, 0.001, int(RATE * seconds)).astype(np.float32)
+
+
+def _loud(seconds, rng):
+    return rng.normal(0.0, 0.3, int(RATE * seconds)).astype(np.float32)
+
+
+def _events(result, event_type):
+    return [event for event in result["events"] if event["event_type"] == event_type]
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(3)
+
+
+def test_noise_across_a_chunk_boundary_is_reported_once(rng):
+    analyzer = StreamingAudioAnalyzer(min_noise_duration=0.5)
+    first = analyzer.process('s1', np.concatenate((_quiet(0.7, rng), _loud(0.3, rng))), RATE)
+    second = analyzer.process('s1', np.concatenate((_loud(0.3, rng), _quiet(0.7, rng))), RATE)
+
+    assert _events(first, sed.LOUD_NOISE) == []  # 0.3 s so far
+    [event] = _events(second, sed.LOUD_NOISE)
+    assert event["details"]["start_offset_seconds"] == pytest.approx(-0.3, abs=0.03)
+    [ended] = [event for event in second["ended_events"] if event["event_type"] == sed.LOUD_NOISE]
+    assert ended["duration_seconds"] == pytest.approx(0.6, abs=0.06)
+
+
+def test_a_long_noise_is_not_reported_again_in_later_chunks(rng):
+    analyzer = StreamingAudioAnalyzer(min_noise_duration=0.5)
+    results = [analyzer.process('s1', _loud(1.0, rng), RATE) for _ in range(3)]
+    assert [len(_events(result, sed.LOUD_NOISE)) for result in results] == [1, 0, 0]
+
+
+def test_speech_split_into_short_chunks_is_detected(rng):
+    audio = sed._synthetic_chunk(RATE, 5.0, rng)
+    analyzer = StreamingAudioAnalyzer(min_speech_duration=3.0)
+    results = [analyzer.process('s1', audio[i:i + RATE], RATE) for i in range(0, len(audio), RATE)]
+
+    reported = [(i, event) for i, result in enumerate(results) for event in _events(result, sed.SPEECH)]
+    assert len(reported) == 1
+    chunk, event = reported[0]
+    # Voice starts 0.5 s into the audio, i.e. before the chunk it qualifies in
+    assert chunk * 1.0 + event["details"]["start_offset_seconds"] == pytest.approx(0.5, abs=0.1)
+    [ended] = [event for event in results[-1]["ended_events"] if event["event_type"] == sed.SPEECH]
+    assert ended["duration_seconds"] == pytest.approx(4.0, abs=0.1)
+
+
+def test_silent_chunks_skip_the_spectral_pass(rng):
+    analyzer = StreamingAudioAnalyzer()
+    result = analyzer.process('s1', _quiet(1.0, rng), RATE)
+    assert result["status"] == SILENCE
+    assert result["events"] == []
+    assert analyzer.stats()["silent_chunks_total"] == 1
+
+
+def test_samples_left_over_are_carried_into_the_next_chunk(rng):
+    analyzer = StreamingAudioAnalyzer()
+    audio = _quiet(1.0, rng)
+    for start in range(0, len(audio), 1000):  # Not a multiple of the 480-sample frame
+        analyzer.process('s1', audio[start:start + 1000], RATE)
+    state = analyzer._sessions['s1']
+    assert state.frames_processed == len(audio) // state.frame_length
+    assert len(state.carry) == len(audio) % state.frame_length
+
+
+def test_batched_chunks_match_one_at_a_time(rng):
+    chunks = [(session_id, np.concatenate((_quiet(0.5, rng), _loud(0.4, rng))), RATE)
+              for _ in range(2) for session_id in ('s1', 's2', 's3')]
+    one_by_one = StreamingAudioAnalyzer()
+    expected = [one_by_one.process(*chunk) for chunk in chunks]
+    assert StreamingAudioAnalyzer().process_many(chunks) == expected
+
+
+def test_idle_sessions_are_evicted(rng):
+    evicted = []
+    analyzer = StreamingAudioAnalyzer(idle_timeout=0.0, on_evict=evicted.append)
+    analyzer.process('s1', _quiet(0.1, rng), RATE)
+    assert analyzer.evict_idle() == 1
+    assert evicted == ['s1']
+    assert analyzer.noise_floor('s1') is None
+
+
+def test_closed_session_starts_over(rng):
+    analyzer = StreamingAudioAnalyzer(min_noise_duration=0.5)
+    analyzer.process('s1', _loud(0.3, rng), RATE)
+    analyzer.close_session('s1')
+    assert _events(analyzer.process('s1', _loud(0.3, rng), RATE), sed.LOUD_NOISE) == []
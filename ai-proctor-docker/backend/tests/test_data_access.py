@@ -0,0 +1,104 @@
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError, ExecutionTimeout
+
+import data_access
+from data_access import CircuitBreaker, DatabaseUnavailable, ResilientCursor, wrap_collection
+from mongo_fakes import FakeCollection
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection('proctoring_events')
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+
+
+@pytest.fixture
+def resilient(collection, breaker):
+    return wrap_collection({'proctoring_events': collection}, 'proctoring_events', breaker, timeout=5.0)
+
+
+def test_operations_pass_through_while_closed(resilient, breaker):
+    resilient.insert_one({'_id': 1, 'event_type': 'looking_away'})
+    assert resilient.find_one({'_id': 1})['event_type'] == 'looking_away'
+    assert breaker.stats()["state"] == data_access.CLOSED
+
+
+def test_outages_open_the_breaker_and_later_calls_fail_fast(resilient, collection, breaker):
+    collection.fail_with = AutoReconnect('connection reset')
+    for _ in range(2):
+        with pytest.raises(DatabaseUnavailable):
+            resilient.find_one({})
+    assert breaker.state == data_access.OPEN
+    assert breaker.opened_total == 1
+
+    collection.fail_with = None
+    with pytest.raises(DatabaseUnavailable, match='circuit open'):
+        resilient.find_one({})  # Rejected without reaching the collection
+    assert breaker.rejected_total == 1
+
+
+def test_server_errors_are_passed_through_without_tripping(resilient, breaker):
+    resilient.insert_one({'_id': 1})
+    for _ in range(3):
+        with pytest.raises(DuplicateKeyError):
+            resilient.insert_one({'_id': 1})
+    assert breaker.state == data_access.CLOSED
+
+
+def test_timeouts_count_as_outages(resilient, collection, breaker):
+    collection.fail_with = ExecutionTimeout('operation exceeded time limit', 50)
+    with pytest.raises(DatabaseUnavailable):
+        resilient.count_documents({})
+    assert breaker.stats()["consecutive_failures"] == 1
+
+
+def test_half_open_lets_one_probe_through(breaker, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(data_access.time, 'monotonic', lambda: now[0])
+    breaker.trip('unreachable at startup')
+    assert breaker.state == data_access.OPEN
+
+    now[0] += 60.0
+    breaker.before_call()  # The probe
+    assert breaker.state == data_access.HALF_OPEN
+    with pytest.raises(DatabaseUnavailable):
+        breaker.before_call()  # Others wait for the probe's outcome
+
+    breaker.record_failure('still down')
+    assert breaker.state == data_access.OPEN
+    now[0] += 60.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == data_access.CLOSED
+    breaker.before_call()
+
+
+def test_cursor_batches_are_guarded(resilient, collection, breaker):
+    resilient.insert_many([{'_id': i} for i in range(5)])
+    cursor = resilient.find({}).sort('_id', -1).limit(3)
+    assert isinstance(cursor, ResilientCursor)
+    assert [doc['_id'] for doc in cursor] == [4, 3, 2]
+
+    cursor = resilient.find({})
+    assert next(cursor)['_id'] == 0
+    cursor._cursor = iter([])
+    with pytest.raises(StopIteration):
+        next(cursor)
+    assert breaker.state == data_access.CLOSED  # An exhausted cursor is not an outage
+
+
+def test_iterator_results_are_wrapped(resilient):
+    resilient.insert_many([{'_id': 1, 'kind': 'a'}, {'_id': 2, 'kind': 'a'}])
+    result = resilient.aggregate([{'$group': {'_id': '$kind', 'n': {'$sum': 1}}}])
+    assert isinstance(result, ResilientCursor)
+    assert list(result) == [{'_id': 'a', 'n': 2}]
+
+
+def test_unconfigured_database_is_unavailable(breaker):
+    resilient = wrap_collection(None, 'alerts', breaker, timeout=5.0)
+    with pytest.raises(DatabaseUnavailable, match='not configured'):
+        resilient.find_one({})
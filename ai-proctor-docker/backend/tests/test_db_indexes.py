@@ -0,0 +1,82 @@
+import mongomock
+import pytest
+
+import db_indexes
+import event_store
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def test_every_definition_is_created_once(db):
+    assert db_indexes.ensure_indexes(db, event_store.TIMESERIES) == []
+    assert db_indexes.ensure_indexes(db, event_store.TIMESERIES) == []  # Idempotent
+    assert 'session_timestamp_id' in db.alerts.index_information()
+    assert db.users.index_information()['username_unique']['unique']
+    assert list(db.proctoring_events.index_information()['session_timestamp']['key']) == [
+        ('meta.session_id', 1), ('timestamp', -1)]
+
+
+def test_obsolete_indexes_are_dropped(db):
+    db.alerts.create_index([('session_id', 1), ('timestamp', -1)], name='session_timestamp')
+    db_indexes.ensure_indexes(db)
+    assert 'session_timestamp' not in db.alerts.index_information()
+
+
+def test_one_failing_index_does_not_block_the_others(db):
+    db.users.insert_many([{'username': 'alice'}, {'username': 'alice'}])
+    failures = db_indexes.ensure_indexes(db)
+    assert len(failures) == 1 and failures[0].startswith('users.username_unique')
+    assert 'timestamp_id' in db.alerts.index_information()
+
+
+def test_unknown_events_mode_uses_the_standard_indexes():
+    definitions = db_indexes.index_definitions('columnar')
+    assert definitions['proctoring_events'] == db_indexes.EVENT_INDEXES[event_store.STANDARD]
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {'stage': 'LIMIT', 'inputStage': {'stage': 'SORT_MERGE', 'inputStages': [
+        {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}, {'stage': 'COLLSCAN'}]}}
+    assert list(db_indexes._plan_stages(plan)) == ['LIMIT', 'SORT_MERGE', 'FETCH', 'IXSCAN', 'COLLSCAN']
+
+
+class ExplainedCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def limit(self, count):
+        return self
+
+    def sort(self, keys):
+        return self
+
+    def explain(self):
+        return {'queryPlanner': {'winningPlan': self.plan}}
+
+
+class ExplainedDatabase:
+    """Every query is an index scan except on the collections listed as unindexed."""
+
+    def __init__(self, unindexed):
+        self.unindexed = unindexed
+        self.queries = []
+
+    def __getitem__(self, name):
+        database = self
+
+        class Collection:
+            def find(self, query):
+                database.queries.append((name, query))
+                stage = 'COLLSCAN' if name in database.unindexed else 'IXSCAN'
+                return ExplainedCursor({'stage': 'LIMIT', 'inputStage': {'stage': stage}})
+        return Collection()
+
+
+def test_check_query_plans_flags_collscans():
+    db = ExplainedDatabase(unindexed={'users'})
+    report = db_indexes.check_query_plans(db, event_store.TIMESERIES)
+    assert [entry['collection'] for entry in report if entry['collscan']] == ['users']
+    assert ('proctoring_events', {'meta.session_id': '?'}) in db.queries
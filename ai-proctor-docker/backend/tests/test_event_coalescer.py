@@ -0,0 +1,122 @@
+import datetime
+
+from event_coalescer import FaceEventCoalescer, expand_range
+
+START = datetime.datetime(2024, 5, 1, 9, 0, 0)
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.inserts = []
+        self.replacements = []
+
+    def enqueue(self, doc):
+        self.inserts.append(doc)
+        return True
+
+    def enqueue_replace(self, doc):
+        self.replacements.append(doc)
+        return True
+
+
+def _event(seconds, eye_status='forward', session_id='s1', start=START):
+    return {
+        'event_type': 'face_analyzed',
+        'session_id': session_id,
+        'username': 'alice',
+        'timestamp': start + datetime.timedelta(seconds=seconds),
+        'details': {'eye_status': eye_status, 'face_count': 1},
+    }
+
+
+def test_identical_samples_extend_one_range():
+    writer = RecordingWriter()
+    coalescer = FaceEventCoalescer(writer, max_gap=30)
+    for second in range(5):
+        coalescer.add(_event(second))
+
+    assert len(writer.replacements) == 1  # Only the opening sample so far
+    coalescer.close_session('s1')
+    latest = writer.replacements[-1]
+    assert latest['_id'] == writer.replacements[0]['_id']
+    assert latest['sample_count'] == 5
+    assert latest['timestamp'] == START
+    assert latest['end_timestamp'] == START + datetime.timedelta(seconds=4)
+    assert coalescer.stats()['compression_ratio'] == 5
+
+
+def test_a_state_change_closes_the_range_and_opens_another():
+    writer = RecordingWriter()
+    coalescer = FaceEventCoalescer(writer, max_gap=30)
+    coalescer.add(_event(0))
+    coalescer.add(_event(1))
+    coalescer.add(_event(2, eye_status='left'))
+
+    first, closed, opened = writer.replacements
+    assert closed['_id'] == first['_id'] and closed['sample_count'] == 2
+    assert opened['_id'] != first['_id']
+    assert opened['details']['eye_status'] == 'left'
+
+
+def test_a_gap_longer_than_max_gap_starts_a_new_range():
+    writer = RecordingWriter()
+    coalescer = FaceEventCoalescer(writer, max_gap=30)
+    coalescer.add(_event(0))
+    coalescer.add(_event(31))
+    assert len({doc['_id'] for doc in writer.replacements}) == 2
+
+
+def test_closing_an_unchanged_range_does_not_rewrite_it():
+    writer = RecordingWriter()
+    coalescer = FaceEventCoalescer(writer)
+    coalescer.add(_event(0))
+    coalescer.close_session('s1')
+    assert len(writer.replacements) == 1
+    coalescer.close_session('s1')  # Already closed
+    assert coalescer.stats()['open_ranges'] == 0
+
+
+def test_append_only_inserts_each_range_once_when_it_closes():
+    writer = RecordingWriter()
+    coalescer = FaceEventCoalescer(writer, append_only=True)
+    coalescer.add(_event(0))
+    coalescer.add(_event(1))
+    assert writer.inserts == [] and writer.replacements == []
+
+    coalescer.add(_event(2, eye_status='left'))
+    coalescer.close_all()
+    assert [doc['sample_count'] for doc in writer.inserts] == [2, 1]
+    assert writer.replacements == []
+
+
+def test_checkpoint_rewrites_grown_ranges_and_closes_idle_ones():
+    writer = RecordingWriter()
+    coalescer = FaceEventCoalescer(writer, checkpoint_interval=0, max_gap=30)
+    now = datetime.datetime.utcnow()
+    coalescer.add(_event(0, session_id='live', start=now))
+    coalescer.add(_event(1, session_id='live', start=now))
+    coalescer.add(_event(0, session_id='idle', start=now - datetime.timedelta(minutes=5)))
+
+    coalescer.checkpoint()
+    live = [doc for doc in writer.replacements if doc['session_id'] == 'live']
+    assert live[-1]['sample_count'] == 2
+    assert coalescer.stats()['open_ranges'] == 1  # 'idle' was closed
+
+    writes = len(writer.replacements)
+    coalescer.checkpoint()  # Nothing grew since
+    assert len(writer.replacements) == writes
+
+
+def test_expand_range_spreads_samples_newest_first():
+    doc = dict(_event(0), _id='r1', coalesced=True, sample_count=3,
+               end_timestamp=START + datetime.timedelta(seconds=10))
+    samples = expand_range(doc)
+    assert [sample['timestamp'] for sample in samples] == [
+        START + datetime.timedelta(seconds=10), START + datetime.timedelta(seconds=5), START]
+    assert [sample['_id'] for sample in samples] == ['r1:2', 'r1:1', 'r1:0']
+    assert all(sample['range_id'] == 'r1' and 'sample_count' not in sample for sample in samples)
+
+
+def test_expand_range_leaves_plain_events_alone():
+    event = dict(_event(0), _id='e1')
+    assert expand_range(event) == [event]
@@ -0,0 +1,62 @@
+import pytest
+
+import event_store
+from event_store import STANDARD, TIMESERIES
+
+
+class FakeDatabase:
+    """Just enough of a pymongo Database for collection_type and create_collection."""
+
+    def __init__(self, **collections):
+        self.collections = collections  # name -> 'collection' or 'timeseries'
+        self.created = []
+
+    def list_collections(self, filter):
+        name = filter['name']
+        if name in self.collections:
+            yield {'name': name, 'type': self.collections[name]}
+
+    def create_collection(self, name, timeseries=None):
+        self.created.append((name, timeseries))
+        self.collections[name] = 'timeseries' if timeseries else 'collection'
+
+
+def test_timeseries_layout_round_trips():
+    event = {'timestamp': 1, 'session_id': 's1', 'username': 'alice', 'event_type': 'face_analyzed'}
+    stored = event_store.to_storage(dict(event), TIMESERIES)
+    assert stored == {'timestamp': 1, 'event_type': 'face_analyzed', 'meta': {'session_id': 's1', 'username': 'alice'}}
+    assert event_store.from_storage(stored, TIMESERIES) == event
+
+
+def test_standard_layout_is_unchanged():
+    event = {'session_id': 's1', 'meta': {'kept': True}}
+    assert event_store.to_storage(event, STANDARD) is event
+    assert event_store.from_storage(event, STANDARD) is event
+    assert event_store.from_storage({'session_id': 's1'}, TIMESERIES) == {'session_id': 's1'}
+
+
+def test_session_filter():
+    assert event_store.session_filter('s1', STANDARD) == {'session_id': 's1'}
+    assert event_store.session_filter('s1', TIMESERIES) == {'meta.session_id': 's1'}
+
+
+@pytest.mark.parametrize('mode', event_store.STORAGE_MODES)
+def test_missing_collection_is_created_in_the_requested_mode(mode):
+    db = FakeDatabase()
+    assert event_store.ensure_events_collection(db, mode) == mode
+    assert db.created == ([('proctoring_events', event_store.TIMESERIES_OPTIONS)] if mode == TIMESERIES else [])
+
+
+@pytest.mark.parametrize('existing, requested, mode', [
+    ('collection', TIMESERIES, STANDARD),
+    ('timeseries', STANDARD, TIMESERIES),
+    ('timeseries', TIMESERIES, TIMESERIES),
+])
+def test_existing_collection_layout_wins(existing, requested, mode):
+    db = FakeDatabase(proctoring_events=existing)
+    assert event_store.ensure_events_collection(db, requested) == mode
+    assert db.created == []
+
+
+def test_unknown_mode_falls_back_to_standard():
+    assert event_store.ensure_events_collection(FakeDatabase(), 'columnar') == STANDARD
@@ -0,0 +1,104 @@
+import pytest
+from pymongo.errors import AutoReconnect
+
+from event_writer import BufferedEventWriter
+from mongo_fakes import FakeCollection
+from spool import Spool
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection('proctoring_events')
+
+
+def test_flush_writes_everything_in_batches(collection):
+    writer = BufferedEventWriter(collection, batch_size=3)
+    for i in range(7):
+        assert writer.enqueue({'_id': i, 'session_id': 's1'})
+
+    assert writer.flush() == 7
+    assert collection.bulk_writes == [3, 3, 1]
+    assert sorted(doc['_id'] for doc in collection.find()) == list(range(7))
+    assert writer.stats()['queue_depth'] == 0
+
+
+def test_only_the_latest_replacement_is_written(collection):
+    writer = BufferedEventWriter(collection, batch_size=10)
+    for end in (1, 2, 3):
+        writer.enqueue_replace({'_id': 'range-1', 'end': end})
+    writer.enqueue({'_id': 'event-1'})
+
+    assert writer.flush() == 2
+    assert collection.bulk_writes == [2]
+    assert collection.find_one({'_id': 'range-1'}) == {'_id': 'range-1', 'end': 3}
+
+
+def test_documents_already_stored_are_not_retried(collection):
+    collection.insert_one({'_id': 1})
+    writer = BufferedEventWriter(collection, batch_size=10)
+    writer.enqueue({'_id': 1})
+    writer.enqueue({'_id': 2})
+
+    writer.flush()
+    stats = writer.stats()
+    assert stats['queue_depth'] == 0
+    assert stats['last_error'] is None
+    assert collection.count_documents({}) == 2
+
+
+def test_enqueue_beyond_the_bound_is_dropped(collection):
+    writer = BufferedEventWriter(collection, max_buffer=2)
+    assert writer.enqueue({'_id': 1})
+    assert writer.enqueue_replace({'_id': 'range-1', 'end': 1})
+    assert not writer.enqueue({'_id': 2})
+    assert writer.enqueue_replace({'_id': 'range-1', 'end': 2})  # Replaces a pending document
+    assert not writer.enqueue_replace({'_id': 'range-2', 'end': 1})
+    assert writer.stats()['dropped_total'] == 2
+
+
+def test_failed_batch_stays_buffered_until_the_database_is_back(collection):
+    writer = BufferedEventWriter(collection, batch_size=2)
+    for i in range(3):
+        writer.enqueue({'_id': i})
+
+    collection.fail_with = AutoReconnect('connection refused')
+    assert writer.flush() == 0
+    stats = writer.stats()
+    assert stats['queue_depth'] == 3
+    assert stats['failed_flushes'] == 1
+    assert 'connection refused' in stats['last_error']
+
+    collection.fail_with = None
+    assert writer.flush() == 3
+    assert [doc['_id'] for doc in collection.find().sort('_id')] == [0, 1, 2]
+
+
+def test_prepare_is_applied_on_enqueue(collection):
+    writer = BufferedEventWriter(collection, prepare=lambda doc: dict(doc, stored=True))
+    writer.enqueue({'_id': 1})
+    writer.flush()
+    assert collection.find_one({'_id': 1}) == {'_id': 1, 'stored': True}
+
+
+def test_batches_are_spooled_in_order_while_the_database_is_down(collection, tmp_path):
+    spool = Spool(str(tmp_path / 'spool'), {'proctoring_events': collection})
+    try:
+        writer = BufferedEventWriter(collection, batch_size=10, spool=spool)
+        collection.fail_with = AutoReconnect('connection refused')
+        writer.enqueue({'_id': 1})
+        writer.enqueue_replace({'_id': 'range-1', 'end': 1})
+        assert writer.flush() == 2
+        assert spool.pending()
+
+        # The database is back, but earlier writes are not replayed yet: queue behind them
+        collection.fail_with = None
+        writer.enqueue_replace({'_id': 'range-1', 'end': 2})
+        writer.flush()
+        assert collection.count_documents({}) == 0
+        assert writer.stats()['spooled_total'] == 3
+
+        assert spool.drain() == 3
+        assert collection.find_one({'_id': 1}) == {'_id': 1}
+        assert collection.find_one({'_id': 'range-1'}) == {'_id': 'range-1', 'end': 2}
+    finally:
+        spool.close()
@@ -0,0 +1,59 @@
+import csv
+import datetime
+import io
+import json
+
+from bson import ObjectId
+
+from export_stream import ALERT_COLUMNS, iter_csv, iter_ndjson
+
+WHEN = datetime.datetime(2024, 5, 1, 9, 30)
+
+
+def _docs(count):
+    for i in range(count):
+        yield {'_id': ObjectId(), 'timestamp': WHEN, 'session_id': 's1', 'alert_type': 'looking_away',
+               'details': {'yaw': i, 'flags': ['a']}, 'is_acknowledged': False}
+
+
+def test_ndjson_lines_are_json_with_dates_and_ids_as_strings():
+    [chunk] = list(iter_ndjson(_docs(2)))
+    lines = [json.loads(line) for line in chunk.splitlines()]
+    assert len(lines) == 2
+    assert lines[0]['timestamp'] == '2024-05-01T09:30:00'
+    assert isinstance(lines[0]['_id'], str)
+
+
+def test_ndjson_is_chunked_without_splitting_lines():
+    chunks = list(iter_ndjson(_docs(50), chunk_size=500))
+    assert len(chunks) > 1
+    assert all(chunk.endswith('\n') for chunk in chunks)
+    assert len(''.join(chunks).splitlines()) == 50
+
+
+def test_docs_are_consumed_lazily():
+    pulled = []
+
+    def docs():
+        for doc in _docs(100):
+            pulled.append(doc)
+            yield doc
+
+    next(iter_ndjson(docs(), chunk_size=500))
+    assert len(pulled) < 100
+
+
+def test_csv_has_a_header_and_encodes_nested_values():
+    chunks = list(iter_csv(_docs(30), ALERT_COLUMNS, chunk_size=500))
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+    assert len(rows) == 30
+    assert rows[3]['timestamp'] == '2024-05-01T09:30:00'
+    assert json.loads(rows[3]['details']) == {'flags': ['a'], 'yaw': 3}
+    assert rows[3]['severity'] == ''  # Missing fields are empty
+    assert rows[3]['is_acknowledged'] == 'False'
+
+
+def test_empty_export_still_has_the_csv_header():
+    assert list(iter_csv([], ['_id', 'timestamp'])) == ['_id,timestamp\r\n']
+    assert list(iter_ndjson([])) == []
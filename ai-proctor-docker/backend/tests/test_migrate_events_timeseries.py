@@ -0,0 +1,65 @@
+import datetime
+
+import pytest
+from bson import ObjectId
+
+from mongo_fakes import FakeCollection
+
+pytest.importorskip('dotenv')  # The script reads its defaults from config.py
+import migrate_events_timeseries as migrate  # noqa: E402
+
+NOW = datetime.datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _event(seconds_ago, session_id='s1', **extra):
+    return {'_id': ObjectId(), 'timestamp': NOW - datetime.timedelta(seconds=seconds_ago),
+            'session_id': session_id, 'username': 'alice', 'event_type': 'face_analyzed', **extra}
+
+
+@pytest.fixture
+def source():
+    return FakeCollection('proctoring_events')
+
+
+@pytest.fixture
+def target():
+    return FakeCollection('proctoring_events_ts')
+
+
+def test_events_are_copied_in_the_timeseries_layout(source, target):
+    events = [_event(60 * i) for i in range(5)]
+    source.insert_many(events)
+    assert migrate.copy_events(source, target, batch_size=2) == (5, 0, 0)
+    assert target.bulk_writes == [2, 2, 1]
+    copied = target.find_one({'_id': events[0]['_id']})
+    assert copied['meta'] == {'session_id': 's1', 'username': 'alice'}
+    assert 'session_id' not in copied
+
+
+def test_a_second_pass_only_copies_what_is_missing(source, target):
+    source.insert_many([_event(60), _event(120)])
+    migrate.copy_events(source, target, batch_size=10)
+    late = _event(90)
+    late['_id'] = ObjectId.from_datetime(NOW - datetime.timedelta(days=1))  # Lower _id than those copied
+    source.insert_one(late)
+
+    assert migrate.copy_events(source, target, batch_size=10) == (1, 0, 0)
+    assert target.count_documents({}) == 3
+
+
+def test_unsettled_events_and_growing_ranges_are_deferred(source, target):
+    source.insert_many([
+        _event(3600),
+        _event(10),
+        _event(3600, coalesced=True, end_timestamp=NOW - datetime.timedelta(seconds=10)),
+        {'_id': ObjectId(), 'timestamp': '2024-05-01T09:00:00', 'session_id': 's1'},
+    ])
+    settled_before = NOW - datetime.timedelta(seconds=600)
+    assert migrate.copy_events(source, target, 10, settled_before) == (1, 1, 2)
+    assert migrate.copy_events(source, target, 10) == (2, 1, 0)  # --swap: everything left
+
+
+def test_last_write_includes_range_ends(source):
+    assert migrate.last_write(source) is None
+    source.insert_many([_event(60), _event(3600, coalesced=True, end_timestamp=NOW)])
+    assert migrate.last_write(source) == NOW
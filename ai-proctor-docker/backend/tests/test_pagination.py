@@ -0,0 +1,204 @@
+import datetime
+import random
+
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+import pagination
+from pagination import SORT_TYPE_ORDER, InvalidCursor
+
+MISSING = object()
+
+# mongomock cannot evaluate {'$type': [...]}, so the filters are checked
+# against a small model of MongoDB's cross-type comparison and sort order.
+
+def _sort_key(doc, field):
+    value = doc.get(field)
+    type_name = pagination._sort_type(value)  # A missing field sorts as null
+    return (SORT_TYPE_ORDER.index(type_name), value if value is not None else 0)
+
+
+def _compare(value, op, bound):
+    # $gt/$lt only match values of the bound's BSON type
+    if pagination._sort_type(value) != pagination._sort_type(bound):
+        return False
+    return value > bound if op == '$gt' else value < bound
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(_matches(doc, branch) for branch in condition):
+                return False
+            continue
+        if key == '$and':
+            if not all(_matches(doc, branch) for branch in condition):
+                return False
+            continue
+        present, value = key in doc, doc.get(key)
+        if isinstance(condition, dict):
+            for op, bound in condition.items():
+                if op == '$type':
+                    if not present or pagination._sort_type(value) not in bound:  # $type 'null' skips missing
+                        return False
+                elif not present or not _compare(value, op, bound):
+                    return False
+        elif condition is None:
+            if value is not None:  # Equality on None matches null and missing
+                return False
+        elif not present or pagination._sort_type(value) != pagination._sort_type(condition) or value != condition:
+            return False
+    return True
+
+
+def _find(docs, query, sort_by, direction, limit):
+    ordered = sorted(docs, key=lambda doc: (_sort_key(doc, sort_by), doc['_id']), reverse=direction == DESCENDING)
+    return [doc for doc in ordered if _matches(doc, query)][:limit]
+
+
+def _page(docs, sort_by, direction, per_page, cursor=None):
+    """The cursor branch of /api/admin/alerts, against the model above."""
+    fingerprint = pagination.query_fingerprint({}, sort_by, direction)
+    if cursor is None:
+        rows = _find(docs, {}, sort_by, direction, per_page + 1)
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_next, has_prev = has_more, False
+    else:
+        value, last_id, backwards = pagination.decode_cursor(cursor, fingerprint)
+        scan_direction = -direction if backwards else direction
+        query = pagination.keyset_filter(sort_by, scan_direction, value, last_id)
+        rows = _find(docs, query, sort_by, scan_direction, per_page + 1)
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+        has_next = has_more if not backwards else True
+        has_prev = has_more if backwards else True
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = pagination.encode_cursor(rows[-1], sort_by, direction, fingerprint)
+        if has_prev:
+            prev_cursor = pagination.encode_cursor(rows[0], sort_by, direction, fingerprint, backwards=True)
+    return rows, next_cursor, prev_cursor
+
+
+def _alerts():
+    rng = random.Random(7)
+    severities = [MISSING, None, 'high', 'low', 'medium', 3]
+    timestamps = ['2024-01-0%d' % day for day in range(1, 4)] + [
+        datetime.datetime(2024, 1, day) for day in range(1, 4)]
+    docs = []
+    for i in range(60):
+        doc = {'_id': ObjectId(b'%012d' % i)}
+        severity = rng.choice(severities)
+        if severity is not MISSING:
+            doc['severity'] = severity
+        if rng.random() > 0.1:
+            doc['timestamp'] = rng.choice(timestamps)
+        docs.append(doc)
+    return docs
+
+
+@pytest.mark.parametrize('sort_by', ['severity', 'timestamp'])
+@pytest.mark.parametrize('direction', [ASCENDING, DESCENDING])
+def test_paging_visits_every_row_once_across_types(sort_by, direction):
+    docs = _alerts()
+    expected = [doc['_id'] for doc in _find(docs, {}, sort_by, direction, len(docs))]
+
+    seen, cursor = [], None
+    while True:
+        rows, next_cursor, prev_cursor = _page(docs, sort_by, direction, 7, cursor)
+        seen.extend(doc['_id'] for doc in rows)
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert seen == expected
+
+    # Back from the last page with the "prev" cursors
+    back = [doc['_id'] for doc in rows]
+    while prev_cursor is not None:
+        rows, _, prev_cursor = _page(docs, sort_by, direction, 7, prev_cursor)
+        back[:0] = [doc['_id'] for doc in rows]
+    assert back == expected
+
+
+def test_descending_from_a_string_includes_null_and_missing_and_earlier_types():
+    last_id = ObjectId()
+    assert pagination.keyset_filter('severity', DESCENDING, 'low', last_id) == {'$or': [
+        {'severity': {'$lt': 'low'}},
+        {'severity': 'low', '_id': {'$lt': last_id}},
+        {'severity': None},
+        {'severity': {'$type': ['number']}},
+    ]}
+
+
+def test_descending_from_null_only_breaks_ties():
+    last_id = ObjectId()
+    assert pagination.keyset_filter('severity', DESCENDING, None, last_id) == {'$or': [
+        {'severity': None, '_id': {'$lt': last_id}},
+    ]}
+
+
+def test_ascending_from_null_moves_on_to_every_other_type():
+    last_id = ObjectId()
+    assert pagination.keyset_filter('severity', ASCENDING, None, last_id) == {'$or': [
+        {'severity': None, '_id': {'$gt': last_id}},
+        {'severity': {'$type': SORT_TYPE_ORDER[1:]}},
+    ]}
+
+
+def test_ascending_from_the_last_type_has_no_type_branch():
+    last_id = ObjectId()
+    value = datetime.datetime(2024, 1, 1)
+    assert pagination.keyset_filter('timestamp', ASCENDING, value, last_id) == {'$or': [
+        {'timestamp': {'$gt': value}},
+        {'timestamp': value, '_id': {'$gt': last_id}},
+    ]}
+
+
+def test_sorting_on_id_uses_a_plain_range():
+    last_id = ObjectId()
+    assert pagination.keyset_filter('_id', DESCENDING, last_id, last_id) == {'_id': {'$lt': last_id}}
+
+
+def test_unsupported_cursor_value_is_rejected():
+    with pytest.raises(InvalidCursor):
+        pagination.keyset_filter('severity', ASCENDING, ['high'], ObjectId())
+
+
+def test_cursor_round_trip_keeps_value_id_and_direction():
+    doc = {'_id': ObjectId(), 'timestamp': datetime.datetime(2024, 1, 2, 3, 4, 5)}
+    fingerprint = pagination.query_fingerprint({'acknowledged': False}, 'timestamp', DESCENDING)
+
+    forward = pagination.encode_cursor(doc, 'timestamp', DESCENDING, fingerprint)
+    assert pagination.decode_cursor(forward, fingerprint) == (doc['timestamp'], doc['_id'], False)
+
+    backward = pagination.encode_cursor(doc, 'timestamp', DESCENDING, fingerprint, backwards=True)
+    assert pagination.decode_cursor(backward, fingerprint) == (doc['timestamp'], doc['_id'], True)
+
+
+def test_cursor_of_a_missing_field_decodes_to_none():
+    doc = {'_id': ObjectId()}
+    fingerprint = pagination.query_fingerprint({}, 'severity', ASCENDING)
+    cursor = pagination.encode_cursor(doc, 'severity', ASCENDING, fingerprint)
+    assert pagination.decode_cursor(cursor, fingerprint) == (None, doc['_id'], False)
+
+
+def test_cursor_of_another_query_is_rejected():
+    doc = {'_id': ObjectId(), 'severity': 'high'}
+    issued_for = pagination.query_fingerprint({}, 'severity', ASCENDING)
+    cursor = pagination.encode_cursor(doc, 'severity', ASCENDING, issued_for)
+
+    for query, sort_by, direction in [({'acknowledged': True}, 'severity', ASCENDING),
+                                      ({}, 'timestamp', ASCENDING),
+                                      ({}, 'severity', DESCENDING)]:
+        with pytest.raises(InvalidCursor):
+            pagination.decode_cursor(cursor, pagination.query_fingerprint(query, sort_by, direction))
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        pagination.decode_cursor('not-a-cursor', pagination.query_fingerprint({}, 'timestamp', ASCENDING))
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+
+import pytest
+
+from segment_store import SegmentStore, session_id_from_filename
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SegmentStore(str(tmp_path / 'segments'))
+
+
+@pytest.mark.parametrize('filename, session_id', [
+    ('alert_session_123_abc_0f1e2d.jpg', 'session_123_abc'),
+    ('debug_s1_20240501T090000.jpg', 's1'),
+    ('alert_nosuffix.jpg', None),
+    ('other_s1_x.jpg', None),
+])
+def test_session_id_from_filename(filename, session_id):
+    assert session_id_from_filename(filename) == session_id
+
+
+def test_items_are_read_back_by_name(store):
+    assert store.append_many('s1', [('a.jpg', b'first'), ('b.jpg', b'second!')]) == ['a.jpg', 'b.jpg']
+    assert store.read('s1', 'b.jpg') == b'second!'
+    assert store.lookup('s1', 'a.jpg') == (0, 5)
+    assert store.read('s1', 'missing.jpg') is None
+    assert store.read('other', 'a.jpg') is None
+
+
+def test_names_already_packed_or_unsafe_are_skipped(store):
+    store.append_many('s1', [('a.jpg', b'first')])
+    assert store.append_many('s1', [('a.jpg', b'again'), ('tab\tname', b'x'), ('c.jpg', b'third')]) == ['c.jpg']
+    assert store.read('s1', 'a.jpg') == b'first'
+    assert store.read('s1', 'c.jpg') == b'third'
+
+
+def test_unsafe_session_ids_are_hashed(store):
+    store.append_many('../escape', [('a.jpg', b'data')])
+    assert os.listdir(store.segment_dir) and all(
+        '..' not in name and '/' not in name for name in os.listdir(store.segment_dir))
+    assert store.read('../escape', 'a.jpg') == b'data'
+
+
+def test_torn_index_line_is_ignored(store):
+    store.append_many('s1', [('a.jpg', b'first')])
+    with open(os.path.join(store.segment_dir, 's1.idx'), 'a') as idx_file:
+        idx_file.write('b.jpg\t5')  # Crash mid-append
+    assert SegmentStore(store.segment_dir).lookup('s1', 'b.jpg') is None
+    assert SegmentStore(store.segment_dir).read('s1', 'a.jpg') == b'first'
+
+
+def test_compact_directory_moves_only_that_sessions_files(store, tmp_path):
+    loose = tmp_path / 'snapshots'
+    loose.mkdir()
+    (loose / 'alert_s1_one.jpg').write_bytes(b'1')
+    (loose / 'debug_s1_two.jpg').write_bytes(b'2')
+    (loose / 'alert_s2_three.jpg').write_bytes(b'3')
+
+    assert store.compact_directory('s1', str(loose)) == 2
+    assert sorted(os.listdir(loose)) == ['alert_s2_three.jpg']
+    assert store.read('s1', 'debug_s1_two.jpg') == b'2'
+    assert store.compact_directory('s1', str(loose)) == 0  # Safe to re-run
+
+
+def _append_from_process(segment_dir, worker):
+    store = SegmentStore(segment_dir)
+    for i in range(50):
+        store.append_many('s1', [(f'{worker}-{i}', bytes([worker]) * (i + 1))])
+
+
+def test_appends_from_several_processes_do_not_interleave(store):
+    processes = [multiprocessing.Process(target=_append_from_process, args=(store.segment_dir, worker))
+                 for worker in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    for worker in range(3):
+        for i in range(50):
+            assert store.read('s1', f'{worker}-{i}') == bytes([worker]) * (i + 1)
@@ -0,0 +1,80 @@
+import admin_rooms
+from session_broadcast import SessionDeltaBroadcaster
+from session_state import InMemorySessionState
+
+
+class Emitted(list):
+    def __call__(self, payload, rooms):
+        self.append((payload, rooms))
+
+
+def _broadcaster(store, emitted, **kwargs):
+    return SessionDeltaBroadcaster(store, emitted, admin_rooms.delta_rooms, **kwargs)
+
+
+def test_each_session_is_sent_once_per_tick_with_its_latest_values():
+    store = InMemorySessionState()
+    store.create('s1', {"latest_status": "ok", "unread_alert_count": 0, "student_username": "alice"})
+    emitted = Emitted()
+    broadcaster = _broadcaster(store, emitted)
+
+    store.update('s1', {"latest_status": "looking_away"})
+    broadcaster.mark('s1', ["latest_status"])
+    store.update('s1', {"latest_status": "ok"})
+    broadcaster.mark('s1', ["latest_status"])
+    broadcaster.flush()
+
+    assert emitted == [({"sessions": {"s1": {"latest_status": "ok"}}}, [admin_rooms.ALL_ROOM])]
+    broadcaster.flush()
+    assert len(emitted) == 1  # Nothing changed since
+
+
+def test_sessions_are_grouped_by_rooms():
+    store = InMemorySessionState()
+    store.create('s1', {"exam_id": "e1", "latest_status": "ok"})
+    store.create('s2', {"exam_id": "e1", "latest_status": "ok"})
+    store.create('s3', {"latest_status": "ok"})
+    emitted = Emitted()
+    broadcaster = _broadcaster(store, emitted)
+    for session_id in ('s1', 's2', 's3'):
+        broadcaster.mark(session_id, ["latest_status"])
+    broadcaster.flush()
+
+    by_rooms = {tuple(rooms): sorted(payload["sessions"]) for payload, rooms in emitted}
+    assert by_rooms == {(admin_rooms.ALL_ROOM, 'exam:e1'): ['s1', 's2'], (admin_rooms.ALL_ROOM,): ['s3']}
+    assert broadcaster.stats()["messages_total"] == 2
+
+
+def test_fields_are_renamed_for_the_dashboard():
+    store = InMemorySessionState()
+    store.create('s1', {"last_heartbeat_time": "t"})
+    emitted = Emitted()
+    broadcaster = _broadcaster(store, emitted, rename={"last_heartbeat_time": "lastHeartbeat"})
+    broadcaster.mark('s1', ["last_heartbeat_time"])
+    broadcaster.flush()
+    assert emitted[0][0] == {"sessions": {"s1": {"lastHeartbeat": "t"}}}
+
+
+def test_ended_and_discarded_sessions_are_not_sent():
+    store = InMemorySessionState()
+    store.create('s1', {"latest_status": "ok"})
+    emitted = Emitted()
+    broadcaster = _broadcaster(store, emitted)
+    broadcaster.mark('s1', ["latest_status"])
+    broadcaster.mark('gone', ["latest_status"])
+    broadcaster.discard('s1')
+    broadcaster.mark('s2', [])
+    broadcaster.flush()
+    assert emitted == []
+    assert broadcaster.stats()["updates_total"] == 2
+
+
+def test_close_sends_what_is_pending():
+    store = InMemorySessionState()
+    store.create('s1', {"latest_status": "ok"})
+    emitted = Emitted()
+    broadcaster = _broadcaster(store, emitted, interval=60.0)
+    broadcaster.start()
+    broadcaster.mark('s1', ["latest_status"])
+    broadcaster.close()
+    assert len(emitted) == 1
@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+
+from session_reaper import SessionReaper
+from session_state import InMemorySessionState, SqliteSessionState
+
+
+def _ago(seconds):
+    return (datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds)).isoformat()
+
+
+def _entry(heartbeat_seconds_ago):
+    return {"student_username": "alice", "monitoring_start_time": _ago(600),
+            "last_heartbeat_time": _ago(heartbeat_seconds_ago)}
+
+
+class HeartbeatBeforePop:
+    """A store where another worker records a heartbeat just before each pop_if."""
+
+    def __init__(self, store):
+        self.store = store
+        self.heartbeats = 0
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def pop_if(self, session_id, predicate):
+        self.heartbeats += 1
+        self.store.update(session_id, {"last_heartbeat_time": _ago(0)})
+        return self.store.pop_if(session_id, predicate)
+
+
+@pytest.fixture
+def expired():
+    return []
+
+
+def _reaper(store, expired, ttl=60):
+    return SessionReaper(store, ttl=ttl, on_expire=lambda session_id, entry: expired.append(session_id))
+
+
+def test_session_without_heartbeat_is_expired(expired):
+    store = InMemorySessionState()
+    store.create("s1", _entry(120))
+    reaper = _reaper(store, expired)
+    reaper.schedule("s1", datetime.datetime.utcnow() - datetime.timedelta(seconds=120))
+
+    reaper._check_due()
+    assert expired == ["s1"]
+    assert store.get("s1") is None
+    assert reaper.stats()["expired_total"] == 1
+
+
+def test_heartbeat_recorded_since_scheduling_postpones_the_check(expired):
+    store = InMemorySessionState()
+    store.create("s1", _entry(0))
+    reaper = _reaper(store, expired)
+    reaper.schedule("s1", datetime.datetime.utcnow() - datetime.timedelta(seconds=120))
+
+    reaper._check_due()
+    assert expired == []
+    assert reaper.stats()["scheduled"] == 1
+    assert reaper.stats()["next_check_in_seconds"] > 50
+
+
+def test_heartbeat_between_the_due_check_and_pop_if_keeps_the_session(expired):
+    store = HeartbeatBeforePop(InMemorySessionState())
+    store.create("s1", _entry(120))
+    reaper = _reaper(store, expired)
+    reaper.schedule("s1", datetime.datetime.utcnow() - datetime.timedelta(seconds=120))
+
+    reaper._check_due()
+    assert store.heartbeats == 1  # The pop was attempted after the session looked expired
+    assert expired == []
+    assert store.get("s1") is not None
+    assert reaper.stats()["scheduled"] == 1  # Checked again one TTL after the new heartbeat
+
+
+def test_sessions_created_by_another_worker_are_loaded_and_expired(tmp_path, expired):
+    path = str(tmp_path / "sessions.db")
+    other_worker = SqliteSessionState(path)
+    other_worker.create("abandoned", _entry(120))
+    other_worker.create("live", _entry(5))
+
+    reaper = _reaper(SqliteSessionState(path), expired)
+    reaper._load_existing()
+    assert reaper.stats()["scheduled"] == 2
+
+    reaper._check_due()
+    assert expired == ["abandoned"]
+    assert other_worker.get("abandoned") is None
+    assert other_worker.get("live") is not None
+
+
+def test_only_one_worker_reports_an_expiry(tmp_path, expired):
+    path = str(tmp_path / "sessions.db")
+    SqliteSessionState(path).create("s1", _entry(120))
+    reapers = [_reaper(SqliteSessionState(path), expired) for _ in range(2)]
+    for reaper in reapers:
+        reaper._load_existing()
+    for reaper in reapers:
+        reaper._check_due()
+    assert expired == ["s1"]
+
+
+def test_session_ended_elsewhere_is_dropped(expired):
+    store = InMemorySessionState()
+    reaper = _reaper(store, expired)
+    reaper.schedule("gone", datetime.datetime.utcnow() - datetime.timedelta(seconds=120))
+    reaper._check_due()
+    assert expired == []
+    assert reaper.stats()["scheduled"] == 0
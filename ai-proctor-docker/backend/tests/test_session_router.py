@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import session_router
+from session_router import OWNER_FIELD, SessionRouter
+from session_state import SqliteSessionState
+
+
+def _echo_app(worker):
+    """WSGI app answering with the worker's name and what it received."""
+    def app(environ, start_response):
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length)
+        payload = {
+            "worker": worker,
+            "internal": session_router.is_internal(environ),
+            "path": environ['PATH_INFO'],
+            "query": environ.get('QUERY_STRING', ''),
+            "session_header": environ.get('HTTP_X_SESSION_ID'),
+            "body": body.decode('utf-8'),
+        }
+        start_response('201 Created', [('Content-Type', 'application/json'), ('X-Worker', worker)])
+        return [json.dumps(payload).encode('utf-8')]
+    return app
+
+
+@pytest.fixture
+def directory():
+    # AF_UNIX paths are limited to ~108 bytes, too short for pytest's tmp_path
+    path = tempfile.mkdtemp(prefix="router-", dir="/tmp")
+    yield os.path.join(path, "workers")
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def store(directory):
+    store = SqliteSessionState(os.path.join(os.path.dirname(directory), "sessions.db"))
+    yield store
+
+
+@pytest.fixture
+def routers(directory, store):
+    started = []
+
+    def make(name):
+        router = SessionRouter(_echo_app(name), store, directory=directory, timeout=5.0, name=f"{name}.sock")
+        router.start()
+        started.append(router)
+        return router
+
+    yield make
+    for router in started:
+        router.close()
+
+
+def test_request_is_forwarded_to_the_owner(routers, store):
+    owner, other = routers("a"), routers("b")
+    store.create("s1", {"student_username": "alice", OWNER_FIELD: owner.address})
+
+    status, headers, body = other.forward(
+        "s1", "POST", "/api/analyze-audio?x=1",
+        [("X-Session-Id", "s1"), ("Content-Length", "999"), ("Connection", "keep-alive")], b"chunk")
+
+    assert status == 201
+    assert ("X-Worker", "a") in headers
+    received = json.loads(body)
+    assert received == {"worker": "a", "internal": True, "path": "/api/analyze-audio", "query": "x=1",
+                        "session_header": "s1", "body": "chunk"}
+    assert other.stats()["forwarded_total"] == 1
+
+
+def test_owner_and_unknown_sessions_are_handled_locally(routers, store):
+    owner = routers("a")
+    store.create("s1", {OWNER_FIELD: owner.address})
+    assert owner.forward("s1", "POST", "/", [], b"") is None
+    assert owner.forward("missing", "POST", "/", [], b"") is None
+
+
+def test_session_of_an_exited_worker_is_taken_over_once(routers, store, directory):
+    first, second = routers("a"), routers("b")
+    gone = os.path.join(directory, "exited.sock")
+    store.create("s1", {OWNER_FIELD: gone})
+
+    assert first.forward("s1", "POST", "/", [], b"") is None
+    assert store.get("s1")[OWNER_FIELD] == first.address
+    assert first.stats()["takeovers_total"] == 1
+
+    # The other worker now forwards to the one that took it over
+    status, _, body = second.forward("s1", "POST", "/", [], b"")
+    assert status == 201 and json.loads(body)["worker"] == "a"
+    assert second.stats()["takeovers_total"] == 0
+
+
+def test_takeover_is_a_compare_and_set(store, directory):
+    router = SessionRouter(_echo_app("a"), store, directory=directory, name="a.sock")
+    store.create("s1", {OWNER_FIELD: "/elsewhere/b.sock"})
+    assert not router._take_over("s1", "/elsewhere/c.sock")
+    assert store.get("s1")[OWNER_FIELD] == "/elsewhere/b.sock"
+
+
+def test_session_without_owner_is_claimed(routers, store):
+    router = routers("a")
+    store.create("s1", {"student_username": "alice"})
+    assert router.forward("s1", "POST", "/", [], b"") is None
+    assert store.get("s1")[OWNER_FIELD] == router.address
+
+
+def test_delegate_posts_json_to_the_owner(directory, store):
+    calls = []
+
+    def app(environ, start_response):
+        length = int(environ['CONTENT_LENGTH'])
+        calls.append((environ['PATH_INFO'], json.loads(environ['wsgi.input'].read(length)),
+                      session_router.is_internal(environ)))
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [b'{}']
+
+    owner = SessionRouter(app, store, directory=directory, timeout=5.0, name="a.sock")
+    owner.start()
+    try:
+        other = SessionRouter(app, store, directory=directory, timeout=5.0, name="b.sock")
+        entry = {"student_username": "alice", OWNER_FIELD: owner.address}
+        assert other.delegate("s1", entry, "/internal/sessions/s1/finalize", {"reason": "stopped"})
+        assert calls == [("/internal/sessions/s1/finalize", {"reason": "stopped"}, True)]
+
+        assert not owner.delegate("s1", entry, "/internal/sessions/s1/finalize", {})  # Its own session
+        assert not other.delegate("s1", {"student_username": "alice"}, "/x", {})
+    finally:
+        owner.close()
+    assert not other.delegate("s1", entry, "/internal/sessions/s1/finalize", {})  # Owner gone
+
+
+def test_socket_directory_is_private(routers, directory):
+    routers("a")
+    assert (os.stat(directory).st_mode & 0o777) == 0o700
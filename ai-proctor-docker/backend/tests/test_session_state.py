@@ -0,0 +1,34 @@
+import pytest
+
+from session_state import InMemorySessionState, SqliteSessionState
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionState()
+    return SqliteSessionState(str(tmp_path / "sessions.db"))
+
+
+def test_update_if_merges_only_when_the_predicate_holds(store):
+    store.create("s1", {"owner": "a", "status": "ok"})
+
+    assert store.update_if("s1", {"owner": "b"}, lambda entry: entry["owner"] == "c") is None
+    assert store.get("s1")["owner"] == "a"
+
+    merged = store.update_if("s1", {"owner": "b"}, lambda entry: entry["owner"] == "a")
+    assert merged == {"owner": "b", "status": "ok"}
+    assert store.get("s1") == merged
+    assert store.update_if("missing", {"owner": "b"}, lambda entry: True) is None
+
+
+def test_update_if_sees_other_workers_writes(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = SqliteSessionState(path), SqliteSessionState(path)
+    first.create("s1", {"owner": "a"})
+    assert first.get("s1")["owner"] == "a"  # Cached in the first connection
+
+    assert second.update_if("s1", {"owner": "b"}, lambda entry: entry["owner"] == "a") is not None
+    # The first worker's stale cache does not let its compare-and-set succeed too
+    assert first.update_if("s1", {"owner": "c"}, lambda entry: entry["owner"] == "a") is None
+    assert first.get("s1")["owner"] == "b"
@@ -0,0 +1,71 @@
+import datetime
+
+import pytest
+
+import event_store
+from mongo_fakes import FakeCollection
+from session_summary import build_session_summary, summarize_face_events
+
+START = datetime.datetime(2024, 5, 1, 9, 0, 0)
+
+
+def _at(seconds):
+    return START + datetime.timedelta(seconds=seconds)
+
+
+def _face(seconds, eye_status, away=False, **extra):
+    return {"timestamp": _at(seconds), "event_type": "face_analyzed",
+            "details": {"eye_status": eye_status, "looking_away": away}, **extra}
+
+
+def test_gaze_time_and_longest_away_streak():
+    events = [_face(0, "forward"), _face(5, "left", True), _face(10, "left", True),
+              _face(15, "forward"), _face(100, "left", True)]
+    gaze_seconds, samples, longest = summarize_face_events(events, sample_interval=5.0, max_gap=30.0)
+
+    assert gaze_seconds == {"forward": 10.0, "left": 15.0}  # The 85 s gap counts one sample only
+    assert samples == 5
+    assert longest == {"seconds": 10.0, "start": _at(5), "end": _at(15)}
+
+
+def test_gap_breaks_an_away_streak():
+    events = [_face(0, "left", True), _face(60, "left", True)]
+    _, _, longest = summarize_face_events(events, sample_interval=5.0, max_gap=30.0)
+    assert longest["seconds"] == 5.0
+
+
+def test_coalesced_ranges_count_their_span_and_samples():
+    events = [_face(0, "forward", end_timestamp=_at(20), sample_count=5), _face(25, "left")]
+    gaze_seconds, samples, longest = summarize_face_events(events, sample_interval=5.0, max_gap=30.0)
+    assert gaze_seconds == {"forward": 25.0, "left": 5.0}
+    assert samples == 6
+    assert longest is None
+
+
+def test_no_events():
+    assert summarize_face_events([], 5.0, 30.0) == ({}, 0, None)
+
+
+@pytest.mark.parametrize('mode', event_store.STORAGE_MODES)
+def test_build_session_summary_reads_only_that_session(mode):
+    events, alerts = FakeCollection('proctoring_events'), FakeCollection('alerts')
+    for session_id in ('s1', 's2'):
+        for doc in (_face(0, "forward"), _face(5, "left", True), {"timestamp": _at(7), "event_type": "speech_detected"}):
+            events.insert_one(event_store.to_storage({**doc, "session_id": session_id, "username": "alice"}, mode))
+    alerts.insert_many([
+        {"_id": "a2", "session_id": "s1", "alert_type": "looking_away", "timestamp": _at(9), "snapshot_filename": "b.jpg"},
+        {"_id": "a1", "session_id": "s1", "alert_type": "looking_away", "timestamp": _at(6), "snapshot_filename": "a.jpg"},
+        {"_id": "a3", "session_id": "s1", "alert_type": "speech_detected", "timestamp": _at(7), "snapshot_filename": None},
+        {"_id": "a4", "session_id": "s2", "alert_type": "looking_away", "timestamp": _at(6), "snapshot_filename": "c.jpg"},
+    ])
+
+    summary = build_session_summary(events, alerts, "s1", {"student_username": "alice"},
+                                    storage_mode=mode, end_reason="stopped")
+    assert summary["_id"] == "s1"
+    assert summary["student_username"] == "alice"
+    assert summary["end_reason"] == "stopped"
+    assert summary["face_samples"] == 2
+    assert summary["gaze_seconds"] == {"forward": 5.0, "left": 5.0}
+    assert summary["alert_counts"] == {"looking_away": 2, "speech_detected": 1}
+    assert summary["total_alerts"] == 3
+    assert [snapshot["snapshot_filename"] for snapshot in summary["snapshots"]] == ["a.jpg", "b.jpg"]
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import socketio_bus
+
+
+def test_private_directory_is_created_with_mode_0700(tmp_path):
+    path = tmp_path / "bus" / "socketio"
+    socketio_bus.ensure_private_directory(str(path))
+    assert (path.stat().st_mode & 0o777) == 0o700
+
+
+def test_directory_open_to_others_is_refused(tmp_path):
+    path = tmp_path / "shared"
+    path.mkdir()
+    os.chmod(path, 0o777)
+    with pytest.raises(PermissionError):
+        socketio_bus.ensure_private_directory(str(path))
+
+
+def test_symlinked_directory_is_refused(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir(mode=0o700)
+    link = tmp_path / "link"
+    link.symlink_to(target)
+    with pytest.raises(PermissionError):
+        socketio_bus.ensure_private_directory(str(link))
+
+
+@pytest.fixture
+def queue_url():
+    # AF_UNIX paths are limited to ~108 bytes, too short for pytest's tmp_path
+    directory = tempfile.mkdtemp(prefix="bus-", dir="/tmp")
+    yield socketio_bus.LOCAL_SCHEME + directory
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_messages_cross_the_bus_as_json(queue_url):
+    url = queue_url
+    sender = socketio_bus.LocalSocketManager(url, write_only=True)
+    receiver = socketio_bus.LocalSocketManager(url, write_only=True)
+    try:
+        sender.bus._peers_listed_at = None
+        sender._publish({"method": "emit", "event": "new_alert", "data": {"session_id": "s1"}})
+        message = next(receiver._listen())
+        assert message["event"] == "new_alert"
+        assert message["data"] == {"session_id": "s1"}
+    finally:
+        sender.bus.close()
+        receiver.bus.close()
+
+
+def test_undecodable_messages_are_skipped(queue_url):
+    url = queue_url
+    sender = socketio_bus.LocalSocketManager(url, write_only=True)
+    receiver = socketio_bus.LocalSocketManager(url, write_only=True)
+    try:
+        sender.bus.publish(b"\x80\x04not json")
+        sender._publish({"method": "emit", "event": "after"})
+        assert next(receiver._listen())["event"] == "after"
+    finally:
+        sender.bus.close()
+        receiver.bus.close()
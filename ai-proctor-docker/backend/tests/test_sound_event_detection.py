@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import sound_event_detection as sed
+
+RATE = 16000
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+
+def _types(events):
+    return [event["event_type"] for event in events]
+
+
+def test_frame_signal_is_a_read_only_view_without_the_partial_frame():
+    samples = np.arange(10, dtype=np.float32)
+    frames = sed.frame_signal(samples, 4)
+    assert frames.tolist() == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert np.shares_memory(frames, samples)
+    assert not frames.flags.writeable
+    assert sed.frame_signal(samples, 4, hop_length=3).shape == (3, 4)
+    assert sed.frame_signal(samples[:3], 4).shape == (0, 4)
+
+
+def test_frames_dbfs_matches_the_rms_level():
+    frames = np.vstack([np.full(480, 0.5, dtype=np.float32), np.zeros(480, dtype=np.float32)])
+    dbfs = sed.frames_dbfs(frames)
+    assert dbfs[0] == pytest.approx(20 * np.log10(0.5), abs=1e-4)
+    assert dbfs[1] == pytest.approx(sed.SILENCE_DBFS, abs=1e-4)  # Silence is floored, not -inf
+
+
+def test_spectral_blocks_give_the_same_features_as_one_pass(rng, monkeypatch):
+    frames = sed.frame_signal(rng.normal(0.0, 0.1, RATE).astype(np.float32), 480)
+    expected = sed.frames_spectral_features(frames, RATE)
+    monkeypatch.setattr(sed, 'SPECTRAL_BLOCK_SAMPLES', 480 * 5)  # Several blocks, the last one partial
+    for got, want in zip(sed.frames_spectral_features(frames, RATE), expected):
+        np.testing.assert_allclose(got, want, rtol=1e-6)
+
+
+@pytest.mark.parametrize('mask, starts, ends', [
+    ([], [], []),
+    ([1, 1, 0, 1], [0, 3], [2, 4]),
+    ([0, 1, 1, 1, 0], [1], [4]),
+])
+def test_find_runs(mask, starts, ends):
+    got_starts, got_ends = sed.find_runs(np.array(mask, dtype=bool))
+    assert got_starts.tolist() == starts
+    assert got_ends.tolist() == ends
+
+
+def test_fill_gaps_only_bridges_short_gaps():
+    mask = np.array([1, 0, 0, 1, 0, 0, 0, 0, 1], dtype=bool)
+    assert sed.fill_gaps(mask, 2).astype(int).tolist() == [1, 1, 1, 1, 0, 0, 0, 0, 1]
+    assert not mask[1]  # The input is left alone
+
+
+def test_speech_threshold_rises_with_the_noise_floor():
+    assert sed.speech_min_dbfs(1) == sed.SPEECH_MIN_DBFS[1]
+    assert sed.speech_min_dbfs(1, noise_floor_dbfs=-45.0) == -45.0 + sed.SPEECH_MIN_DB_ABOVE_FLOOR[1]
+    assert sed.speech_min_dbfs(7) == sed.SPEECH_MIN_DBFS[3]  # Clamped to the strictest mode
+
+
+def test_synthetic_voice_is_reported_as_speech(rng):
+    events = sed.detect_sound_events(sed._synthetic_chunk(RATE, 5.0, rng), RATE)
+    assert _types(events) == [sed.SPEECH]
+    details = events[0]["details"]
+    assert details["start_offset_seconds"] == pytest.approx(0.5, abs=0.1)
+    assert details["detected_speech_duration_seconds"] == pytest.approx(4.0, abs=0.1)
+
+
+def test_short_speech_is_not_reported(rng):
+    events = sed.detect_sound_events(sed._synthetic_chunk(RATE, 5.0, rng), RATE, min_speech_duration=4.5)
+    assert events == []
+
+
+def test_loud_noise_reports_the_longest_segment(rng):
+    samples = rng.normal(0.0, 0.001, RATE * 3).astype(np.float32)
+    samples[RATE // 4:RATE // 2] = rng.normal(0.0, 0.5, RATE // 4)  # 0.25 s
+    samples[RATE:2 * RATE] = rng.normal(0.0, 0.5, RATE)  # 1 s
+    events = sed.detect_sound_events(samples, RATE, min_noise_duration=0.5)
+
+    [event] = [event for event in events if event["event_type"] == sed.LOUD_NOISE]
+    details = event["details"]
+    assert details["start_offset_seconds"] == pytest.approx(1.0, abs=0.03)
+    assert details["noise_duration_seconds"] == pytest.approx(1.0, abs=0.03)
+    assert details["peak_rms_dbfs"] > -20.0
+    assert details["rms_threshold_dbfs_used"] == -20.0
+
+
+def test_time_offset_is_added_to_event_offsets(rng):
+    features = sed.frame_features(sed._synthetic_chunk(RATE, 5.0, rng), RATE)
+    [plain] = sed.events_from_features(features)
+    [shifted] = sed.events_from_features(features, time_offset=10.0)
+    assert shifted["details"]["start_offset_seconds"] == pytest.approx(plain["details"]["start_offset_seconds"] + 10.0)
+
+
+def test_quiet_room_has_no_events(rng):
+    assert sed.detect_sound_events(rng.normal(0.0, 0.003, RATE * 5).astype(np.float32), RATE) == []
@@ -0,0 +1,135 @@
+import os
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import spool as spool_module
+from mongo_fakes import FakeCollection
+from spool import Spool, SpoolFull
+
+
+@pytest.fixture
+def collections():
+    return {'proctoring_events': FakeCollection('proctoring_events'), 'alerts': FakeCollection('alerts')}
+
+
+@pytest.fixture
+def open_spool(tmp_path, collections):
+    opened = []
+
+    def make(**kwargs):
+        spool = Spool(str(tmp_path / 'spool'), collections, **kwargs)
+        opened.append(spool)
+        return spool
+
+    yield make
+    for spool in opened:
+        if not spool._file.closed:
+            spool.close()
+
+
+def test_records_are_replayed_in_order_and_the_file_is_truncated(open_spool, collections):
+    spool = open_spool()
+    spool.append('alerts', {'_id': 'a1', 'severity': 'high'})
+    spool.append_many('proctoring_events', [{'_id': 1}, {'_id': 2}],
+                      [{'_id': 'range-1', 'end': 1}, {'_id': 'range-1', 'end': 2}])
+    assert spool.pending()
+
+    assert spool.drain() == 5
+    assert not spool.pending()
+    assert os.path.getsize(spool.path) == 0
+    assert collections['alerts'].find_one({'_id': 'a1'}) == {'_id': 'a1', 'severity': 'high'}
+    assert collections['proctoring_events'].find_one({'_id': 'range-1'}) == {'_id': 'range-1', 'end': 2}
+    assert collections['proctoring_events'].count_documents({}) == 3
+
+
+def test_replaying_twice_is_harmless(open_spool, collections):
+    spool = open_spool()
+    collections['alerts'].insert_one({'_id': 'a1', 'severity': 'high'})  # Written before the crash
+    spool.append('alerts', {'_id': 'a1', 'severity': 'high'})
+    spool.append('alerts', {'_id': 'c1', 'filter': {'_id': 'c1', 'applied': {'$ne': 'op-1'}},
+                            'update': {'$inc': {'total': 1}, '$push': {'applied': 'op-1'}}},
+                 op=spool_module.UPDATE)
+    collections['alerts'].insert_one({'_id': 'c1', 'total': 1, 'applied': ['op-1']})
+
+    assert spool.drain() == 2
+    assert collections['alerts'].find_one({'_id': 'c1'}) == {'_id': 'c1', 'total': 1, 'applied': ['op-1']}
+    assert spool.stats()['last_error'] is None
+
+
+def test_drain_stops_at_an_outage_and_resumes_where_it_left_off(open_spool, collections):
+    spool = open_spool(drain_batch=1)
+    for i in range(3):
+        spool.append('proctoring_events', {'_id': i})
+
+    collections['proctoring_events'].fail_with = AutoReconnect('connection refused')
+    assert spool.drain() == 0
+    assert spool.pending()
+    assert 'connection refused' in spool.stats()['last_error']
+
+    collections['proctoring_events'].fail_with = None
+    assert spool.drain() == 3
+    assert collections['proctoring_events'].count_documents({}) == 3
+
+
+def test_unreplayed_records_survive_a_restart(open_spool, collections):
+    events = collections['proctoring_events']
+    spool = open_spool(drain_batch=1)
+    for i in range(3):
+        spool.append('proctoring_events', {'_id': i})
+
+    write = events.bulk_write
+
+    def fail_after_first_batch(requests, ordered=True):
+        if events.bulk_writes:
+            raise AutoReconnect('connection refused')
+        return write(requests, ordered=ordered)
+
+    events.bulk_write = fail_after_first_batch
+    assert spool.drain() == 1
+    spool.close()
+    del events.bulk_write
+
+    reopened = open_spool()
+    assert reopened.slot == spool.slot
+    assert reopened.drain() == 2  # From the saved offset
+    assert sorted(doc['_id'] for doc in events.find()) == [0, 1, 2]
+
+
+def test_half_written_record_is_dropped_on_open(open_spool):
+    spool = open_spool()
+    spool.append('proctoring_events', {'_id': 1})
+    size = os.path.getsize(spool.path)
+    spool.close()
+    with open(spool.path, 'ab') as f:
+        f.write(spool_module.HEADER.pack(100, 0, 0.0) + b'{"c":')  # Crash mid-append
+
+    reopened = open_spool()
+    assert os.path.getsize(reopened.path) == size
+    assert reopened.drain() == 1
+
+
+def test_record_with_a_bad_checksum_is_skipped(open_spool, collections):
+    spool = open_spool()
+    spool.append('proctoring_events', {'_id': 1})
+    spool.append('proctoring_events', {'_id': 2})
+    with open(spool.path, 'r+b') as f:
+        f.seek(spool_module.HEADER.size + 2)
+        f.write(b'X')
+
+    assert spool.drain() == 1
+    assert [doc['_id'] for doc in collections['proctoring_events'].find()] == [2]
+    assert spool.stats()['corrupt_total'] == 1
+
+
+def test_append_past_the_size_limit_is_refused(open_spool):
+    spool = open_spool(max_bytes=200)
+    spool.append('proctoring_events', {'_id': 1})
+    with pytest.raises(SpoolFull):
+        spool.append('proctoring_events', {'_id': 2, 'padding': 'x' * 200})
+
+
+def test_each_process_locks_its_own_slot(open_spool):
+    first, second = open_spool(), open_spool()
+    assert first.slot != second.slot
+    assert first.path != second.path
@@ -0,0 +1,24 @@
+import startup_report
+
+
+def test_app_imports_lists_top_level_modules_once(tmp_path):
+    app = tmp_path / 'app.py'
+    app.write_text(
+        "import os, json\n"
+        "from flask import Flask\n"
+        "from flask import request\n"
+        "from . import local\n"
+        "import numpy as np\n"
+        "def handler():\n"
+        "    import librosa\n"
+    )
+    assert startup_report.app_imports(str(app)) == ['os', 'json', 'flask', 'numpy']
+
+
+def test_measure_reports_time_memory_and_import_errors(tmp_path):
+    cost = startup_report.measure('json', str(tmp_path))
+    assert cost['error'] is None
+    assert cost['seconds'] >= 0.0
+
+    missing = startup_report.measure('no_such_module_for_the_report', str(tmp_path))
+    assert missing['error'].startswith('ModuleNotFoundError')
@@ -0,0 +1,79 @@
+import time
+
+from session_state import InMemorySessionState, SqliteSessionState
+from student_presence import StudentPresence
+
+OLD = "2024-05-01T09:00:00"
+
+
+class CountingStore:
+    def __init__(self, store):
+        self.store = store
+        self.writes = []
+
+    def update_many(self, updates):
+        self.writes.append(sorted(updates))
+        return self.store.update_many(updates)
+
+
+def test_session_is_reported_on_its_first_and_last_socket():
+    presence = StudentPresence(InMemorySessionState())
+    assert presence.connect('sid-1', 's1') is True
+    assert presence.connect('sid-2', 's1') is False  # Second tab
+    assert presence.session_of('sid-2') == 's1'
+
+    assert presence.disconnect('sid-1') is None
+    assert presence.disconnect('sid-2') == 's1'
+    assert presence.disconnect('sid-2') is None  # Already gone
+    assert presence.stats()["connected_sessions"] == 0
+    assert presence.stats()["disconnects_total"] == 2
+
+
+def test_flush_writes_every_connected_session_in_one_call():
+    store = InMemorySessionState()
+    for session_id in ('s1', 's2', 's3'):
+        store.create(session_id, {"last_heartbeat_time": OLD})
+    counting = CountingStore(store)
+    presence = StudentPresence(counting)
+    presence.connect('a', 's1')
+    presence.connect('b', 's2')
+    presence.connect('c', 's2')
+
+    presence.flush()
+    assert counting.writes == [['s1', 's2']]
+    assert store.get('s1')["last_heartbeat_time"] > OLD
+    assert store.get('s3')["last_heartbeat_time"] == OLD  # No socket open
+    assert presence.stats()["last_flush_sessions"] == 2
+
+
+def test_nothing_is_written_without_connections():
+    counting = CountingStore(InMemorySessionState())
+    StudentPresence(counting).flush()
+    assert counting.writes == []
+
+
+def test_heartbeats_reach_other_workers(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    SqliteSessionState(path).create('s1', {"last_heartbeat_time": OLD})
+    presence = StudentPresence(SqliteSessionState(path))
+    presence.connect('a', 's1')
+    presence.connect('b', 'ended-elsewhere')
+    presence.flush()
+    assert SqliteSessionState(path).get('s1')["last_heartbeat_time"] > OLD
+    assert SqliteSessionState(path).get('ended-elsewhere') is None  # Not recreated
+
+
+def test_background_flush():
+    store = InMemorySessionState()
+    store.create('s1', {"last_heartbeat_time": OLD})
+    presence = StudentPresence(store, flush_interval=0.01)
+    presence.connect('a', 's1')
+    presence.start()
+    try:
+        for _ in range(500):
+            if presence.stats()["flushes_total"]:
+                break
+            time.sleep(0.01)
+    finally:
+        presence.close()
+    assert store.get('s1')["last_heartbeat_time"] > OLD
@@ -2,6 +2,7 @@ import React, { useState, useRef, useEffect, useCallback } from 'react';
 import { BrowserRouter as Router, Route, Routes, Navigate, Link as RouterLink } from 'react-router-dom';
 import Webcam from 'react-webcam'; // Unused -> // UNCOMMENTED
 import axios from 'axios';
+import io from 'socket.io-client';
 // import { Container, Row, Col, Button, Alert, Tab, Tabs, Table, Form, Nav, Navbar } from 'react-bootstrap'; // Old imports
 
 // MUI Imports
@@ -237,6 +238,9 @@ const StudentMonitorPage = ({
                   {events.length > 0 ? events.map(e => (
                     <Paper key={e._id} elevation={1} sx={{p:1, mb:1, fontSize:'0.8rem'}}>
                       {new Date(e.timestamp).toLocaleString()}: {e.event_type}
+                      {e.coalesced && e.sample_count > 1 && (
+                        <> (x{e.sample_count} until {new Date(e.end_timestamp).toLocaleTimeString()})</>
+                      )}
                       {e.details && typeof e.details === 'object' && (
                         <pre style={{fontSize:'0.7rem', whiteSpace:'pre-wrap', wordBreak:'break-all'}}>
                           {JSON.stringify(e.details, null, 2)}
@@ -373,6 +377,7 @@ function App() {
   const audioStreamRef = useRef(null); // To store MediaStream
   const audioContextRef = useRef(null); // To store AudioContext
   const scriptProcessorNodeRef = useRef(null); // To store ScriptProcessorNode
+  const audioSequenceRef = useRef({ sessionId: null, next: 0 }); // Chunk numbers per session, so the backend can spot gaps
   const audioSourceNodeRef = useRef(null); // To store MediaStreamAudioSourceNode
   const audioBufferRef = useRef([]); // To store Float32Array audio chunks
   const accumulatedAudioLengthRef = useRef(0); // To store total accumulated samples
@@ -516,7 +521,12 @@ function App() {
     try {
       // The backend will generate/confirm the actual session_id
       const response = await axios.post(`${API_BASE_URL}/api/student/monitoring/start`,
-        { session_id: localGeneratedSessionId }, // Send the frontend-generated ID as a suggestion or for tracking
+        {
+          session_id: localGeneratedSessionId, // Send the frontend-generated ID as a suggestion or for tracking
+          // Exam / proctor group from the exam link (?exam_id=...&proctor_group=...), used to route alerts to the right proctors
+          exam_id: new URLSearchParams(window.location.search).get('exam_id') || undefined,
+          proctor_group: new URLSearchParams(window.location.search).get('proctor_group') || undefined,
+        },
         {
           headers: { Authorization: `Bearer ${currentUser.token}` }
         }
@@ -580,6 +590,22 @@ function App() {
     }
   };
 
+  // Liveness: one authenticated Socket.IO connection per monitoring session replaces
+  // HTTP heartbeats; its Engine.IO ping/pong keeps the session alive on the backend
+  useEffect(() => {
+    if (!isMonitoring || !sessionId || !currentUser?.token) return undefined;
+    const presenceSocket = io(`${API_BASE_URL}/ws/student`, {
+      query: { token: `Bearer ${currentUser.token}`, session_id: sessionId },
+      transports: ['websocket'],
+    });
+    presenceSocket.on('connect_error', (err) => {
+      console.warn(`[Presence] Connection error: ${err.message}`);
+    });
+    return () => {
+      presenceSocket.disconnect();
+    };
+  }, [isMonitoring, sessionId, currentUser?.token]);
+
   // eslint-disable-next-line no-unused-vars
   const toggleMonitoring = async () => {
     console.log(`[DEBUG_TOGGLE] Current session ID for toggle: ${sessionId}`);
@@ -699,64 +725,14 @@ function App() {
     }
   }, [sessionId, offlineMode, addAlert]);
   
-  // Helper function to convert ArrayBuffer to Base64 string
-  const arrayBufferToBase64 = (buffer) => {
-    let binary = '';
-    const bytes = new Uint8Array(buffer);
-    const len = bytes.byteLength;
-    for (let i = 0; i < len; i++) {
-      binary += String.fromCharCode(bytes[i]);
-    }
-    return window.btoa(binary);
-  };
-
-  // WAV Encoding Function
-  const encodeWAV = (samples, sampleRate) => {
-    const buffer = new ArrayBuffer(44 + samples.length * 2);
-    const view = new DataView(buffer);
-
-    // Helper function to write strings to DataView
-    const writeString = (view, offset, string) => {
-      for (let i = 0; i < string.length; i++) {
-        view.setUint8(offset + i, string.charCodeAt(i));
-      }
-    };
-
-    // RIFF identifier
-    writeString(view, 0, 'RIFF');
-    // RIFF chunk length
-    view.setUint32(4, 36 + samples.length * 2, true);
-    // RIFF type
-    writeString(view, 8, 'WAVE');
-    // format chunk identifier
-    writeString(view, 12, 'fmt ');
-    // format chunk length
-    view.setUint32(16, 16, true);
-    // sample format (raw)
-    view.setUint16(20, 1, true);
-    // channel count
-    const numChannels = 1;
-    view.setUint16(22, numChannels, true);
-    // sample rate
-    view.setUint32(24, sampleRate, true);
-    // byte rate (sample rate * block align)
-    view.setUint32(28, sampleRate * numChannels * 2, true); // 2 bytes per sample (16-bit)
-    // block align (channel count * bytes per sample)
-    view.setUint16(32, numChannels * 2, true); // 2 bytes per sample (16-bit)
-    // bits per sample
-    view.setUint16(34, 16, true);
-    // data chunk identifier
-    writeString(view, 36, 'data');
-    // data chunk length
-    view.setUint32(40, samples.length * 2, true);
-
-    // Write the PCM samples (16-bit)
-    let offset = 44;
-    for (let i = 0; i < samples.length; i++, offset += 2) {
+  // Convert Float32 samples in [-1, 1] to 16-bit little-endian PCM
+  const floatTo16BitPCM = (samples) => {
+    const pcm = new Int16Array(samples.length);
+    for (let i = 0; i < samples.length; i++) {
       const s = Math.max(-1, Math.min(1, samples[i])); // Clamp to -1 to 1
-      view.setInt16(offset, s < 0 ? s * 0x8000 : s * 0x7FFF, true);
+      pcm[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
     }
-    return buffer; // Return ArrayBuffer
+    return pcm;
   };
 
   const processAndSendAudioChunk = useCallback((audioBuffers, sampleRate) => {
@@ -785,25 +761,24 @@ function App() {
       });
       console.log(`[AudioChunk] Concatenated buffer length: ${concatenatedBuffer.length}, Sample rate: ${sampleRate}`);
 
-      // 2. Convert to WAV (encodeWAV function)
-      const wavBuffer = encodeWAV(concatenatedBuffer, sampleRate);
-      console.log(`[AudioChunk] WAV buffer created, length: ${wavBuffer.byteLength}`);
-
-      // 3. Base64 Encode
-      const base64WAV = arrayBufferToBase64(wavBuffer);
-      console.log(`[AudioChunk] Base64 WAV data (first 100 chars): ${base64WAV.substring(0, 100)}`);
-      console.log(`[AudioChunk] Base64 WAV data length: ${base64WAV.length}`);
-
-      // 4. Send to backend (Sub-Task 2.3)
-      const clientTimestampUTC = new Date().toISOString();
-      const audioDataPayload = {
-        audio_data: base64WAV,
-        sample_rate: sampleRate,
-        session_id: sessionId, // Assumes sessionId is available in this scope
-        client_timestamp_utc: clientTimestampUTC
-      };
-
-      axios.post(`${API_BASE_URL}/api/analyze-audio`, audioDataPayload)
+      // 2. Convert to 16-bit PCM (Int16Array is little-endian on all supported browsers)
+      const pcmSamples = floatTo16BitPCM(concatenatedBuffer);
+      console.log(`[AudioChunk] PCM buffer created, length: ${pcmSamples.byteLength} bytes`);
+
+      // 3. Send the raw PCM bytes to the backend; metadata travels in headers
+      if (audioSequenceRef.current.sessionId !== sessionId) {
+        audioSequenceRef.current = { sessionId, next: 0 };
+      }
+      const audioSequence = audioSequenceRef.current.next++;
+      axios.post(`${API_BASE_URL}/api/analyze-audio`, pcmSamples.buffer, {
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'X-Session-Id': sessionId, // Assumes sessionId is available in this scope
+          'X-Sample-Rate': String(sampleRate),
+          'X-Audio-Format': 's16le',
+          'X-Audio-Sequence': String(audioSequence),
+        },
+      })
         .then(response => {
           console.log('[AudioChunk] Successfully sent audio chunk to backend:', response.data);
         })
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import axios from 'axios';
 import Container from '@mui/material/Container';
 import Typography from '@mui/material/Typography';
@@ -46,6 +46,11 @@ const AdminAlertLog = ({ currentUser }) => {
   const [page, setPage] = useState(0); // API is 1-indexed, MUI TablePagination is 0-indexed
   const [rowsPerPage, setRowsPerPage] = useState(10);
   const [totalAlerts, setTotalAlerts] = useState(0);
+  // Keyset cursors of the page currently shown; adjacent pages are fetched with them
+  const cursorsRef = useRef({ page: null, next: null, prev: null });
+  const resetCursors = () => {
+    cursorsRef.current = { page: null, next: null, prev: null };
+  };
 
   // Filter state
   const [filters, setFilters] = useState({
@@ -64,6 +69,20 @@ const AdminAlertLog = ({ currentUser }) => {
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [snapshotUrl, setSnapshotUrl] = useState(''); // For blob URL
   const [snapshotError, setSnapshotError] = useState('');
+  const [audioUrl, setAudioUrl] = useState(''); // Blob URL of the alert's audio clip
+  const [audioError, setAudioError] = useState('');
+  const [alertCounts, setAlertCounts] = useState(null); // Maintained counters, no aggregation needed
+  const [isAcknowledging, setIsAcknowledging] = useState(false);
+  // Blob URLs of snapshots and audio clips already fetched while browsing, keyed by filename
+  const snapshotCacheRef = useRef(new Map());
+
+  useEffect(() => {
+    const snapshotCache = snapshotCacheRef.current;
+    return () => {
+      snapshotCache.forEach((objectURL) => URL.revokeObjectURL(objectURL));
+      snapshotCache.clear();
+    };
+  }, []);
 
   const fetchAlerts = useCallback(async () => {
     if (!currentUser || !currentUser.token) {
@@ -79,6 +98,13 @@ const AdminAlertLog = ({ currentUser }) => {
       sort_by: sortConfig.key,
       order: sortConfig.direction,
     };
+    // Stepping to a neighbouring page uses the cursor so deep pages stay cheap
+    const cursors = cursorsRef.current;
+    if (cursors.page !== null && page === cursors.page + 1 && cursors.next) {
+      params.cursor = cursors.next;
+    } else if (cursors.page !== null && page === cursors.page - 1 && cursors.prev) {
+      params.cursor = cursors.prev;
+    }
 
     // Add active filters to params
     for (const [key, value] of Object.entries(filters)) {
@@ -106,11 +132,17 @@ const AdminAlertLog = ({ currentUser }) => {
       });
       setAlerts(response.data.alerts || []);
       setTotalAlerts(response.data.total_alerts || 0);
+      cursorsRef.current = {
+        page,
+        next: response.data.next_cursor || null,
+        prev: response.data.prev_cursor || null,
+      };
     } catch (err) {
       console.error("Error fetching alerts:", err);
       setError(err.response?.data?.msg || "Failed to fetch alerts. Please try again.");
       setAlerts([]);
       setTotalAlerts(0);
+      resetCursors();
     } finally {
       setIsLoading(false);
     }
@@ -120,12 +152,54 @@ const AdminAlertLog = ({ currentUser }) => {
     fetchAlerts();
   }, [fetchAlerts]);
 
+  const fetchAlertCounts = useCallback(async () => {
+    if (!currentUser || !currentUser.token) return;
+    const params = {};
+    if (filters.session_id) params.session_id = filters.session_id;
+    else if (filters.student_username) params.student_username = filters.student_username;
+    try {
+      const response = await axios.get(`${API_BASE_URL}/api/admin/alerts/counts`, {
+        headers: { Authorization: `Bearer ${currentUser.token}` },
+        params: params,
+      });
+      setAlertCounts(response.data.counts || response.data.totals || null);
+    } catch (err) {
+      console.error("Error fetching alert counts:", err);
+      setAlertCounts(null);
+    }
+  }, [currentUser, filters.session_id, filters.student_username]);
+
+  useEffect(() => {
+    fetchAlertCounts();
+  }, [fetchAlertCounts]);
+
+  const handleAcknowledge = async (alert) => {
+    const alertId = alert._id || alert.alert_id;
+    if (!alertId || !currentUser || !currentUser.token) return;
+    setIsAcknowledging(true);
+    try {
+      await axios.post(`${API_BASE_URL}/api/admin/alerts/${alertId}/acknowledge`, {}, {
+        headers: { Authorization: `Bearer ${currentUser.token}` },
+      });
+      const markAcknowledged = (a) => ((a._id || a.alert_id) === alertId ? { ...a, is_acknowledged: true } : a);
+      setAlerts(prevAlerts => prevAlerts.map(markAcknowledged));
+      setSelectedAlert(prevAlert => (prevAlert ? markAcknowledged(prevAlert) : prevAlert));
+      fetchAlertCounts();
+    } catch (err) {
+      console.error("Error acknowledging alert:", err);
+      setSnapshotError(err.response?.data?.msg || 'Failed to acknowledge alert.');
+    } finally {
+      setIsAcknowledging(false);
+    }
+  };
+
   const handleChangePage = (event, newPage) => {
     setPage(newPage);
   };
 
   const handleChangeRowsPerPage = (event) => {
     setRowsPerPage(parseInt(event.target.value, 10));
+    resetCursors();
     setPage(0); // Reset to first page
   };
 
@@ -135,6 +209,7 @@ const AdminAlertLog = ({ currentUser }) => {
       ...prevFilters,
       [name]: value,
     }));
+    resetCursors();
     setPage(0); // Reset to first page when filters change
   };
 
@@ -143,6 +218,7 @@ const AdminAlertLog = ({ currentUser }) => {
         ...prevFilters,
         [name]: date, // date will be a Date object from DatePicker
     }));
+    resetCursors();
     setPage(0);
   };
   
@@ -155,6 +231,7 @@ const AdminAlertLog = ({ currentUser }) => {
         date_from: null,
         date_to: null,
     });
+    resetCursors();
     setPage(0);
     // fetchAlerts will be called due to useEffect dependency on filters changing
   };
@@ -162,6 +239,7 @@ const AdminAlertLog = ({ currentUser }) => {
   const handleSortRequest = (property) => {
     const isAsc = sortConfig.key === property && sortConfig.direction === 'asc';
     setSortConfig({ key: property, direction: isAsc ? 'desc' : 'asc' });
+    resetCursors();
     setPage(0); // Reset to first page when sorting changes
   };
 
@@ -183,7 +261,10 @@ const AdminAlertLog = ({ currentUser }) => {
     setSnapshotUrl(''); // Reset previous snapshot
     setSnapshotError('');
 
-    if (alert.snapshot_filename && currentUser && currentUser.token) {
+    const cachedUrl = alert.snapshot_filename && snapshotCacheRef.current.get(alert.snapshot_filename);
+    if (cachedUrl) {
+      setSnapshotUrl(cachedUrl);
+    } else if (alert.snapshot_filename && currentUser && currentUser.token) {
       try {
         const response = await axios.get(
           `${API_BASE_URL}/api/admin/snapshots/${alert.snapshot_filename}`,
@@ -193,22 +274,46 @@ const AdminAlertLog = ({ currentUser }) => {
           }
         );
         const objectURL = URL.createObjectURL(response.data);
+        snapshotCacheRef.current.set(alert.snapshot_filename, objectURL);
         setSnapshotUrl(objectURL);
       } catch (err) {
         console.error("Error fetching snapshot:", err);
         setSnapshotError(err.response?.data?.msg || 'Failed to load snapshot.');
       }
     }
+
+    setAudioUrl('');
+    setAudioError('');
+    const cachedAudioUrl = alert.audio_filename && snapshotCacheRef.current.get(alert.audio_filename);
+    if (cachedAudioUrl) {
+      setAudioUrl(cachedAudioUrl);
+    } else if (alert.audio_filename && currentUser && currentUser.token) {
+      try {
+        const response = await axios.get(
+          `${API_BASE_URL}/api/audio_files/${alert.audio_filename}`,
+          {
+            headers: { Authorization: `Bearer ${currentUser.token}` },
+            responseType: 'blob',
+          }
+        );
+        const objectURL = URL.createObjectURL(response.data);
+        snapshotCacheRef.current.set(alert.audio_filename, objectURL);
+        setAudioUrl(objectURL);
+      } catch (err) {
+        console.error("Error fetching audio clip:", err);
+        setAudioError(err.response?.status === 404 ? 'Audio clip is still being saved; reopen the alert shortly.' : 'Failed to load audio clip.');
+      }
+    }
   };
 
   const handleCloseModal = () => {
     setIsModalOpen(false);
     setSelectedAlert(null);
-    if (snapshotUrl) {
-      URL.revokeObjectURL(snapshotUrl); // Clean up blob URL
-    }
+    // Blob URLs stay cached for the rest of the review and are revoked on unmount
     setSnapshotUrl('');
     setSnapshotError('');
+    setAudioUrl('');
+    setAudioError('');
   };
 
   // Style for the modal
@@ -250,6 +355,7 @@ const AdminAlertLog = ({ currentUser }) => {
                     <MenuItem value="multiple_faces_detected">Multiple Faces</MenuItem>
                     <MenuItem value="looking_away">Looking Away</MenuItem>
                     <MenuItem value="loud_noise_detected">Loud Noise</MenuItem>
+                    <MenuItem value="speech_detected">Speech Detected</MenuItem>
                     {/* Add other alert types as they are defined */}
                   </Select>
                 </FormControl>
@@ -287,6 +393,16 @@ const AdminAlertLog = ({ currentUser }) => {
             </Grid>
           </Box>
 
+          {alertCounts && (
+            <Box sx={{ mb: 2 }}>
+              <Typography variant="body2">
+                <strong>Total:</strong> {alertCounts.total} &nbsp; <strong>Unread:</strong> {alertCounts.unread}
+                {Object.entries(alertCounts.by_type || {}).map(([type, count]) => (
+                  <span key={type}> &nbsp; {type}: {count} ({(alertCounts.unread_by_type || {})[type] || 0} unread)</span>
+                ))}
+              </Typography>
+            </Box>
+          )}
           {isLoading && (
             <Box sx={{ display: 'flex', justifyContent: 'center', my: 3 }}>
               <CircularProgress />
@@ -406,6 +522,15 @@ const AdminAlertLog = ({ currentUser }) => {
                 <Typography gutterBottom><strong>Student:</strong> {selectedAlert.student_username || selectedAlert.student_id || 'N/A'}</Typography>
                 <Typography gutterBottom><strong>Type:</strong> {selectedAlert.alert_type}</Typography>
                 <Typography gutterBottom><strong>Severity:</strong> {selectedAlert.severity}</Typography>
+                <Box sx={{ mb: 1 }}>
+                  {selectedAlert.is_acknowledged ? (
+                    <Typography gutterBottom><strong>Status:</strong> Acknowledged</Typography>
+                  ) : (
+                    <Button variant="contained" size="small" disabled={isAcknowledging} onClick={() => handleAcknowledge(selectedAlert)}>
+                      Acknowledge
+                    </Button>
+                  )}
+                </Box>
                 <Typography gutterBottom component="div"><strong>Details:</strong> <pre style={{whiteSpace: 'pre-wrap', wordBreak: 'break-all', margin:0}}>{typeof selectedAlert.details === 'object' && selectedAlert.details !== null ? (selectedAlert.details.message || JSON.stringify(selectedAlert.details)) : selectedAlert.details}</pre></Typography>
                 
                 {selectedAlert.snapshot_filename && (
@@ -424,6 +549,18 @@ const AdminAlertLog = ({ currentUser }) => {
                     )}
                   </Box>
                 )}
+
+                {selectedAlert.audio_filename && (
+                  <Box sx={{ mt: 2 }}>
+                    <Typography variant="subtitle1" gutterBottom><strong>Audio:</strong></Typography>
+                    {audioError && <Alert severity="info">{audioError}</Alert>}
+                    {audioUrl ? (
+                      <audio controls src={audioUrl} style={{ width: '100%' }} />
+                    ) : (
+                      !audioError && <CircularProgress size={24} />
+                    )}
+                  </Box>
+                )}
               </CardContent>
             </Card>
           </Modal>
@@ -15,6 +15,17 @@ import MuiAlert from '@mui/material/Alert';
 // API Configuration
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'https://examguard-production-90e5.up.railway.app';
 
+// Which sessions this dashboard watches, from the page URL, e.g.
+// /admin?exam_id=midterm-101&exam_id=midterm-102&alerts_only=true
+const getSubscription = () => {
+  const params = new URLSearchParams(window.location.search);
+  return {
+    exam_ids: params.getAll('exam_id'),
+    proctor_groups: params.getAll('proctor_group'),
+    alerts_only: params.get('alerts_only') === 'true',
+  };
+};
+
 // Alert component for Snackbar
 const SnackAlert = React.forwardRef(function SnackAlert(props, ref) {
   return <MuiAlert elevation={6} ref={ref} variant="filled" {...props} />;
@@ -25,6 +36,9 @@ const AdminDashboard = ({ currentUser }) => {
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
   const socketRef = useRef(null);
+  const subscriptionRef = useRef(getSubscription());
+  const refetchRef = useRef(null);
+  const refetchTimerRef = useRef(null);
 
   // State for Snackbar notifications
   const [snackbarOpen, setSnackbarOpen] = useState(false);
@@ -91,6 +105,44 @@ const AdminDashboard = ({ currentUser }) => {
   // eslint-disable-next-line react-hooks/exhaustive-deps 
   }, [handleShowSnackbar]);
 
+  // One coalesced message per server tick: { sessions: { [session_id]: { changed fields } } }
+  const handleSessionsDelta = useCallback((delta) => {
+    const changes = delta?.sessions || {};
+    if (!Object.keys(changes).length) return;
+    const { alerts_only: alertsOnly } = subscriptionRef.current;
+    setSessions(prevSessions => {
+      let changed = false;
+      const known = new Set(prevSessions.map(s => s.session_id));
+      const nextSessions = prevSessions
+        .map(s => {
+          const fields = changes[s.session_id];
+          if (!fields) return s;
+          changed = true;
+          return { ...s, ...fields };
+        })
+        // An alerts-only view drops sessions once their alerts are all acknowledged
+        .filter(s => !alertsOnly || !changes[s.session_id] || s.unread_alert_count > 0);
+      if (Object.keys(changes).some(sessionId => !known.has(sessionId)) && !refetchTimerRef.current) {
+        // A session we have no card for (e.g. it just started alerting): reload the list once
+        refetchTimerRef.current = setTimeout(() => {
+          refetchTimerRef.current = null;
+          if (refetchRef.current) refetchRef.current();
+        }, 1000);
+      }
+      return changed || nextSessions.length !== prevSessions.length ? nextSessions : prevSessions;
+    });
+  }, []);
+
+  // Sent as soon as a student's presence socket opens or closes (not batched like sessions_delta)
+  const handleStudentConnection = useCallback((connected) => (data) => {
+    setSessions(prevSessions =>
+      prevSessions.map(s => (s.session_id === data.session_id ? { ...s, student_connected: connected } : s))
+    );
+    if (!connected) {
+      handleShowSnackbar(`Session ${data.session_id} lost its connection.`, 'warning');
+    }
+  }, [handleShowSnackbar]);
+
   useEffect(() => {
     const fetchActiveSessions = async () => {
       setIsLoading(true);
@@ -104,8 +156,14 @@ const AdminDashboard = ({ currentUser }) => {
             setSessions([]); // Clear sessions if auth fails
             return;
         }
+        const { exam_ids, proctor_groups, alerts_only } = subscriptionRef.current;
+        const params = new URLSearchParams();
+        exam_ids.forEach(examId => params.append('exam_id', examId));
+        proctor_groups.forEach(group => params.append('proctor_group', group));
+        if (alerts_only) params.append('alerts_only', 'true');
         const response = await axios.get(`${API_BASE_URL}/api/admin/dashboard/active_sessions`, {
-            headers: { Authorization: `Bearer ${token}` }
+            headers: { Authorization: `Bearer ${token}` },
+            params,
         });
         setSessions(response.data || []);
         setError(null); // Clear error on successful fetch
@@ -130,6 +188,7 @@ const AdminDashboard = ({ currentUser }) => {
     };
 
     fetchActiveSessions();
+    refetchRef.current = fetchActiveSessions;
 
     // WebSocket connection logic
     const tokenForSocket = currentUser?.token;
@@ -159,6 +218,12 @@ const AdminDashboard = ({ currentUser }) => {
 
         newSocket.on('connection_ack', (data) => {
           console.log('[SocketIO] Connection Acknowledged:', data.message);
+          // Narrow the feed to this dashboard's exams / groups (every session by default)
+          newSocket.emit('subscribe', subscriptionRef.current);
+        });
+
+        newSocket.on('subscribed', (data) => {
+          console.log('[SocketIO] Subscribed to rooms:', data.rooms);
         });
         
         newSocket.on('disconnect', (reason) => {
@@ -180,6 +245,9 @@ const AdminDashboard = ({ currentUser }) => {
         newSocket.on('new_student_session_started', handleNewSession);
         newSocket.on('student_session_ended', handleSessionEnded);
         newSocket.on('student_session_update', handleSessionUpdate);
+        newSocket.on('sessions_delta', handleSessionsDelta);
+        newSocket.on('student_connected', handleStudentConnection(true));
+        newSocket.on('student_disconnected', handleStudentConnection(false));
         
         socketRef.current = newSocket;
       }
@@ -203,7 +271,7 @@ const AdminDashboard = ({ currentUser }) => {
         socketRef.current = null; // Ensure ref is cleared
       }
     };
-  }, [currentUser?.token, handleNewSession, handleSessionEnded, handleSessionUpdate, handleShowSnackbar, error]);
+  }, [currentUser?.token, handleNewSession, handleSessionEnded, handleSessionUpdate, handleSessionsDelta, handleStudentConnection, handleShowSnackbar, error]);
 
   if (isLoading && !sessions.length) {
     return (
@@ -85,6 +85,10 @@ const StudentCard = ({ sessionData }) => {
             avatar={<Avatar sx={{ bgcolor: getAudioStatusColor(data.latest_audio_event) + '.dark', color: 'white', width: 18, height: 18, fontSize: '0.7rem' }}>A</Avatar>}
           />
 
+          {data.student_connected === false && (
+            <Chip label="Disconnected" color="warning" size="small" variant="outlined" sx={{ mb: 1 }} />
+          )}
+
           <Typography variant="body2" color="text.secondary" gutterBottom>
             Session ID: <Typography component="span" variant="body2" sx={{ fontFamily: 'monospace', fontSize: '0.8rem' }}>{data.session_id?.substring(data.session_id.length - 8) || 'N/A'}</Typography>
           </Typography>